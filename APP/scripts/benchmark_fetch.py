@@ -0,0 +1,75 @@
+"""
+Tuple vs Arrow Fetch Benchmark
+Compares the two result paths of streamlit_app/db.run_query on a 1M-row,
+KPI-shaped result (ids, NUMBER(12,2) amounts, timestamps, short strings):
+  tuples : fetchall() → Python tuples → pd.DataFrame(rows)
+  arrow  : fetch_arrow_all() → Table.to_pandas()
+
+Both paths go through run_query and a real cursor. By default the rows are
+generated by DuckDB (range()) behind the local warehouse connector
+(scripts/local_warehouse.py, DW_BACKEND=duckdb), so the warehouse file must be
+built first. With --snowflake the same shape is generated in the warehouse
+(TABLE(GENERATOR)) and fetched through the Snowflake connector.
+
+Usage: python scripts/benchmark_fetch.py [--rows 1000000] [--snowflake]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'streamlit_app'))
+
+GENERATOR_SQL = """
+SELECT
+    SEQ8()                                                       AS transaction_id,
+    UNIFORM(1, 50, RANDOM())                                     AS store_id,
+    UNIFORM(100, 500000, RANDOM())::NUMBER(12,2) / 100           AS net_sales_amount,
+    UNIFORM(0, 200000, RANDOM())::NUMBER(12,2) / 100             AS gross_profit_amount,
+    DATEADD(second, SEQ4(), '2023-01-01'::TIMESTAMP_NTZ)         AS transaction_ts,
+    RANDSTR(8, RANDOM())                                         AS channel
+FROM TABLE(GENERATOR(ROWCOUNT => {rows}))
+"""
+
+LOCAL_SQL = """
+SELECT
+    i                                                            AS transaction_id,
+    (1 + HASH(i, 1) % 50)::BIGINT                                AS store_id,
+    ((100 + HASH(i, 2) % 499900) / 100)::DECIMAL(12,2)           AS net_sales_amount,
+    ((HASH(i, 3) % 200000) / 100)::DECIMAL(12,2)                 AS gross_profit_amount,
+    TIMESTAMP '2023-01-01' + TO_SECONDS(i)                       AS transaction_ts,
+    ['IN_STORE', 'ONLINE', 'MOBILE'][1 + i % 3]                  AS channel
+FROM range({rows}) t(i)
+"""
+
+def measure(fn):
+    start = time.perf_counter()
+    df = fn()
+    return df, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--snowflake', action='store_true', help='fetch a generated result from Snowflake')
+    args = parser.parse_args()
+
+    os.environ['USE_MOCK_DATA'] = 'false'
+    if not args.snowflake:
+        os.environ['DW_BACKEND'] = 'duckdb'
+    import db
+    db.USE_MOCK = False
+    sql   = (GENERATOR_SQL if args.snowflake else LOCAL_SQL).format(rows=args.rows)
+    paths = [('tuples', lambda: db.run_query(sql, arrow=False)),
+             ('arrow',  lambda: db.run_query(sql, arrow=True))]
+
+    print(f"{'path':<8}{'seconds':>10}{'frame MB':>10}  dtypes")
+    for name, fn in paths:
+        df, elapsed = measure(fn)
+        if df is None:
+            sys.exit('query failed – check the SNOWFLAKE_* settings' if args.snowflake
+                     else 'query failed – build the warehouse with scripts/local_warehouse.py')
+        dtypes = ', '.join(f'{c}:{t}' for c, t in df.dtypes.items())
+        print(f"{name:<8}{elapsed:>10.2f}{df.memory_usage(deep=True).sum() / 1e6:>10.1f}  {dtypes}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+CSV vs Parquet Benchmark
+Generates the same sales tables in both formats and compares file size, write
+time and read-back time. CSV is also measured gzipped, which is what PUT
+AUTO_COMPRESS=TRUE ships to the stage. With --snowflake, also times PUT + COPY
+per format through snowflake_loader (needs the SNOWFLAKE_* env vars).
+
+Usage: python scripts/benchmark_formats.py --transactions 1000000 [--snowflake]
+"""
+import argparse
+import gzip
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+import generate_data as gd
+
+TABLES = ['sales_transaction', 'sales_line', 'payment']
+
+def generate(fmt, dims, args):
+    rng      = np.random.default_rng(args.seed)
+    line_rng = np.random.default_rng(args.seed + 1)
+    start    = time.perf_counter()
+    writers  = [gd.TableWriter(t, fmt) for t in TABLES]
+    try:
+        for chunk in gd.gen_sales_columnar(rng, dims, args.transactions, args.chunk_size,
+                                           line_rng=line_rng):
+            for out, df in zip(writers, chunk):
+                out.write(df)
+    finally:
+        for out in writers:
+            out.close()
+    return time.perf_counter() - start
+
+def gzip_size(path):
+    with open(path, 'rb') as src, tempfile.TemporaryFile() as dst:
+        with gzip.GzipFile(fileobj=dst, mode='wb') as gz:
+            shutil.copyfileobj(src, gz, 1 << 20)
+        return dst.tell()
+
+def read_time(path):
+    start = time.perf_counter()
+    if path.endswith('.parquet'):
+        pq.read_table(path)
+    else:
+        pa_csv.read_csv(path)
+    return time.perf_counter() - start
+
+def load_time(data_dir):
+    import snowflake_loader
+    start = time.perf_counter()
+    snowflake_loader.upload_and_load(data_dir)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=200_000)
+    parser.add_argument('--chunk-size', type=int, default=gd.CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=gd.SEED)
+    parser.add_argument('--snowflake', action='store_true', help='also time PUT + COPY INTO per format')
+    args = parser.parse_args()
+
+    tmp         = tempfile.mkdtemp(prefix='format_bench_')
+    gd.DATA_DIR = tmp
+    try:
+        gd.random.seed(args.seed)
+        gd.Faker.seed(args.seed)
+        locations = gd.gen_locations(50)
+        stores    = gd.gen_stores(locations, 20)
+        customers = gd.gen_customers(locations, 500)
+        gd.gen_categories()
+        products  = gd.gen_products(200)
+        dims      = gd.sales_dims(stores, customers, products)
+
+        results = {}
+        for fmt in ('csv', 'parquet'):
+            print(f"\nWriting {args.transactions:,} transactions as {fmt}...")
+            results[fmt] = {'write': generate(fmt, dims, args)}
+            if args.snowflake:
+                results[fmt]['load'] = load_time(os.path.join(tmp, fmt))
+
+        print(f"\n{'table':<20}{'csv MB':>10}{'csv.gz MB':>11}{'parquet MB':>12}"
+              f"{'csv read s':>12}{'pq read s':>11}")
+        for table in TABLES:
+            csv_path = os.path.join(tmp, 'csv', f'{table}.csv')
+            pq_path  = os.path.join(tmp, 'parquet', f'{table}.parquet')
+            print(f"{table:<20}{os.path.getsize(csv_path) / 1e6:>10.1f}{gzip_size(csv_path) / 1e6:>11.1f}"
+                  f"{os.path.getsize(pq_path) / 1e6:>12.1f}{read_time(csv_path):>12.2f}{read_time(pq_path):>11.2f}")
+
+        print()
+        for fmt, r in results.items():
+            line = f"{fmt:<8} write {r['write']:6.2f}s"
+            if 'load' in r:
+                line += f"   PUT + COPY {r['load']:6.2f}s"
+            print(line)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
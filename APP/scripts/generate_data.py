@@ -1,20 +1,31 @@
 """
 Retail Chain Data Generator
-Generates realistic CSV data for all OLTP tables
+Generates realistic CSV or Parquet data for all OLTP tables
 """
+import argparse
 import csv
 import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime, timedelta
 
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 from faker import Faker
 
+from schema_registry import SCHEMAS, column_names, parquet_schema
+
+SEED = 42
+
 fake = Faker('en_US')
-random.seed(42)
-Faker.seed(42)
+random.seed(SEED)
+Faker.seed(SEED)
 
-OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'csv')
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
 
 # ── Constants ────────────────────────────────────────────────
 REGIONS       = ['NORTH', 'SOUTH', 'EAST', 'WEST', 'CENTRAL']
@@ -27,8 +38,21 @@ RETURN_REASONS = [
     'DEFECTIVE_PRODUCT', 'WRONG_SIZE', 'CHANGED_MIND',
     'DAMAGED_IN_TRANSIT', 'NOT_AS_DESCRIBED', 'DUPLICATE_ORDER'
 ]
+STATES = ['CA', 'TX', 'NY', 'FL', 'IL', 'PA', 'OH', 'GA', 'NC', 'MI',
+          'WA', 'AZ', 'MA', 'TN', 'IN', 'MO', 'MD', 'WI', 'CO', 'MN']
+STATE_REGION = {
+    'CA':'WEST','WA':'WEST','AZ':'WEST','CO':'WEST',
+    'TX':'SOUTH','FL':'SOUTH','GA':'SOUTH','NC':'SOUTH','TN':'SOUTH',
+    'NY':'EAST','PA':'EAST','MA':'EAST','MD':'EAST',
+    'IL':'CENTRAL','OH':'CENTRAL','IN':'CENTRAL','MO':'CENTRAL','WI':'CENTRAL','MN':'CENTRAL','MI':'CENTRAL',
+}
 START_DATE = date(2023, 1, 1)
 END_DATE   = date(2024, 12, 31)
+# "Today" for everything dated relative to the run (ages, snapshots, audit
+# timestamps), so the same seed always gives the same bytes.
+AS_OF      = date(2025, 1, 1)
+CHUNK_SIZE = 100_000     # transactions generated/written per chunk
+RETURN_PCT = 0.05        # share of transactions that get a return
 
 BRANDS = ['NovaBrand', 'PureLife', 'EcoStyle', 'UrbanEdge', 'ClearPath',
           'TechPulse', 'NaturalChoice', 'SwiftLine', 'PeakForm', 'DailyWear']
@@ -64,19 +88,11 @@ def fmt_bool(b):
     return 'TRUE' if b else 'FALSE'
 
 # ── Locations ────────────────────────────────────────────────
-def gen_locations(n=50):
+def gen_locations(n=50, as_of=AS_OF):
     rows = []
-    states = ['CA', 'TX', 'NY', 'FL', 'IL', 'PA', 'OH', 'GA', 'NC', 'MI',
-              'WA', 'AZ', 'MA', 'TN', 'IN', 'MO', 'MD', 'WI', 'CO', 'MN']
-    state_region = {
-        'CA':'WEST','WA':'WEST','AZ':'WEST','CO':'WEST',
-        'TX':'SOUTH','FL':'SOUTH','GA':'SOUTH','NC':'SOUTH','TN':'SOUTH',
-        'NY':'EAST','PA':'EAST','MA':'EAST','MD':'EAST',
-        'IL':'CENTRAL','OH':'CENTRAL','IN':'CENTRAL','MO':'CENTRAL','WI':'CENTRAL','MN':'CENTRAL','MI':'CENTRAL',
-    }
     for i in range(1, n + 1):
-        state = random.choice(states)
-        ts = fake.date_time_between(start_date='-5y', end_date='-3y')
+        state = random.choice(STATES)
+        ts = fake.date_time_between(start_date=years_ago(as_of, 5), end_date=years_ago(as_of, 3))
         rows.append({
             'location_id': i,
             'street_address': fake.street_address(),
@@ -84,7 +100,7 @@ def gen_locations(n=50):
             'state': state,
             'zip_code': fake.zipcode(),
             'country': 'USA',
-            'region': state_region.get(state, 'CENTRAL'),
+            'region': STATE_REGION.get(state, 'CENTRAL'),
             'created_at': fmt_dt(ts),
             'updated_at': fmt_dt(ts),
         })
@@ -116,11 +132,11 @@ def gen_stores(locations, n=20):
     return rows
 
 # ── Customers ────────────────────────────────────────────────
-def gen_customers(locations, n=500):
+def gen_customers(locations, n=500, as_of=AS_OF):
     rows = []
     for i in range(1, n + 1):
         loc = random.choice(locations)
-        dob = fake.date_of_birth(minimum_age=18, maximum_age=80)
+        dob = fake.date_between(start_date=years_ago(as_of, 80), end_date=years_ago(as_of, 18))
         reg = rand_date(date(2020, 1, 1), date(2024, 6, 30))
         points = random.randint(0, 50000)
         tier = ('PLATINUM' if points > 30000 else
@@ -196,7 +212,8 @@ def gen_products(n=200):
     return rows
 
 # ── Sales Transactions ───────────────────────────────────────
-def gen_sales(stores, customers, products, n=3000):
+def gen_sales(stores, customers, products, n=3000, chunk_size=CHUNK_SIZE):
+    """Yields (transactions, lines, payments) every chunk_size transactions."""
     transactions, lines, payments = [], [], []
     line_id = 1
     payment_id = 1
@@ -285,30 +302,395 @@ def gen_sales(stores, customers, products, n=3000):
         })
         payment_id += 1
 
+        if len(transactions) == chunk_size or txn_id == n:
+            yield transactions, lines, payments
+            transactions, lines, payments = [], [], []
+
+# ── Fast fake: vocab pools + vectorised composition ──────────
+# Faker is only used to fill small vocab pools once; every row is then built by
+# indexing into the pools and joining columns with Arrow string kernels.
+# Identifying fields embed the row id, so they are unique by construction
+# (no fake.unique bookkeeping, which grows with every call).
+POOL_SIZE     = 2000
+EMAIL_DOMAINS = ['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'icloud.com', 'example.com']
+LETTERS = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+
+class FakePools:
+    """Distinct Faker values drawn once per run; rows sample from these."""
+    def __init__(self, seed=SEED, size=POOL_SIZE):
+        f = Faker('en_US')
+        f.seed_instance(seed)
+        def pool(gen):
+            return pa.array(sorted({gen() for _ in range(size)}))
+        self.first_names     = pool(f.first_name)
+        self.last_names      = pool(f.last_name)
+        self.cities          = pool(f.city)
+        self.street_names    = pool(f.street_name)
+        self.words           = pool(lambda: f.word().title())
+
+    def take(self, rng, pool, n):
+        return pool.take(rng.integers(0, len(pool), n))
+
+def join(*parts, sep=''):
+    return pc.binary_join_element_wise(*parts, sep)
+
+def digits(values, width):
+    """Integers as zero-padded strings ('{:0{width}d}')."""
+    text = pa.array(values).cast(pa.string())
+    return text if width <= 1 else pc.utf8_lpad(text, width=width, padding='0')
+
+def as_column(arr):
+    """Keep Arrow strings Arrow-backed in the DataFrame (no per-row Python objects)."""
+    return pd.arrays.ArrowExtensionArray(arr)
+
+def pick(values, idx):
+    """values[idx] as an Arrow string column; NumPy '<U' arrays convert row by row."""
+    return as_column(pa.array(values).take(idx))
+
+def flags(mask):
+    return pick(['FALSE', 'TRUE'], mask.astype(np.int8))
+
+def phone_numbers(rng, n):
+    return join('(', digits(rng.integers(200, 1000, n), 3), ') ',
+                digits(rng.integers(200, 1000, n), 3), '-',
+                digits(rng.integers(0, 10000, n), 4))
+
+def years_ago(day, years):
+    """day moved back whole years; Feb 29 becomes Feb 28 in a non-leap year."""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+def rand_days(rng, n, start, end):
+    return np.datetime64(start, 'D') + rng.integers(0, (end - start).days + 1, n)
+
+def as_dates(days):
+    """datetime64[D] as an Arrow date32 column (pandas would widen it to a timestamp)."""
+    return as_column(pa.array(days))
+
+def gen_locations_columnar(rng, pools, n=50, as_of=AS_OF):
+    state = rng.integers(0, len(STATES), n)
+    ts    = (np.datetime64(years_ago(as_of, 5), 's')
+             + rng.integers(0, 2 * 365 * 86400, n))
+    return pd.DataFrame({
+        'location_id':    np.arange(1, n + 1),
+        'street_address': as_column(join(digits(rng.integers(1, 10000, n), 1), ' ',
+                                         pools.take(rng, pools.street_names, n))),
+        'city':           as_column(pools.take(rng, pools.cities, n)),
+        'state':          pick(STATES, state),
+        'zip_code':       as_column(digits(rng.integers(501, 100000, n), 5)),
+        'country':        'USA',
+        'region':         pick([STATE_REGION[s] for s in STATES], state),
+        'created_at':     ts,
+        'updated_at':     ts,
+    })
+
+def gen_customers_columnar(rng, pools, location_ids, n=500, as_of=AS_OF):
+    ids    = np.arange(1, n + 1)
+    first  = pools.take(rng, pools.first_names, n)
+    last   = pools.take(rng, pools.last_names, n)
+    dob    = rand_days(rng, n, years_ago(as_of, 80), years_ago(as_of, 18))
+    reg    = rand_days(rng, n, date(2020, 1, 1), date(2024, 6, 30))
+    points = rng.integers(0, 50001, n)
+    tier   = np.searchsorted([5000, 15000, 30000], points, side='left')   # index into LOYALTY_TIERS
+    # first.last.<customer_id>@domain — the id makes every address unique.
+    email  = join(pc.utf8_lower(first), '.', pc.utf8_lower(last), '.', digits(ids, 1), '@',
+                  pa.array(EMAIL_DOMAINS).take(rng.integers(0, len(EMAIL_DOMAINS), n)))
+    ts     = reg.astype('datetime64[s]')
+    return pd.DataFrame({
+        'customer_id':       ids,
+        'customer_code':     as_column(join('CUST', digits(ids, 6))),
+        'first_name':        as_column(first),
+        'last_name':         as_column(last),
+        'email':             as_column(email),
+        'phone_number':      as_column(phone_numbers(rng, n)),
+        'date_of_birth':     as_dates(dob),
+        'gender':            pick(GENDERS, rng.integers(0, len(GENDERS), n)),
+        'loyalty_tier':      pick(LOYALTY_TIERS, tier),
+        'loyalty_points':    points,
+        'registration_date': as_dates(reg),
+        'location_id':       rng.choice(location_ids, n),
+        'is_active':         flags(rng.random(n) > 0.05),
+        'created_at':        ts,
+        'updated_at':        ts,
+    })
+
+def gen_products_columnar(rng, pools, n=200):
+    ids       = np.arange(1, n + 1)
+    leaf_cats = [c for c in CATEGORIES if c[3] is not None]
+    cat       = rng.integers(0, len(leaf_cats), n)
+    cat_ids   = np.array([c[0] for c in leaf_cats])[cat]
+    cat_names = pa.array([c[2] for c in leaf_cats]).take(cat)
+    cost      = np.round(rng.uniform(5, 300, n), 2)
+    price     = np.round(cost * rng.uniform(1.2, 2.5, n), 2)
+    launch    = rand_days(rng, n, date(2019, 1, 1), date(2023, 12, 31))
+    ts        = launch.astype('datetime64[s]')
+    letters   = LETTERS[rng.integers(0, 26, (n, 2))].view('<U2').ravel()
+    return pd.DataFrame({
+        'product_id':       ids,
+        'product_code':     as_column(join('PRD', digits(ids, 5))),
+        # SKU-<2 letters><2 digits>-<product_id>: unique via the id suffix.
+        'sku':              as_column(join('SKU-', pa.array(letters), digits(rng.integers(0, 100, n), 2),
+                                           '-', digits(ids, 6))),
+        'product_name':     as_column(join(pa.array(BRANDS).take(rng.integers(0, len(BRANDS), n)),
+                                           pools.take(rng, pools.words, n), cat_names, sep=' ')),
+        'category_id':      cat_ids,
+        'supplier_id':      rng.integers(1, 21, n),
+        'unit_cost':        cost,
+        'unit_price':       price,
+        'discount_pct':     rng.choice([0.0, 0.0, 0.0, 5.0, 10.0, 15.0, 20.0], n),
+        'weight_kg':        np.round(rng.uniform(0.1, 20, n), 3),
+        'brand':            pick(BRANDS, rng.integers(0, len(BRANDS), n)),
+        'size':             pick(SIZES, rng.integers(0, len(SIZES), n)),
+        'color':            pick(COLORS, rng.integers(0, len(COLORS), n)),
+        'is_perishable':    flags(np.isin(cat_ids, [10, 11])),
+        'is_active':        flags(rng.random(n) > 0.08),
+        'launch_date':      as_dates(launch),
+        'discontinue_date': None,
+        'created_at':       ts,
+        'updated_at':       ts,
+    })
+
+# ── Sales Transactions (columnar engine) ─────────────────────
+HEX_CHARS = np.array(list('0123456789abcdef'))
+
+def rand_datetimes(rng, n, start=START_DATE, end=END_DATE):
+    days    = rng.integers(0, (end - start).days + 1, n)
+    minutes = rng.integers(8, 22, n) * 60 + rng.integers(0, 60, n)
+    base    = np.datetime64(start, 'm')
+    return (base + days * 1440 + minutes).astype('datetime64[s]')
+
+def uuid_refs(rng, n):
+    """uuid4-shaped 20-char references ('xxxxxxxx-xxxx-4xxx-x') built from random nibbles."""
+    chars = HEX_CHARS[rng.integers(0, 16, (n, 20))]
+    chars[:, [8, 13, 18]] = '-'
+    chars[:, 14] = '4'
+    return chars.view('<U20').ravel()
+
+def sample_products(rng, num_lines, n_products):
+    """
+    Distinct product indices per transaction, returned as an (n, max_lines)
+    matrix (-1 = no line). Positions that repeat an earlier product in the
+    same row are redrawn until every row is duplicate-free.
+    """
+    width = int(num_lines.max())
+    mat   = rng.integers(0, n_products, (len(num_lines), width))
+    mat[np.arange(width) >= num_lines[:, None]] = -1
+    for b in range(1, width):
+        while True:
+            dup = (mat[:, b] >= 0) & (mat[:, :b] == mat[:, [b]]).any(axis=1)
+            if not dup.any():
+                break
+            mat[dup, b] = rng.integers(0, n_products, int(dup.sum()))
+    return mat
+
+def column(rows, name, dtype=None):
+    """One field of a dimension as an array, from row dicts or a DataFrame."""
+    if isinstance(rows, pd.DataFrame):
+        return rows[name].to_numpy(dtype)
+    return np.array([r[name] for r in rows], dtype)
+
+def sales_dims(stores, customers, products):
+    return {
+        'store_ids': column(stores, 'store_id'),
+        'cust_ids':  column(customers, 'customer_id'),
+        'prod_ids':  column(products, 'product_id'),
+        'prod_up':   column(products, 'unit_price', float),
+        'prod_uc':   column(products, 'unit_cost', float),
+        'prod_disc': column(products, 'discount_pct', float),
+    }
+
+def draw_num_lines(rng, n, n_products):
+    return rng.integers(1, 7, n).clip(max=n_products)
+
+def sales_chunk_columnar(rng, dims, first_txn, first_line, num_lines):
+    """
+    One chunk of transactions (ids first_txn.., one per num_lines entry) with
+    their lines (ids first_line..) and payments, built column-wise and
+    returned as DataFrames.
+    """
+    n          = len(num_lines)
+    n_products = len(dims['prod_ids'])
+    txn_ids  = np.arange(first_txn, first_txn + n)
+    txn_date = rand_datetimes(rng, n)
+    store_id = rng.choice(dims['store_ids'], n)
+    cust_id  = pd.array(rng.choice(dims['cust_ids'], n), dtype='Int64')
+    cust_id[rng.random(n) <= 0.1] = pd.NA
+
+    # ── Lines: one row per (transaction, distinct product) ──
+    line_txn  = np.repeat(np.arange(n), num_lines)
+    line_pos  = np.arange(len(line_txn)) - (np.cumsum(num_lines) - num_lines)[line_txn]
+    prod      = sample_products(rng, num_lines, n_products)[line_txn, line_pos]
+
+    qty       = rng.integers(1, 6, len(line_txn))
+    up        = dims['prod_up'][prod]
+    uc        = dims['prod_uc'][prod]
+    disc_pct  = dims['prod_disc'][prod]
+    gross     = np.round(up * qty, 2)
+    disc_amt  = np.round(up * qty * disc_pct / 100, 2)
+    line_tot  = np.round(up * qty - disc_amt, 2)
+    line_cost = np.round(uc * qty, 2)
+    tax_rate  = 0.08
+    tax_amt   = np.round(line_tot * tax_rate, 2)
+
+    lines = pd.DataFrame({
+        'line_id':           np.arange(first_line, first_line + len(line_txn)),
+        'transaction_id':    txn_ids[line_txn],
+        'line_number':       line_pos + 1,
+        'product_id':        dims['prod_ids'][prod],
+        'quantity':          qty,
+        'unit_price':        up,
+        'unit_cost':         uc,
+        'discount_pct':      disc_pct,
+        'discount_amount':   disc_amt,
+        'line_total_amount': line_tot,
+        'line_cost_amount':  line_cost,
+        'tax_rate':          round(tax_rate * 100, 2),
+        'tax_amount':        tax_amt,
+        'created_at':        txn_date[line_txn],
+    })
+
+    # ── Transaction roll-ups: group-by sums over line_txn ──
+    subtotal       = np.round(np.bincount(line_txn, gross, n), 2)
+    discount_total = np.round(np.bincount(line_txn, disc_amt, n), 2)
+    tax_total      = np.round(np.bincount(line_txn, tax_amt, n), 2)
+    total          = np.round(subtotal - discount_total + tax_total, 2)
+
+    transactions = pd.DataFrame({
+        'transaction_id':          txn_ids,
+        'transaction_code':        pd.Series(txn_ids).map('TXN{:08d}'.format),
+        'transaction_date':        txn_date,
+        'store_id':                store_id,
+        'customer_id':             cust_id,
+        'cashier_id':              rng.integers(1, 51, n),
+        'transaction_type':        'SALE',
+        'channel':                 rng.choice(CHANNELS, n),
+        'subtotal_amount':         subtotal,
+        'discount_amount':         discount_total,
+        'tax_amount':              tax_total,
+        'total_amount':            total,
+        'loyalty_points_earned':   total.astype(np.int64),
+        'loyalty_points_redeemed': 0,
+        'notes':                   None,
+        'created_at':              txn_date,
+    })
+
+    method = rng.choice(PAY_METHODS, n)
+    card   = np.isin(method, ['CREDIT_CARD', 'DEBIT_CARD'])
+    payments = pd.DataFrame({
+        'payment_id':        txn_ids,
+        'transaction_id':    txn_ids,
+        'payment_method':    method,
+        'payment_amount':    total,
+        'payment_status':    'COMPLETED',
+        'payment_reference': uuid_refs(rng, n),
+        'payment_date':      txn_date,
+        'card_last_four':    np.where(card, rng.integers(1000, 10000, n).astype(str), None),
+        'created_at':        txn_date,
+    })
+
     return transactions, lines, payments
 
+def gen_sales_columnar(rng, dims, n=3000, chunk_size=CHUNK_SIZE,
+                       first_txn=1, first_line=1, line_rng=None):
+    """
+    Vectorised equivalent of gen_sales: same columns and referential integrity,
+    but every table is built as NumPy columns. Yields DataFrame chunks with
+    transaction and line ids continuing across chunks. Lines-per-transaction
+    are drawn from line_rng (default: rng) so they can be counted up front.
+    """
+    line_rng = line_rng or rng
+    line_id  = first_line
+    for start in range(0, n, chunk_size):
+        num_lines = draw_num_lines(line_rng, min(chunk_size, n - start), len(dims['prod_ids']))
+        chunk = sales_chunk_columnar(rng, dims, first_txn + start, line_id, num_lines)
+        line_id += len(chunk[1])
+        yield chunk
+
+# ── Transaction index (input to the returns pass) ────────────
+class TxnIndex:
+    """
+    Compact columnar record of written transactions: id, date, store,
+    customer (0 = anonymous) and total. The returns pass samples from this
+    instead of keeping every transaction row in memory.
+    """
+    def __init__(self):
+        self._parts = []
+
+    def add(self, transactions):
+        if isinstance(transactions, pd.DataFrame):
+            cols = (transactions['transaction_id'].to_numpy(np.int64),
+                    transactions['transaction_date'].to_numpy('datetime64[s]'),
+                    transactions['store_id'].to_numpy(np.int64),
+                    transactions['customer_id'].fillna(0).to_numpy(np.int64),
+                    transactions['total_amount'].to_numpy(np.float64))
+        else:
+            cols = (np.array([t['transaction_id'] for t in transactions], dtype=np.int64),
+                    np.array([t['transaction_date'] for t in transactions], dtype='datetime64[s]'),
+                    np.array([t['store_id'] for t in transactions], dtype=np.int64),
+                    np.array([t['customer_id'] or 0 for t in transactions], dtype=np.int64),
+                    np.array([t['total_amount'] for t in transactions], dtype=np.float64))
+        self._parts.append(cols)
+
+    def columns(self):
+        if len(self._parts) > 1:
+            self._parts = [tuple(np.concatenate(c) for c in zip(*self._parts))]
+        return self._parts[0] if self._parts else (np.array([], dtype=np.int64),) * 5
+
+    def __len__(self):
+        return sum(len(p[0]) for p in self._parts)
+
+def gen_returns_columnar(rng, index, pct=RETURN_PCT, chunk_size=CHUNK_SIZE, first_return=1):
+    ids_all, dates, store_ids, cust_ids, totals = index.columns()
+    n    = len(ids_all)
+    pick = np.sort(rng.choice(n, int(n * pct), replace=False))
+    for start in range(0, len(pick), chunk_size):
+        sel = pick[start:start + chunk_size]
+        k   = len(sel)
+        ret_date = dates[sel] + rng.integers(1, 31, k).astype('timedelta64[D]')
+        ids = np.arange(first_return + start, first_return + start + k)
+        yield pd.DataFrame({
+            'return_id':               ids,
+            'return_code':             pd.Series(ids).map('RET{:07d}'.format),
+            'original_transaction_id': ids_all[sel],
+            'return_date':             ret_date,
+            'store_id':                store_ids[sel],
+            'customer_id':             pd.Series(cust_ids[sel], dtype='Int64').mask(cust_ids[sel] == 0).array,
+            'return_reason':           rng.choice(RETURN_REASONS, k),
+            'refund_method':           rng.choice(['ORIGINAL_PAYMENT', 'STORE_CREDIT', 'CASH'], k),
+            'refund_amount':           np.round(totals[sel] * rng.uniform(0.1, 1.0, k), 2),
+            'is_restocked':            np.where(rng.random(k) > 0.3, 'TRUE', 'FALSE'),
+            'created_at':              ret_date,
+        })
+
 # ── Returns ──────────────────────────────────────────────────
-def gen_returns(transactions, stores, customers, pct=0.05):
+def gen_returns(index, pct=RETURN_PCT, chunk_size=CHUNK_SIZE):
+    ids, dates, store_ids, cust_ids, totals = index.columns()
     rows = []
-    for i, txn in enumerate(random.sample(transactions, int(len(transactions) * pct)), start=1):
-        ret_date = datetime.strptime(txn['transaction_date'], '%Y-%m-%d %H:%M:%S') + timedelta(days=random.randint(1, 30))
+    for i, j in enumerate(random.sample(range(len(ids)), int(len(ids) * pct)), start=1):
+        ret_date = dates[j].item() + timedelta(days=random.randint(1, 30))
         rows.append({
             'return_id': i,
             'return_code': f'RET{i:07d}',
-            'original_transaction_id': txn['transaction_id'],
+            'original_transaction_id': int(ids[j]),
             'return_date': fmt_dt(ret_date),
-            'store_id': txn['store_id'],
-            'customer_id': txn['customer_id'],
+            'store_id': int(store_ids[j]),
+            'customer_id': int(cust_ids[j]) or '',
             'return_reason': random.choice(RETURN_REASONS),
             'refund_method': random.choice(['ORIGINAL_PAYMENT', 'STORE_CREDIT', 'CASH']),
-            'refund_amount': round(float(txn['total_amount']) * random.uniform(0.1, 1.0), 2),
+            'refund_amount': round(float(totals[j]) * random.uniform(0.1, 1.0), 2),
             'is_restocked': fmt_bool(random.random() > 0.3),
             'created_at': fmt_dt(ret_date),
         })
-    return rows
+        if len(rows) == chunk_size:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
 
 # ── Inventory ────────────────────────────────────────────────
-def gen_inventory(stores, products):
+def gen_inventory(stores, products, as_of=AS_OF):
     rows = []
     inv_id = 1
     for prod in products:
@@ -320,7 +702,7 @@ def gen_inventory(stores, products):
             reorder_pt = random.randint(5, 30)
             last_restock = rand_date(date(2024, 1, 1), date(2024, 12, 31))
             last_sold    = rand_date(last_restock, date(2024, 12, 31))
-            ts = datetime.now()
+            ts = datetime(as_of.year, as_of.month, as_of.day)
             rows.append({
                 'inventory_id': inv_id,
                 'store_id': store['store_id'],
@@ -332,49 +714,267 @@ def gen_inventory(stores, products):
                 'reorder_quantity': random.randint(50, 200),
                 'last_restock_date': str(last_restock),
                 'last_sold_date': str(last_sold),
-                'snapshot_date': str(date.today()),
+                'snapshot_date': str(as_of),
                 'created_at': fmt_dt(ts),
                 'updated_at': fmt_dt(ts),
             })
             inv_id += 1
     return rows
 
-# ── CSV Writer ───────────────────────────────────────────────
-def write_csv(filename, rows):
-    if not rows:
-        return
-    path = os.path.join(OUTPUT_DIR, filename)
-    with open(path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-        writer.writeheader()
-        writer.writerows(rows)
-    print(f"  Written {len(rows):>6,} rows → {path}")
+# ── Parquet schemas ──────────────────────────────────────────
+# Column order and logical types for both formats come from schema_registry.py.
+# CSV output keeps the generators' textual values ('TRUE'/'FALSE', '' = NULL).
+PARQUET_SCHEMAS = {base: parquet_schema(base) for base in SCHEMAS}
+
+def to_arrow(chunk):
+    if isinstance(chunk, pd.DataFrame):
+        return pa.Table.from_pandas(chunk, preserve_index=False)
+    # Row dicts use '' for NULL, which would also clash with ints in one column.
+    return pa.Table.from_pylist([{k: (None if v == '' else v) for k, v in row.items()}
+                                 for row in chunk])
+
+def cast_column(col, target):
+    if pa.types.is_string(col.type) and not pa.types.is_string(target):
+        col = pc.if_else(pc.equal(col, ''), pa.scalar(None, col.type), col)
+        if pa.types.is_boolean(target):
+            return pc.equal(pc.utf8_upper(col), 'TRUE')
+    if pa.types.is_decimal(target) and not pa.types.is_decimal(col.type):
+        col = pc.round(col.cast(pa.float64()), target.scale)
+    return col.cast(target)
+
+def typed_table(table, schema):
+    """Cast a chunk's Arrow table to its Parquet schema (text flags → bool, floats → decimal)."""
+    return pa.Table.from_arrays(
+        [cast_column(table[f.name], f.type) for f in schema], schema=schema)
+
+# ── Table Writer ─────────────────────────────────────────────
+class TableWriter:
+    """
+    Streams one table to disk chunk by chunk: the header/schema goes out with
+    the first chunk and later chunks are appended, so only the chunk being
+    written is held in memory. Chunks are lists of row dicts or DataFrames;
+    columns are written in schema_registry order, so a chunk that lost or
+    renamed a column fails here instead of at COPY.
+
+    fmt='csv'     : row dicts via the csv module, DataFrames via Arrow's C++
+                    CSV writer (DataFrame.to_csv formats every float in Python);
+                    nulls are written as empty fields.
+    fmt='parquet' : snappy-compressed Parquet typed by PARQUET_SCHEMAS.
+    """
+    def __init__(self, table, fmt='csv', suffix=''):
+        out_dir = os.path.join(DATA_DIR, fmt)
+        os.makedirs(out_dir, exist_ok=True)
+        self.table   = table
+        self.fmt     = fmt
+        self.path    = os.path.join(out_dir, f'{table}{suffix}.{fmt}')
+        self.rows    = 0
+        self._file   = None
+        self._writer = None
+        self._schema = None
+
+    def write(self, chunk):
+        if len(chunk) == 0:
+            return
+        if self.fmt == 'parquet':
+            self._write_parquet(chunk)
+        elif isinstance(chunk, pd.DataFrame):
+            self._write_frame(chunk)
+        else:
+            self._write_rows(chunk)
+        self.rows += len(chunk)
+
+    def _write_rows(self, rows):
+        if self._writer is None:
+            self._file   = open(self.path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, fieldnames=column_names(self.table))
+            self._writer.writeheader()
+        self._writer.writerows(rows)
+
+    def _write_frame(self, df):
+        table = to_arrow(df).select(column_names(self.table))
+        if self._writer is None:
+            # An all-null column infers Arrow's null type; pin it to string so
+            # later chunks with values still cast to the file schema.
+            self._schema = pa.schema([
+                f.with_type(pa.string()) if pa.types.is_null(f.type) else f
+                for f in table.schema
+            ])
+            self._writer = pa_csv.CSVWriter(self.path, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+
+    def _write_parquet(self, chunk):
+        schema = PARQUET_SCHEMAS[self.table]
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, schema, compression='snappy')
+        self._writer.write_table(typed_table(to_arrow(chunk), schema))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        elif self._writer is not None:
+            self._writer.close()
+        if self.rows:
+            print(f"  Written {self.rows:>6,} rows → {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_table(table, rows, fmt='csv'):
+    with TableWriter(table, fmt) as out:
+        out.write(rows)
+
+# ── Sharded columnar generation ──────────────────────────────
+def shard_plan(seed, n, shards, n_products, chunk_size=CHUNK_SIZE, pct=RETURN_PCT):
+    """
+    Split transaction ids 1..n into contiguous shard ranges, each with its own
+    seeds spawned from the base seed. Every shard draws lines-per-transaction
+    from a dedicated stream, so the parent can replay just those draws to work
+    out where each shard's line ids (and return ids) start, keeping them
+    globally contiguous without any coordination between workers.
+    """
+    jobs = []
+    line_id = return_id = 1
+    bounds = [n * k // shards for k in range(shards + 1)]
+    for k, shard_seq in enumerate(np.random.SeedSequence(seed).spawn(shards)):
+        line_seq, body_seq = shard_seq.spawn(2)
+        size     = bounds[k + 1] - bounds[k]
+        line_rng = np.random.default_rng(line_seq)
+        n_lines  = sum(int(draw_num_lines(line_rng, min(chunk_size, size - start), n_products).sum())
+                       for start in range(0, size, chunk_size))
+        jobs.append({
+            'shard':        k,
+            'suffix':       f'_part{k:04d}' if shards > 1 else '',
+            'first_txn':    bounds[k] + 1,
+            'size':         size,
+            'first_line':   line_id,
+            'first_return': return_id,
+            'line_seq':     line_seq,
+            'body_seq':     body_seq,
+        })
+        line_id   += n_lines
+        return_id += int(size * pct)
+    return jobs
+
+def run_shard(job, dims, chunk_size=CHUNK_SIZE, fmt='csv'):
+    """Generate one shard's sales, lines, payments and returns into its own part files."""
+    rng      = np.random.default_rng(job['body_seq'])
+    line_rng = np.random.default_rng(job['line_seq'])
+    suffix   = job['suffix']
+    index    = TxnIndex()
+    with TableWriter('sales_transaction', fmt, suffix) as txn_out, \
+         TableWriter('sales_line', fmt, suffix) as line_out, \
+         TableWriter('payment', fmt, suffix) as pay_out:
+        for txns, lines, payments in gen_sales_columnar(
+                rng, dims, job['size'], chunk_size,
+                job['first_txn'], job['first_line'], line_rng):
+            index.add(txns)
+            txn_out.write(txns)
+            line_out.write(lines)
+            pay_out.write(payments)
+
+    with TableWriter('return_transaction', fmt, suffix) as ret_out:
+        for chunk in gen_returns_columnar(rng, index, chunk_size=chunk_size,
+                                          first_return=job['first_return']):
+            ret_out.write(chunk)
+    return job['shard']
 
 # ── Main ─────────────────────────────────────────────────────
+def parse_args():
+    parser = argparse.ArgumentParser(description='Generate retail chain OLTP CSVs.')
+    parser.add_argument('--engine', choices=['python', 'numpy'], default='python',
+                        help='python: row-by-row dicts; numpy: vectorised columnar sales tables')
+    parser.add_argument('--transactions', type=int, default=3000,
+                        help='number of sales transactions to generate')
+    parser.add_argument('--locations', type=int, default=50)
+    parser.add_argument('--customers', type=int, default=500,
+                        help='numpy engine builds customers from vocab pools, so millions are cheap')
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help='transactions generated and written per chunk (bounds peak memory)')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help='csv: data/csv/*.csv; parquet: typed, snappy-compressed data/parquet/*.parquet')
+    parser.add_argument('--seed', type=int, default=SEED,
+                        help='base seed; shard seeds are derived from it')
+    parser.add_argument('--as-of', type=date.fromisoformat, default=AS_OF,
+                        help='date the data is generated "as of" (YYYY-MM-DD): ages, snapshot dates, timestamps')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes generating sales shards in parallel (numpy engine)')
+    parser.add_argument('--shards', type=int, default=None,
+                        help='number of *_partNNNN.csv shards (default: --workers); '
+                             'output depends only on --seed and --shards')
+    args = parser.parse_args()
+    args.shards = args.shards or args.workers
+    if args.engine != 'numpy' and args.shards > 1:
+        parser.error('--workers/--shards > 1 require --engine numpy')
+    return args
+
 def main():
-    print("Generating retail chain data...")
-
-    locations   = gen_locations(50)
-    stores      = gen_stores(locations, 20)
-    customers   = gen_customers(locations, 500)
-    categories  = gen_categories()
-    products    = gen_products(200)
-    txns, lines, payments = gen_sales(stores, customers, products, 3000)
-    returns     = gen_returns(txns, stores, customers)
-    inventory   = gen_inventory(stores, products)
-
-    write_csv('location.csv',           locations)
-    write_csv('store.csv',              stores)
-    write_csv('customer.csv',           customers)
-    write_csv('product_category.csv',   categories)
-    write_csv('product.csv',            products)
-    write_csv('sales_transaction.csv',  txns)
-    write_csv('sales_line.csv',         lines)
-    write_csv('payment.csv',            payments)
-    write_csv('return_transaction.csv', returns)
-    write_csv('inventory.csv',          inventory)
-
-    print(f"\nDone. Files in: {os.path.abspath(OUTPUT_DIR)}")
+    args = parse_args()
+    random.seed(args.seed)
+    Faker.seed(args.seed)
+    print(f"Generating retail chain data ({args.engine} engine)...")
+
+    if args.engine == 'numpy':
+        # Pool-backed columnar dims; stores stay row-based (there are only a few).
+        # Own entropy (seed, 1), so dims do not depend on --shards like the shard seeds do.
+        rng         = np.random.default_rng([args.seed, 1])
+        pools       = FakePools(args.seed)
+        locations   = gen_locations_columnar(rng, pools, args.locations, args.as_of)
+        stores      = gen_stores(locations[['location_id']].to_dict('records'), 20)
+        customers   = gen_customers_columnar(rng, pools, locations['location_id'].to_numpy(), args.customers,
+                                             args.as_of)
+        categories  = gen_categories()
+        products    = gen_products_columnar(rng, pools, args.products)
+    else:
+        locations   = gen_locations(args.locations, args.as_of)
+        stores      = gen_stores(locations, 20)
+        customers   = gen_customers(locations, args.customers, args.as_of)
+        categories  = gen_categories()
+        products    = gen_products(args.products)
+
+    fmt = args.format
+    write_table('location',             locations,  fmt)
+    write_table('store',                stores,     fmt)
+    write_table('customer',             customers,  fmt)
+    write_table('product_category',     categories, fmt)
+    write_table('product',              products,   fmt)
+
+    if args.engine == 'numpy':
+        dims = sales_dims(stores, customers, products)
+        jobs = shard_plan(args.seed, args.transactions, args.shards, len(products), args.chunk_size)
+        if args.workers > 1:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                n = len(jobs)
+                for _ in pool.map(run_shard, jobs, [dims] * n, [args.chunk_size] * n, [fmt] * n):
+                    pass
+        else:
+            for job in jobs:
+                run_shard(job, dims, args.chunk_size, fmt)
+    else:
+        # Sales tables are written chunk by chunk; only the compact index is kept.
+        index = TxnIndex()
+        with TableWriter('sales_transaction', fmt) as txn_out, \
+             TableWriter('sales_line', fmt) as line_out, \
+             TableWriter('payment', fmt) as pay_out:
+            for txns, lines, payments in gen_sales(stores, customers, products,
+                                                   args.transactions, args.chunk_size):
+                index.add(txns)
+                txn_out.write(txns)
+                line_out.write(lines)
+                pay_out.write(payments)
+
+        with TableWriter('return_transaction', fmt) as ret_out:
+            for chunk in gen_returns(index, chunk_size=args.chunk_size):
+                ret_out.write(chunk)
+
+    if isinstance(products, pd.DataFrame):
+        products = products[['product_id']].to_dict('records')
+    write_table('inventory',            gen_inventory(stores, products, args.as_of), fmt)
+
+    print(f"\nDone. Files in: {os.path.abspath(os.path.join(DATA_DIR, fmt))}")
 
 if __name__ == '__main__':
     main()
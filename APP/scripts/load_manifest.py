@@ -0,0 +1,146 @@
+"""
+Load Manifest
+Per-file record of what snowflake_loader has staged, copied and verified.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+# Local record of what has been staged and loaded, one entry per source file:
+# content hash, size, mtime, target table, status, the staged file names and
+# the last error. Each file moves through
+#   pending  → planned, nothing staged yet
+#   uploaded → PUT done (staged names known), COPY still outstanding
+#   copied   → COPY INTO ran over the staged files (rows_loaded from its result)
+#   verified → the raw table holds the rows COPY reported for the file
+#   invalid  → failed validation as a whole, never uploaded (errors kept in the entry)
+# Every transition is saved at once, so a run that dies or gives up resumes
+# each file where it stopped: uploaded ones at COPY, copied ones at the check.
+# Unchanged verified and invalid files are skipped.
+MANIFEST_NAME = 'load_manifest.json'
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+class LoadManifest:
+    # Where a run picks each file up, by its status.
+    RESUME_AT = {'pending': 'upload', 'uploaded': 'copy', 'copied': 'check',
+                 'verified': 'skip', 'invalid': 'invalid'}
+
+    def __init__(self, path: str):
+        self.path    = path
+        self.entries = {}
+        self._lock   = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+        for entry in self.entries.values():
+            if entry['status'] == 'loaded':       # written before files were verified
+                entry['status'] = 'verified'
+
+    def check(self, src: str, table_name: str, stage: str = None) -> dict:
+        """
+        Entry for src, refreshed against the file on disk. The hash is reused
+        while size and mtime are unchanged; new or changed content resets the
+        entry to pending, as does an upload to a stage path COPY no longer reads.
+        """
+        stat  = os.stat(src)
+        key   = os.path.basename(src)
+        entry = self.entries.get(key)
+        if not entry or (entry['size'], entry['mtime']) != (stat.st_size, stat.st_mtime):
+            digest = file_hash(src)
+            if entry and entry['hash'] == digest and entry['table'] == table_name:
+                entry.update(size=stat.st_size, mtime=stat.st_mtime)
+            else:
+                entry = {'hash': digest, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                         'table': table_name, 'status': 'pending', 'staged': []}
+        if entry['status'] == 'uploaded' and entry.get('stage') != stage:
+            entry['status'] = 'pending'
+        entry['stage'] = stage
+        with self._lock:
+            self.entries[key] = entry
+        return entry
+
+    def mark(self, src: str, status: str, staged: list = None, **fields):
+        """Move src to status and save; extra fields (errors, rows_loaded, error) are stored with it."""
+        with self._lock:
+            entry = self.entries[os.path.basename(src)]
+            entry.pop('error', None)
+            entry['status']     = status
+            entry['updated_at'] = datetime.now().isoformat(timespec='seconds')
+            if staged is not None:
+                entry['staged'] = staged
+            entry.update(fields)
+            self._save()
+
+    def status(self, src: str) -> str:
+        with self._lock:
+            return self.entries[os.path.basename(src)]['status']
+
+    def entry(self, src: str) -> dict:
+        with self._lock:
+            return dict(self.entries[os.path.basename(src)])
+
+    def resume_at(self, src: str) -> str:
+        return self.RESUME_AT[self.status(src)]
+
+    def finished(self, src: str) -> bool:
+        return self.status(src) in ('verified', 'invalid')
+
+    # ── Transitions ──────────────────────────────────────────
+    def validated(self, src: str, rows: int):
+        """Prevalidation passed rows good rows; the check falls back on them."""
+        self.mark(src, 'pending', rows=rows)
+
+    def invalid(self, src: str, errors: list):
+        self.mark(src, 'invalid', errors=errors)
+
+    def uploaded(self, src: str, staged: list):
+        self.mark(src, 'uploaded', sorted(staged))
+
+    def copied(self, src: str, loaded: dict):
+        """COPY ran over src's staged files; loaded is rows per staged name from its results."""
+        rows = [loaded.get(name) for name in self.entry(src)['staged']]
+        self.mark(src, 'copied', rows_loaded=None if None in rows else sum(rows))
+
+    def verify(self, src: str, found: int) -> str:
+        """
+        Compare the rows found in the raw table for src with COPY's own count,
+        or, when COPY reported none (a retried COPY skips files it already
+        loaded), with the rows prevalidation accepted. Marks src verified and
+        returns None, or keeps it copied and returns the mismatch.
+        """
+        entry  = self.entry(src)
+        expect = entry.get('rows_loaded')
+        expect = entry.get('rows') if expect is None else expect
+        if found == expect or (expect is None and found):
+            self.mark(src, 'verified', rows_loaded=found)
+            return None
+        error = f"{found:,} rows in {entry['table']}, expected {expect if expect is not None else 'some'}"
+        self.failed(src, f'verify: {error}')
+        return error
+
+    def failed(self, src: str, error: str):
+        """Record error for src; it keeps its last good status, so the next run retries from there."""
+        with self._lock:
+            entry = self.entries[os.path.basename(src)]
+            entry['error']      = error
+            entry['failures']   = entry.get('failures', 0) + 1
+            entry['updated_at'] = datetime.now().isoformat(timespec='seconds')
+            self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
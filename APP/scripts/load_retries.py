@@ -0,0 +1,147 @@
+"""
+Load Retries
+Retry with backoff and a shared circuit breaker for snowflake_loader's
+statements, plus the execute / execute_async / query_results wrappers it runs
+them through.
+"""
+import os
+import random
+import threading
+import time
+import uuid
+
+from snowflake.connector.errors import InterfaceError, OperationalError
+
+# Every statement is retried on transient connector/network errors with
+# exponential backoff and full jitter. PUT (OVERWRITE=TRUE), COPY (load metadata
+# skips files already loaded) and the verify SELECT are all safe to repeat, even
+# when only the response was lost. An async COPY whose response was lost is
+# looked up in QUERY_HISTORY by its tag before it is submitted again, so the
+# query id tracked is the one doing the load. All workers share one breaker: after
+# BREAKER_FAILURES failures in a row it opens, statements wait out the cooldown,
+# and then a single trial statement decides whether it closes again.
+# BREAKER_TRIPS openings without a success in between stop the run.
+RETRY_ATTEMPTS     = int(os.getenv('LOAD_RETRY_ATTEMPTS', 5))
+RETRY_BASE_S       = float(os.getenv('LOAD_RETRY_BASE_SECONDS', 1))
+RETRY_MAX_S        = float(os.getenv('LOAD_RETRY_MAX_SECONDS', 60))
+BREAKER_FAILURES   = int(os.getenv('LOAD_BREAKER_FAILURES', 5))
+BREAKER_COOLDOWN_S = float(os.getenv('LOAD_BREAKER_COOLDOWN_SECONDS', 30))
+BREAKER_TRIPS      = int(os.getenv('LOAD_BREAKER_TRIPS', 3))
+TRANSIENT          = (OperationalError, InterfaceError, ConnectionError, TimeoutError)
+
+class CircuitOpen(Exception):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN_S, trips=BREAKER_TRIPS):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.trips    = trips
+        self.state    = 'closed'
+        self._failed  = 0         # failures in a row while closed
+        self._tripped = 0         # openings since the last success
+        self._opened  = 0.0
+        self._trial   = False     # the half-open trial statement is running
+        self._cond    = threading.Condition()
+
+    def acquire(self):
+        """Wait until a statement may run; raises CircuitOpen once the run should stop."""
+        with self._cond:
+            while True:
+                if self._tripped >= self.trips:
+                    raise CircuitOpen(f'circuit opened {self._tripped} times without a success')
+                if self.state == 'closed':
+                    return
+                if self.state == 'open':
+                    left = self._opened + self.cooldown - time.monotonic()
+                    if left > 0:
+                        self._cond.wait(left)
+                        continue
+                    self.state = 'half-open'
+                if not self._trial:
+                    self._trial = True
+                    return
+                self._cond.wait()
+
+    def success(self):
+        with self._cond:
+            self.state, self._failed, self._tripped, self._trial = 'closed', 0, 0, False
+            self._cond.notify_all()
+
+    def failure(self):
+        with self._cond:
+            if self.state == 'open':
+                return            # a statement that started before the circuit opened
+            self._failed += 1
+            if self.state == 'half-open' or self._failed >= self.failures:
+                self.state, self._failed, self._trial = 'open', 0, False
+                self._opened   = time.monotonic()
+                self._tripped += 1
+                print(f"  Circuit open, pausing {self.cooldown:g}s ({self._tripped}/{self.trips})")
+            self._cond.notify_all()
+
+def with_retries(fn, breaker: CircuitBreaker = None, attempts: int = RETRY_ATTEMPTS):
+    """Call fn(), retrying transient failures with backoff."""
+    for attempt in range(1, attempts + 1):
+        if breaker:
+            breaker.acquire()
+        try:
+            result = fn()
+        except TRANSIENT as exc:
+            if breaker:
+                breaker.failure()
+            if attempt == attempts:
+                raise
+            delay = random.uniform(0, min(RETRY_MAX_S, RETRY_BASE_S * 2 ** (attempt - 1)))
+            print(f"  Retry {attempt}/{attempts - 1} in {delay:.1f}s: {str(exc).splitlines()[0]}")
+            time.sleep(delay)
+        except Exception:
+            if breaker:
+                breaker.success()     # the warehouse answered, the statement itself is wrong
+            raise
+        else:
+            if breaker:
+                breaker.success()
+            return result
+
+def execute(conn, sql: str, breaker: CircuitBreaker = None, attempts: int = RETRY_ATTEMPTS) -> list:
+    """Run sql and return its rows."""
+    def run():
+        with conn.cursor() as cs:
+            cs.execute(sql)
+            return cs.fetchall()
+    return with_retries(run, breaker, attempts)
+
+QUERY_LOOKUP_SQL = ("SELECT query_id FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY(RESULT_LIMIT => 10000)) "
+                    "WHERE STARTSWITH(query_text, '{tag}') ORDER BY start_time LIMIT 1")
+
+def execute_async(conn, sql: str, breaker: CircuitBreaker = None) -> str:
+    """
+    Submit sql without waiting for it to run; returns its query id. The
+    statement is sent behind a unique comment, and every retry first looks
+    that up, so a query whose response was lost is adopted, not run twice.
+    """
+    tag  = f'/* loader {uuid.uuid4().hex} */'
+    sent = False
+    def run():
+        nonlocal sent
+        if sent:
+            with conn.cursor() as cs:
+                cs.execute(QUERY_LOOKUP_SQL.format(tag=tag))
+                found = cs.fetchone()
+            if found:
+                print(f"  Found query {found[0]} already submitted; tracking it")
+                return found[0]
+        sent = True
+        with conn.cursor() as cs:
+            cs.execute_async(f'{tag}\n{sql}')
+            return cs.sfqid
+    return with_retries(run, breaker)
+
+def query_results(conn, query_id: str, breaker: CircuitBreaker = None) -> list:
+    """Rows of a finished query; raises the query's own error if it failed."""
+    def run():
+        with conn.cursor() as cs:
+            cs.get_results_from_sfqid(query_id)
+            return cs.fetchall()
+    return with_retries(run, breaker)
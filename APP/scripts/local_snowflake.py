@@ -0,0 +1,295 @@
+"""
+Local Snowflake Stand-in
+Minimal connector for running snowflake_loader end to end without an account.
+PUT copies files into one directory per stage and sub-path (gzipping with
+AUTO_COMPRESS=TRUE), COPY INTO counts the staged rows under its FROM path and
+answers with Snowflake's COPY result columns, skipping files it has already
+loaded. Load metadata and rows per file are kept in root/_load_history.json, so
+the loader's check query (rows per _stg_file_name) works across runs. Other
+statements are accepted and ignored. execute_async runs a statement on its own
+thread under a query id that get_query_status and get_results_from_sfqid
+answer for, like the real connector, and the loader's QUERY_HISTORY lookup
+finds async statements by the comment they start with.
+
+connect(root, fail_rate=0.2, seed=1) makes PUT, COPY and SELECT fail like a
+flaky network: half the faults hit before the statement runs (request lost),
+half after it ran (response lost), so retries have to be idempotent.
+outage=N fails the first N statements outright, enough to open the loader's
+circuit breaker.
+
+Usage: python scripts/snowflake_loader.py csv --local /tmp/local_stage [--fail-rate 0.2]
+"""
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+
+import pyarrow.parquet as pq
+from snowflake.connector.connection import SnowflakeConnection
+from snowflake.connector.constants import QueryStatus
+from snowflake.connector.errors import OperationalError, ProgrammingError
+
+def _option(sql, name, default=None):
+    m = re.search(rf"{name}\s*=\s*'?(\w+)'?", sql, re.IGNORECASE)
+    return m.group(1).upper() if m else default
+
+def _md5(path):
+    h = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _verb(sql):
+    return re.sub(r'^\s*/\*.*?\*/', '', sql, flags=re.DOTALL).split(None, 1)[0].upper()
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+class FaultInjector:
+    def __init__(self, rate=0.0, seed=None, outage=0):
+        self.rate     = rate
+        self.outage   = outage      # statements left to fail outright
+        self.injected = 0
+        self._rng     = random.Random(seed)
+        self._lock    = threading.Lock()
+
+    def check(self, verb, when):
+        """Raise OperationalError for a statement `before` it runs or `after` it ran."""
+        if verb not in ('PUT', 'COPY', 'SELECT'):
+            return
+        with self._lock:
+            if when == 'before' and self.outage > 0:
+                self.outage -= 1
+                fail = True
+            else:
+                fail = self._rng.random() < self.rate / 2
+            self.injected += fail
+        if fail:
+            lost = 'request' if when == 'before' else 'response'
+            raise OperationalError(msg=f'{verb}: connection reset, {lost} lost (injected fault)')
+
+class Connection:
+    def __init__(self, root, faults=None):
+        self.root     = root
+        self.faults   = faults or FaultInjector()
+        self.loaded   = {}   # (table, staged file) → md5, COPY load metadata
+        self.rows     = {}   # table → rows loaded
+        self.files    = {}   # (table, METADATA$FILENAME) → rows loaded from it
+        self.queries  = {}   # query id → {verb, text, thread, rows, error}
+        self._lock    = threading.Lock()
+        self._history = os.path.join(root, '_load_history.json')
+        os.makedirs(root, exist_ok=True)
+        if os.path.exists(self._history):
+            with open(self._history) as f:
+                saved = json.load(f)
+            self.loaded = {tuple(k.split('|', 1)): v for k, v in saved['loaded'].items()}
+            self.files  = {tuple(k.split('|', 1)): v for k, v in saved['files'].items()}
+            self.rows   = saved['rows']
+
+    def save(self):
+        # Called with _lock held.
+        saved = {'loaded': {'|'.join(k): v for k, v in self.loaded.items()},
+                 'files':  {'|'.join(k): v for k, v in self.files.items()},
+                 'rows':   self.rows}
+        with open(self._history + '.tmp', 'w') as f:
+            json.dump(saved, f)
+        os.replace(self._history + '.tmp', self._history)
+
+    def cursor(self):
+        return Cursor(self)
+
+    def start(self, verb, sql):
+        query_id = str(uuid.uuid4())
+        query    = {'verb': verb, 'text': sql, 'rows': None, 'error': None}
+        def run():
+            try:
+                query['rows'] = Cursor(self).run(verb, sql)
+            except Exception as exc:
+                query['error'] = exc
+        query['thread'] = threading.Thread(target=run, daemon=True)
+        self.queries[query_id] = query
+        query['thread'].start()
+        return query_id
+
+    def get_query_status(self, query_id):
+        query = self.queries[query_id]
+        if query['thread'].is_alive():
+            return QueryStatus.RUNNING
+        return QueryStatus.FAILED_WITH_ERROR if query['error'] else QueryStatus.SUCCESS
+
+    def get_query_status_throw_if_error(self, query_id):
+        status = self.get_query_status(query_id)
+        if self.is_an_error(status):
+            raise ProgrammingError(msg=str(self.queries[query_id]['error']), sfqid=query_id)
+        return status
+
+    is_still_running = staticmethod(SnowflakeConnection.is_still_running)
+    is_an_error      = staticmethod(SnowflakeConnection.is_an_error)
+
+    def close(self):
+        pass
+
+    def stage_dir(self, stage):
+        # @SCHEMA.STAGE/sub/path/ → root/STAGE/sub/path
+        name, _, sub = stage.split('.')[-1].partition('/')
+        path = os.path.join(self.root, name.upper(), *filter(None, sub.split('/')))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+class Cursor:
+    def __init__(self, conn):
+        self.conn     = conn
+        self.sfqid    = None
+        self._results = []
+
+    def execute(self, sql, params=None):
+        verb = _verb(sql)
+        self.conn.faults.check(verb, 'before')
+        results = self.run(verb, sql)
+        self.conn.faults.check(verb, 'after')
+        self._results = results
+        return self
+
+    def execute_async(self, sql, params=None):
+        verb = _verb(sql)
+        self.conn.faults.check(verb, 'before')
+        self.sfqid = self.conn.start(verb, sql)
+        self.conn.faults.check(verb, 'after')
+        return {'queryId': self.sfqid}
+
+    def get_results_from_sfqid(self, query_id):
+        query = self.conn.queries[query_id]
+        query['thread'].join()
+        self.conn.get_query_status_throw_if_error(query_id)
+        self.conn.faults.check(query['verb'], 'after')
+        self.sfqid    = query_id
+        self._results = list(query['rows'])
+
+    def run(self, verb, sql):
+        if verb == 'PUT':
+            return self._put(sql)
+        if verb == 'COPY':
+            return self._copy(sql)
+        if verb == 'SELECT':
+            return self._select(sql)
+        return [('Statement executed successfully.',)]
+
+    def fetchall(self):
+        rows, self._results = self._results, []
+        return rows
+
+    def fetchone(self):
+        return self._results.pop(0) if self._results else None
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── PUT ──────────────────────────────────────────────────
+    def _put(self, sql):
+        m = re.match(r"\s*PUT\s+file://(\S+)\s+@(\S+)", sql, re.IGNORECASE)
+        src, stage = m.group(1), m.group(2)
+        compress   = _option(sql, 'AUTO_COMPRESS', 'TRUE') == 'TRUE' and not src.endswith('.gz')
+        overwrite  = _option(sql, 'OVERWRITE', 'FALSE') == 'TRUE'
+        name       = os.path.basename(src) + ('.gz' if compress else '')
+        target     = os.path.join(self.conn.stage_dir(stage), name)
+        if os.path.exists(target) and not overwrite:
+            status = 'SKIPPED'
+        else:
+            # mtime=0 keeps the gzip bytes (and so the md5) stable across re-uploads.
+            with open(src, 'rb') as fin, open(target, 'wb') as raw, \
+                 (gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) if compress else raw) as fout:
+                shutil.copyfileobj(fin, fout, 1 << 20)
+            status = 'UPLOADED'
+        return [(os.path.basename(src), name, os.path.getsize(src), os.path.getsize(target),
+                 'NONE', 'GZIP' if compress else 'NONE', status, '')]
+
+    # ── COPY INTO ────────────────────────────────────────────
+    def _copy(self, sql):
+        table   = re.search(r"COPY\s+INTO\s+([\w.]+)", sql, re.IGNORECASE).group(1).split('.')[-1]
+        stage   = re.search(r"FROM\s+@([\w./]+)", sql, re.IGNORECASE).group(1)
+        pattern = re.search(r"PATTERN\s*=\s*'([^']*)'", sql, re.IGNORECASE)
+        files   = re.search(r"FILES\s*=\s*\(([^)]*)\)", sql, re.IGNORECASE)
+        parquet = _option(sql, 'TYPE') == 'PARQUET'
+        skip    = int(_option(sql, 'SKIP_HEADER', '0'))
+        width   = max(map(int, re.findall(r'\$(\d+)', sql)), default=0)
+
+        stage_dir = self.conn.stage_dir(stage)
+        sub_path  = stage.split('/', 1)[1].strip('/') + '/' if '/' in stage.strip('/') else ''
+        names     = sorted(os.listdir(stage_dir))
+        if files:
+            wanted = {f.strip().strip("'") for f in files.group(1).split(',')}
+            names  = [n for n in names if n in wanted]
+        if pattern:
+            names  = [n for n in names if re.fullmatch(pattern.group(1), n)]
+
+        results = []
+        for name in names:
+            path = os.path.join(stage_dir, name)
+            md5  = _md5(path)
+            key  = (table, name)
+            with self.conn._lock:
+                if self.conn.loaded.get(key) == md5:
+                    continue
+            parsed, errors, first_error = self._count(path, parquet, skip, width)
+            with self.conn._lock:
+                self.conn.loaded[key] = md5
+                self.conn.rows[table] = self.conn.rows.get(table, 0) + parsed - errors
+                self.conn.files[(table, sub_path + name)] = parsed - errors
+                self.conn.save()
+            status = 'LOADED' if not errors else 'PARTIALLY_LOADED'
+            results.append((f'{stage.split(".")[-1].strip("/").lower()}/{name}', status, parsed, parsed - errors,
+                            parsed, errors, first_error, None, None, None))
+        return results or [('Copy executed with 0 files processed.',)]
+
+    # ── SELECT ───────────────────────────────────────────────
+    def _select(self, sql):
+        # Only the loader's QUERY_HISTORY lookup and its check: SELECT
+        # _stg_file_name, COUNT(*) FROM T WHERE _stg_file_name IN (...) GROUP BY _stg_file_name
+        if 'QUERY_HISTORY' in sql.upper():
+            prefix = re.search(r"STARTSWITH\(query_text,\s*'([^']*)'\)", sql, re.IGNORECASE).group(1)
+            return [(query_id,) for query_id, q in list(self.conn.queries.items())
+                    if q['text'].startswith(prefix)][:1]
+        table = re.search(r"FROM\s+([\w.]+)", sql, re.IGNORECASE).group(1).split('.')[-1]
+        names = re.findall(r"'([^']*)'", sql)
+        with self.conn._lock:
+            return [(n, self.conn.files[(table, n)]) for n in names if self.conn.files.get((table, n))]
+
+    @staticmethod
+    def _count(path, parquet, skip, width):
+        if parquet:
+            return pq.ParquetFile(path).metadata.num_rows, 0, None
+        parsed = errors = 0
+        first_error = None
+        with _open_text(path) as f:
+            reader = csv.reader(f)
+            for _ in range(skip):
+                next(reader, None)
+            for row in reader:
+                parsed += 1
+                if width and len(row) < width:
+                    errors += 1
+                    first_error = first_error or (
+                        f'Number of columns in file ({len(row)}) does not match '
+                        f'that of the corresponding table ({width})')
+        return parsed, errors, first_error
+
+def connect(root=None, fail_rate=0.0, seed=None, outage=0, **_):
+    return Connection(root or os.path.join(tempfile.gettempdir(), 'retail_local_stage'),
+                      FaultInjector(fail_rate, seed, outage))
@@ -0,0 +1,460 @@
+"""
+Local Warehouse (DuckDB)
+Builds RETAIL_DW in a DuckDB file from the CSVs in APP/data by running the
+project's own SQL, translated from Snowflake's dialect at run time:
+  setup     : 02_stage, 03_clean and 04_consumption DDL (DIM_DATE and lookups populated)
+  raw load  : each CSV into its STAGE_LAYER raw table, all VARCHAR (stands in for PUT + COPY)
+  pipeline  : 05_Transformation 01-03 – stage→clean MERGEs, SCD2 dims, fact loads, aggregates
+  archive   : with --archive, 05_stage_retention.sql (TASK_ARCHIVE_STAGE) after the pipeline
+Every statement is timed and the pipeline steps are recorded in TASK_HISTORY
+and TASK_RUN_AUDIT under the Snowflake task that runs them, so
+db.pipeline_version() and the Architecture page work as they do against
+Snowflake. An --update run that finds no new raw rows is skipped, like the
+root task's WHEN condition.
+
+connect() returns a read-only connection whose cursors take Snowflake SQL with
+%s params and hand back Snowflake-typed Arrow results; streamlit_app/db.py
+serves run_query from it when DW_BACKEND=duckdb.
+Needs duckdb 1.4 or later for MERGE INTO (pinned in requirements.txt).
+
+Usage: python scripts/local_warehouse.py [--data-dir data] [--db /tmp/retail_dw.duckdb] [--update] [--archive]
+"""
+import argparse
+import functools
+import glob
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import duckdb
+import pyarrow as pa
+
+from schema_registry import SCHEMAS
+
+APP_DIR  = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQL_DIR  = os.path.join(APP_DIR, 'sql')
+DATA_DIR = os.path.join(APP_DIR, 'data')
+DB_PATH  = os.getenv('DUCKDB_PATH', os.path.join(tempfile.gettempdir(), 'retail_dw.duckdb'))
+CATALOG  = 'retail_dw'
+
+SETUP_FILES = [
+    '02_stage/01_setup_database.sql',
+    '02_stage/02_stage_raw_tables.sql',
+    '03_clean/01_clean_layer_tables.sql',
+    '04_consumption/01_dim_tables.sql',
+    '04_consumption/02_fact_tables.sql',
+]
+PIPELINE_FILES = [
+    ('05_Transformation/01_stage_to_clean_merge.sql', 'TASK_STAGE_TO_CLEAN'),
+    ('05_Transformation/02_scd_type2_dims.sql',       'TASK_LOAD_DIMENSIONS'),
+    ('05_Transformation/03_load_fact_tables.sql',     'TASK_LOAD_FACTS'),
+]
+AGG_TASK = 'TASK_REFRESH_AGGREGATES'     # statements on AGG_* tables in the fact script
+ARCHIVE_FILE = '05_Transformation/05_stage_retention.sql'    # TASK_ARCHIVE_STAGE, daily
+
+# Tables whose streams each task consumes (04_snowflake_tasks.sql); its audit
+# rows count the changes made to them since the task's last run.
+TASK_STREAMS = {
+    'TASK_STAGE_TO_CLEAN':     [f'STG_{t}_RAW' for t in ('LOCATION', 'STORE', 'CUSTOMER', 'PRODUCT_CATEGORY', 'PRODUCT',
+                                                          'SALES_TRANSACTION', 'SALES_LINE', 'PAYMENT', 'RETURN', 'INVENTORY')],
+    'TASK_LOAD_DIMENSIONS':    ['CLN_LOCATION', 'CLN_STORE', 'CLN_CUSTOMER', 'CLN_PRODUCT_CATEGORY', 'CLN_PRODUCT'],
+    'TASK_LOAD_FACTS':         ['CLN_SALES_TRANSACTION', 'CLN_SALES_LINE', 'CLN_PAYMENT', 'CLN_RETURN', 'CLN_INVENTORY'],
+    'TASK_REFRESH_AGGREGATES': ['FACT_SALES', 'FACT_RETURNS'],
+}
+
+RAW_TABLES = {base: t.raw_table for base, t in SCHEMAS.items()}
+
+# Snowflake-only statements with no local meaning.
+SKIP = re.compile(r'^\s*(USE\s+(ROLE|WAREHOUSE)|CREATE\s+(OR\s+REPLACE\s+)?(WAREHOUSE|DATABASE|STAGE|STREAM|TASK)'
+                  r'|ALTER\s+TASK|COPY\s+INTO|PUT\s|GRANT|CALL\s)', re.IGNORECASE)
+
+
+# ── Statement splitting ──────────────────────────────────────
+def strip_comments(sql: str) -> str:
+    out, quoted = [], False
+    for line in sql.splitlines():
+        kept = []
+        i = 0
+        while i < len(line):
+            ch = line[i]
+            if ch == "'":
+                quoted = not quoted
+            elif not quoted and line.startswith('--', i):
+                break
+            kept.append(ch)
+            i += 1
+        out.append(''.join(kept))
+    return '\n'.join(out)
+
+def split_statements(sql: str) -> list:
+    stmts, buf, quoted, dollar = [], [], False, False
+    sql = strip_comments(sql)
+    i = 0
+    while i < len(sql):
+        if sql.startswith('$$', i) and not quoted:
+            dollar = not dollar
+            buf.append('$$')
+            i += 2
+            continue
+        ch = sql[i]
+        if ch == "'" and not dollar:
+            quoted = not quoted
+        if ch == ';' and not quoted and not dollar:
+            stmts.append(''.join(buf).strip())
+            buf = []
+        else:
+            buf.append(ch)
+        i += 1
+    stmts.append(''.join(buf).strip())
+    return [s for s in stmts if s]
+
+
+# ── Snowflake → DuckDB translation ───────────────────────────
+def _split_args(text):
+    args, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(text):
+        if ch == "'":
+            quoted = not quoted
+        elif not quoted and ch == '(':
+            depth += 1
+        elif not quoted and ch == ')':
+            depth -= 1
+        elif not quoted and ch == ',' and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+    args.append(text[start:].strip())
+    return args
+
+def rewrite_call(sql, name, build):
+    """Replace every NAME(args) call with build(args), innermost calls first."""
+    pattern = re.compile(rf'(?<![\w.]){name}\s*\(', re.IGNORECASE)
+    while True:
+        m = pattern.search(sql)
+        if not m:
+            return sql
+        depth, quoted, i = 1, False, m.end()
+        while depth:
+            ch = sql[i]
+            if ch == "'":
+                quoted = not quoted
+            elif not quoted and ch == '(':
+                depth += 1
+            elif not quoted and ch == ')':
+                depth -= 1
+            i += 1
+        inner = rewrite_call(sql[m.end():i - 1], name, build)
+        sql   = sql[:m.start()] + build(_split_args(inner)) + sql[i:]
+
+def _to_char(args):
+    fmt = args[1].strip("'")
+    for sf, py in (('YYYY', '%Y'), ('MM', '%m'), ('DD', '%d'), ('HH24', '%H'), ('MI', '%M'), ('SS', '%S')):
+        fmt = fmt.replace(sf, py)
+    return f"strftime({args[0]}, '{fmt}')"
+
+CALLS = [
+    ('TRY_TO_NUMBER',    lambda a: f'TRY_CAST({a[0]} AS BIGINT)'),
+    ('TO_NUMBER',        lambda a: f'CAST({a[0]} AS BIGINT)'),
+    ('TRY_TO_DECIMAL',   lambda a: f'TRY_CAST({a[0]} AS DECIMAL({a[1]},{a[2]}))'),
+    ('TRY_TO_TIMESTAMP', lambda a: f'TRY_CAST({a[0]} AS TIMESTAMP)'),
+    ('TRY_TO_DATE',      lambda a: f'TRY_CAST({a[0]} AS DATE)'),
+    ('TO_DATE',          lambda a: f'CAST({a[0]} AS DATE)'),
+    ('TO_CHAR',          _to_char),
+    ('DATEADD',          lambda a: f'({a[2]} + INTERVAL ({a[1]}) {a[0]})'),
+    ('DAYNAME',          lambda a: f"strftime({a[0]}, '%a')"),       # Snowflake: 'Mon'
+    ('MONTHNAME',        lambda a: f"strftime({a[0]}, '%b')"),       # Snowflake: 'Jan'
+]
+
+def _translate_ddl(stmt):
+    table = re.search(r'TABLE\s+([\w.]+)', stmt, re.IGNORECASE).group(1).split('.')[-1]
+    seq   = f'seq_{table.lower()}'
+    stmt  = re.sub(r'\bNUMBER\s+AUTOINCREMENT\s+PRIMARY\s+KEY', f"BIGINT DEFAULT nextval('{seq}')", stmt, flags=re.IGNORECASE)
+    # Snowflake doesn't enforce these; DuckDB would.
+    stmt  = re.sub(r'\s+PRIMARY\s+KEY\b|\s+UNIQUE\b|\s+REFERENCES\s+\w+\s*\(\w+\)', '', stmt, flags=re.IGNORECASE)
+    # Generated columns over CURRENT_DATE can't be materialised; keep them as plain columns.
+    stmt  = re.sub(r'\s+AS\s+\((?=[^\n]*CURRENT_DATE)[^\n]*\)(?=,?\s*$)', '', stmt, flags=re.IGNORECASE | re.MULTILINE)
+    stmt  = re.sub(r'\bNUMBER\s*\((\d+)\s*,\s*(\d+)\)', r'DECIMAL(\1,\2)', stmt, flags=re.IGNORECASE)
+    stmt  = re.sub(r'\bNUMBER\s*\((\d+)\)', r'DECIMAL(\1,0)', stmt, flags=re.IGNORECASE)
+    stmt  = re.sub(r'\bNUMBER\b', 'BIGINT', stmt, flags=re.IGNORECASE)
+    if 'nextval' in stmt:
+        stmt = f'CREATE OR REPLACE SEQUENCE {seq};\n{stmt}'
+    return stmt
+
+def _unqualify_set(stmt):
+    # DuckDB's MERGE ... UPDATE SET takes bare column names.
+    def fix(m):
+        return re.sub(r'(^|,)(\s*)\w+\.(\w+)(\s*=)', r'\1\2\3\4', m.group(0), flags=re.MULTILINE)
+    return re.sub(r'UPDATE\s+SET\b.*?(?=\bWHEN\b|$)', fix, stmt, flags=re.IGNORECASE | re.DOTALL)
+
+@functools.lru_cache(maxsize=512)
+def translate(stmt: str) -> str:
+    """One Snowflake statement as DuckDB SQL ('' when it has no local equivalent)."""
+    if SKIP.match(stmt):
+        return ''
+    m = re.match(r'\s*USE\s+(DATABASE|SCHEMA)\s+([\w.]+)', stmt, re.IGNORECASE)
+    if m:
+        name = m.group(2).split('.')[-1]
+        return f'USE {CATALOG}' if m.group(1).upper() == 'DATABASE' else f'USE {CATALOG}.{name}'
+    if re.match(r'\s*CREATE\s+SCHEMA', stmt, re.IGNORECASE):
+        return re.sub(r'\s+COMMENT\s*=\s*\'[^\']*\'', '', stmt, flags=re.IGNORECASE)
+    m = re.match(r'\s*(CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+[\w.]+)\s+LIKE\s+([\w.]+)\s*$', stmt, re.IGNORECASE)
+    if m:
+        return f'{m.group(1)} AS SELECT * FROM {m.group(2)} LIMIT 0'
+    if re.match(r'\s*CREATE\s+(OR\s+REPLACE\s+)?TABLE', stmt, re.IGNORECASE):
+        stmt = _translate_ddl(stmt)
+
+    stmt = re.sub(r'\bCURRENT_(DATE|TIMESTAMP)\s*\(\s*\)', r'CURRENT_\1', stmt, flags=re.IGNORECASE)
+    stmt = re.sub(r'TABLE\s*\(\s*GENERATOR\s*\(\s*ROWCOUNT\s*=>\s*(\d+)\s*\)\s*\)', r'range(\1)', stmt, flags=re.IGNORECASE)
+    stmt = re.sub(r'\bSEQ[48]\s*\(\s*\)', 'range', stmt, flags=re.IGNORECASE)
+    stmt = re.sub(r'TABLE\s*\(\s*[\w.]*INFORMATION_SCHEMA\.TASK_HISTORY\s*\(\s*TASK_NAME\s*=>\s*([^,)]+)[^)]*\)\s*\)',
+                  rf'(SELECT * FROM {CATALOG}.main.task_history WHERE name = \1)', stmt, flags=re.IGNORECASE)
+    for name, build in CALLS:
+        stmt = rewrite_call(stmt, name, build)
+    if re.match(r'\s*MERGE', stmt, re.IGNORECASE):
+        stmt = _unqualify_set(stmt)
+    return stmt
+
+
+def _initcap(s):
+    # Snowflake INITCAP: upper-case the first letter after whitespace or punctuation.
+    if s is None:
+        return None
+    out, start = [], True
+    for ch in s:
+        out.append(ch.upper() if start else ch.lower())
+        start = not ch.isalnum()
+    return ''.join(out)
+
+def _register(con):
+    con.create_function('initcap', _initcap, ['VARCHAR'], 'VARCHAR', null_handling='special')
+
+
+# ── Build ────────────────────────────────────────────────────
+def run_sql_file(con, path, task=None, history=None, changes=None):
+    with open(path) as f:
+        statements = split_statements(f.read())
+    for stmt in statements:
+        sql = translate(stmt)
+        if not sql:
+            continue
+        verb   = stmt.split(None, 1)[0].upper()
+        target = re.search(r'(?:INTO|TABLE|UPDATE|DELETE\s+FROM)\s+([\w.]+)', stmt, re.IGNORECASE)
+        label  = f"{verb:<8} {target.group(1) if target else ''}"
+        start  = time.perf_counter()
+        result = con.execute(sql)
+        rows   = result.fetchone()[0] if verb in ('INSERT', 'MERGE', 'UPDATE', 'DELETE') else None
+        elapsed = time.perf_counter() - start
+        if history is not None and task:
+            run = history.setdefault(AGG_TASK if 'AGG_' in stmt.upper() else task,
+                                     {'start': datetime.now(), 'seconds': 0.0})
+            run['end']      = datetime.now()
+            run['seconds'] += elapsed
+        if changes is not None and verb in ('INSERT', 'MERGE') and target:
+            table = target.group(1).split('.')[-1].upper()
+            changes[table] = changes.get(table, 0) + rows
+        print(f"  {label:<58} {elapsed:8.3f}s" + (f"  {rows:,} rows" if rows is not None else ''))
+
+def load_raw(con, data_dir) -> dict:
+    """
+    Loads each CSV once – files already in a raw table or its archive are
+    skipped, like COPY's load metadata. Returns {raw table: new rows}.
+    """
+    loaded_rows = {}
+    for base, table in RAW_TABLES.items():
+        loaded = {name for (name,) in con.execute(
+            f'SELECT _stg_file_name FROM {CATALOG}.STAGE_LAYER.{table} UNION '
+            f'SELECT _stg_file_name FROM {CATALOG}.STAGE_LAYER.{table}_ARCHIVE').fetchall()}
+        files  = sorted(glob.glob(os.path.join(data_dir, f'{base}.csv')) +
+                        glob.glob(os.path.join(data_dir, f'{base}_part*.csv')))
+        files  = [f for f in files if os.path.basename(f) not in loaded]
+        if not files:
+            print(f"  {'COPY     ' + table:<58} (no new {base} files)")
+            continue
+        start = time.perf_counter()
+        con.execute(f"""
+            INSERT INTO {CATALOG}.STAGE_LAYER.{table} BY NAME
+            SELECT * EXCLUDE (filename), parse_filename(filename) AS _stg_file_name
+            FROM read_csv(?, header=true, all_varchar=true, filename=true, quote='"', escape='"',
+                          nullstr=['', 'NULL', 'null'])
+        """, [files])
+        rows = con.execute(f'SELECT COUNT(*) FROM {CATALOG}.STAGE_LAYER.{table} '
+                           f'WHERE _stg_file_name IN (SELECT UNNEST(?))',
+                           [[os.path.basename(f) for f in files]]).fetchone()[0]
+        print(f"  {'COPY     ' + table:<58} {time.perf_counter() - start:8.3f}s  {rows:,} rows")
+        loaded_rows[table] = rows
+    return loaded_rows
+
+def record_runs(con, history, changes, skipped=()):
+    """TASK_HISTORY rows for pipeline_version(), TASK_RUN_AUDIT rows for the Architecture page."""
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CATALOG}.main.task_history (
+            name VARCHAR, state VARCHAR, query_start_time TIMESTAMP,
+            completed_time TIMESTAMP, duration_seconds DOUBLE)
+    """)
+    now = datetime.now()
+    for name in skipped:
+        con.execute(f'INSERT INTO {CATALOG}.main.task_history VALUES (?, ?, ?, ?, ?)',
+                    [name, 'SKIPPED', now, now, 0.0])
+    group = uuid.uuid4().hex
+    for name, run in history.items():
+        con.execute(f'INSERT INTO {CATALOG}.main.task_history VALUES (?, ?, ?, ?, ?)',
+                    [name, 'SUCCEEDED', run['start'], run['end'], run['seconds']])
+        for table in TASK_STREAMS[name]:
+            con.execute(f"""
+                INSERT INTO {CATALOG}.CONSUMPTION_LAYER.TASK_RUN_AUDIT
+                    (task_name, run_group_id, table_name, rows_processed, started_ts, completed_ts)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [name, group, table, changes.get(table, 0), run['start'], run['end']])
+
+def build(data_dir=DATA_DIR, db_path=DB_PATH, update=False, archive=False):
+    """
+    Build into a temp file, then swap it in so readers never see a half-built
+    warehouse. With update=True the existing warehouse is copied instead of
+    recreated, and only CSVs it hasn't loaded yet go through the pipeline –
+    one scheduled task run.
+    """
+    tmp = f'{db_path}.building'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    update = update and os.path.exists(db_path)
+    if update:
+        shutil.copyfile(db_path, tmp)
+    con = duckdb.connect()
+    _register(con)
+    con.execute(f"ATTACH '{tmp}' AS {CATALOG}")
+    con.execute(f'USE {CATALOG}')
+    history = {}
+    total   = time.perf_counter()
+    try:
+        if not update:
+            print("\n[setup]")
+            for rel in SETUP_FILES:
+                run_sql_file(con, os.path.join(SQL_DIR, rel))
+            # The raw load below has committed before the pipeline reads it,
+            # so no COPY can land behind the watermark.
+            con.execute(f'UPDATE {CATALOG}.CONSUMPTION_LAYER.ETL_WATERMARK SET settle_minutes = 0')
+        print("\n[raw load]")
+        changes = load_raw(con, data_dir)
+        if update and not any(changes.values()):
+            # The root task's WHEN: no new raw rows, nothing downstream runs. Its
+            # downstream streams are never left over here – a failed build is
+            # thrown away with everything it read.
+            print("\n[pipeline] skipped – no new raw rows")
+            record_runs(con, history, changes, skipped=[PIPELINE_FILES[0][1]])
+        else:
+            print("\n[pipeline]")
+            skipped = []
+            for rel, task in PIPELINE_FILES:
+                # Each child task's WHEN: skip it if its streams saw no changes.
+                if update and not any(changes.get(t) for t in TASK_STREAMS[task]):
+                    skipped.append(task)
+                    continue
+                run_sql_file(con, os.path.join(SQL_DIR, rel), task, history, changes)
+            record_runs(con, history, changes, skipped)
+        if archive:
+            print("\n[archive]")
+            run_sql_file(con, os.path.join(SQL_DIR, ARCHIVE_FILE))
+        counts = {t: con.execute(f'SELECT COUNT(*) FROM {CATALOG}.CONSUMPTION_LAYER.{t}').fetchone()[0]
+                  for t in ('DIM_STORE', 'DIM_CUSTOMER', 'DIM_PRODUCT', 'FACT_SALES', 'FACT_INVENTORY',
+                            'FACT_RETURNS', 'AGG_MONTHLY_STORE_SALES', 'AGG_MONTHLY_PRODUCT_SALES')}
+    finally:
+        con.execute('USE memory')
+        con.execute(f'DETACH {CATALOG}')
+        con.close()
+    os.replace(tmp, db_path)
+
+    print("\n[result]")
+    for table, rows in counts.items():
+        print(f"  {table:<30} {rows:>10,} rows")
+    for name, run in history.items():
+        print(f"  {name:<30} {run['seconds']:>10.3f}s")
+    print(f"  {'total':<30} {time.perf_counter() - total:>10.3f}s → {db_path}")
+
+
+# ── Connector for the dashboard ──────────────────────────────
+def _snowflake_types(table: pa.Table) -> pa.Table:
+    # The Snowflake connector (arrow_number_to_decimal) returns NUMBER(p,0) as
+    # int64 and keeps scaled NUMBERs as decimal128.
+    fields = []
+    for field in table.schema:
+        if pa.types.is_decimal(field.type) and field.type.scale == 0:
+            field = field.with_type(pa.int64())
+        fields.append(field)
+    return table.cast(pa.schema(fields))
+
+class Cursor:
+    def __init__(self, cur):
+        self._cur = cur
+
+    def execute(self, sql, params=None):
+        self._cur.execute(translate(sql.replace('%s', '?')), list(params or []))
+        return self
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetch_arrow_all(self):
+        fetch = getattr(self._cur, 'to_arrow_table', None) or self._cur.fetch_arrow_table
+        table = _snowflake_types(fetch())
+        return table if table.num_rows else None
+
+    def fetch_arrow_batches(self):
+        reader = self._cur.fetch_record_batch()
+        for batch in reader:
+            yield _snowflake_types(pa.Table.from_batches([batch]))
+
+    def close(self):
+        self._cur.close()
+
+class Connection:
+    """Read-only; reopens the file when a rebuild has swapped it."""
+    def __init__(self, path):
+        self.path = path
+        self._open()
+
+    def _open(self):
+        self._mtime = os.path.getmtime(self.path)
+        self._con   = duckdb.connect()
+        _register(self._con)
+        self._con.execute(f"ATTACH '{self.path}' AS {CATALOG} (READ_ONLY)")
+        self._con.execute(f'USE {CATALOG}')
+
+    def cursor(self):
+        if os.path.getmtime(self.path) != self._mtime:
+            self._con.close()
+            self._open()
+        return Cursor(self._con.cursor())
+
+    def is_closed(self):
+        return False
+
+    def close(self):
+        self._con.close()
+
+def connect(path=None, **_):
+    path = path or DB_PATH
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'{path} not built – run scripts/local_warehouse.py')
+    return Connection(path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=DATA_DIR, help='directory holding the generated CSVs')
+    parser.add_argument('--db', default=DB_PATH, help='DuckDB file to build (env DUCKDB_PATH)')
+    parser.add_argument('--update', action='store_true',
+                        help='run the pipeline over new CSVs in an existing build instead of rebuilding')
+    parser.add_argument('--archive', action='store_true',
+                        help='then move processed raw rows older than the retention window to the archive tables')
+    args = parser.parse_args()
+    build(args.data_dir, args.db, args.update, args.archive)
@@ -0,0 +1,476 @@
+"""
+CSV Pre-validation
+Scans CSVs with pyarrow's streaming reader on a process pool before anything is
+staged, and rejects the rows COPY ... ON_ERROR='CONTINUE' would silently drop or
+load wrong:
+  columns : wrong number of fields (a drifted header rejects the whole file)
+  type    : values that do not parse as the column's schema_registry type
+  null    : NULL in a key or NOT NULL column
+  orphan  : foreign key with no parent row (schema_registry.FOREIGN_KEYS)
+Tables are scanned in dependency order. The accepted keys of every referenced
+column are merged into one sorted array, and child files look their foreign
+keys up in it with a binary search, so a rejected parent rejects its children
+too. Rejected rows go to <rejects>/<table>.rejects.csv (file, line, reason,
+record); a file with rejects gets a cleaned copy holding only its good rows.
+Files over VALIDATE_RANGE_MB are cut into byte ranges at record boundaries and
+the ranges are scanned in parallel, so one large file uses every worker.
+
+line is the reader's row number for a malformed row. For the other rejects it
+is a record ordinal: the header is 1, each record counts one, and malformed rows
+with a known number are counted in. Values may contain newlines, so this is
+the physical line only when no earlier value spans lines. In a file scanned in
+ranges, both count from the start of their range plus the records before it.
+
+Usage: python scripts/prevalidate.py [DATA_DIR] [--rejects DIR] [--workers N]
+"""
+import argparse
+import csv
+import glob
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from schema_registry import FOREIGN_KEYS, NULL_VALUES, SCHEMAS, STR, column_names, file_base
+
+WORKERS        = int(os.getenv('VALIDATE_WORKERS', os.cpu_count() or 4))
+BLOCK_BYTES    = 16 << 20          # CSV bytes parsed per batch
+WALK_ROWS      = 64                # failing slices this short are checked value by value
+RANGE_BYTES    = int(float(os.getenv('VALIDATE_RANGE_MB', 128)) * 1e6)   # larger files are scanned in ranges
+REJECT_COLUMNS = ['file', 'line', 'reason', 'record']
+
+# (table, column) pairs some foreign key points at; their accepted values are kept.
+REFERENCED = sorted(set(FOREIGN_KEYS.values()))
+
+def table_levels(bases) -> list:
+    """bases in groups, each table after the tables its foreign keys point at."""
+    deps = {b: {parent for (child, _), (parent, _) in FOREIGN_KEYS.items()
+                if child == b and parent != b and parent in bases} for b in bases}
+    levels, done = [], set()
+    while len(done) < len(deps):
+        level = sorted(b for b, d in deps.items() if b not in done and d <= done)
+        if not level:
+            raise ValueError(f'foreign key cycle among {sorted(set(deps) - done)}')
+        levels.append(level)
+        done |= set(level)
+    return levels
+
+# ── Byte ranges ──────────────────────────────────────────────
+def file_ranges(path, range_bytes: int = RANGE_BYTES) -> list:
+    """
+    [(start, end)] byte ranges of about range_bytes covering path. Like
+    split_csv in snowflake_loader, cuts fall only after a newline with an even
+    number of quotes before it, never inside a quoted value that spans lines.
+    Blocks are only counted for quotes until one holds the next cut.
+    """
+    size = os.path.getsize(path)
+    cuts = [0]
+    pos, quotes = 0, 0
+    with open(path, 'rb') as f:
+        while cuts[-1] + range_bytes < size:
+            block = np.frombuffer(f.read(BLOCK_BYTES), np.uint8)
+            if not len(block):
+                break
+            is_quote = block == ord('"')
+            if pos + len(block) > cuts[-1] + range_bytes:
+                # Running quote count per byte; uint8 wraps at 256, which keeps the parity.
+                even = (np.cumsum(is_quote, dtype=np.uint8) + quotes % 2) % 2 == 0
+                ends = pos + 1 + np.flatnonzero((block == ord('\n')) & even)
+                i = np.searchsorted(ends, cuts[-1] + range_bytes)
+                while i < len(ends) and ends[i] < size:
+                    cuts.append(int(ends[i]))
+                    i = np.searchsorted(ends, cuts[-1] + range_bytes)
+            quotes += int(np.count_nonzero(is_quote))
+            pos    += len(block)
+    return list(zip(cuts, cuts[1:] + [size]))
+
+class FileRange(io.RawIOBase):
+    """Bytes [start, end) of path, read after the file's header line unless start is 0."""
+    def __init__(self, path, start, end):
+        self.file = open(path, 'rb')
+        self.head = b'' if start == 0 else self.file.readline()
+        self.left = end - start
+        self.file.seek(start)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        if self.head:
+            n = min(len(buf), len(self.head))
+            buf[:n], self.head = self.head[:n], self.head[n:]
+            return n
+        n = self.file.readinto(memoryview(buf)[:min(len(buf), self.left)])
+        self.left -= n
+        return n
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+def open_reader(path, names, on_bad_row, include=None, span=None):
+    """
+    Every column as text, NULLs as COPY's NULL_IF sees them; types are checked
+    per batch. With span (start, end) only that byte range is read.
+    """
+    return pa_csv.open_csv(
+        path if span is None else io.BufferedReader(FileRange(path, *span)),
+        read_options=pa_csv.ReadOptions(block_size=BLOCK_BYTES),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True, invalid_row_handler=on_bad_row),
+        convert_options=pa_csv.ConvertOptions(column_types=dict.fromkeys(names, pa.string()),
+                                              null_values=NULL_VALUES, strings_can_be_null=True,
+                                              include_columns=include))
+
+# ── Type and key checks ──────────────────────────────────────
+def _parses(value, target) -> bool:
+    try:
+        pa.scalar(value).cast(target)
+        return True
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return False
+
+def _find_bad(values, target, bad, lo, hi):
+    """Mark in bad the values in [lo, hi) that do not cast; the slice holds at least one."""
+    if hi - lo <= WALK_ROWS:
+        bad[lo:hi] = [v is not None and not _parses(v, target) for v in values.slice(lo, hi - lo).to_pylist()]
+        return
+    mid = (lo + hi) // 2
+    for a, b in ((lo, mid), (mid, hi)):
+        try:
+            pc.cast(values.slice(a, b - a), target)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            _find_bad(values, target, bad, a, b)
+
+def parse_column(values, type_):
+    """
+    (typed values, bool mask of values that do not parse). The whole column is
+    cast at once. When that fails the batch is halved until the failing slices
+    are short enough to walk value by value, so a few bad values cost a few
+    dozen vectorised casts rather than a Python loop over the batch.
+    Decimals are checked like Snowflake's NUMBER(p,s) casts: extra decimals
+    round, too many integer digits fail.
+    """
+    target = pa.float64() if pa.types.is_decimal(type_) else type_
+    try:
+        typed = pc.cast(values, target)
+        bad   = np.zeros(len(values), bool)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        bad   = np.zeros(len(values), bool)
+        _find_bad(values, target, bad, 0, len(values))
+        typed = pc.cast(pc.if_else(pa.array(bad), pa.scalar(None, pa.string()), values), target)
+    if pa.types.is_decimal(type_):
+        with np.errstate(invalid='ignore'):
+            bad |= np.abs(typed.to_numpy(zero_copy_only=False)) >= 10.0 ** (type_.precision - type_.scale)
+    return typed, bad
+
+def in_sorted(keys, values):
+    """Mask of values present in the sorted array keys."""
+    if not len(keys):
+        return np.zeros(len(values), bool)
+    idx = np.minimum(np.searchsorted(keys, values), len(keys) - 1)
+    return keys[idx] == values
+
+def int_values(typed):
+    return pc.fill_null(typed, -1).to_numpy()
+
+# ── Per-file scan (runs in a worker process) ─────────────────
+def scan_file(job: dict) -> dict:
+    """
+    job: path, base, check (False: already loaded, only its keys are read),
+    emit (columns whose accepted values children reference), parents
+    ({column: sorted parent keys .npy}), work (scratch directory), and span
+    (byte range to scan, None for the whole file) with part, its index.
+    Reject lines and ordinals count from the start of the span.
+    """
+    path, base, span = job['path'], job['base'], job['span']
+    fname   = os.path.basename(path)
+    names   = column_names(base)
+    part    = f"{fname}.{job['part']}"
+    result  = {'path': path, 'base': base, 'part': job['part'], 'span': span,
+               'rows': 0, 'rejected': 0, 'reasons': Counter(), 'header': None, 'keys': {},
+               'clean': None, 'rejects': os.path.join(job['work'], 'parts', f'{part}.csv'), 'seconds': 0.0}
+    keys    = {c: [] for c in job['emit']}
+    start   = time.perf_counter()
+
+    def save_keys():
+        for c, parts in keys.items():
+            dest = os.path.join(job['work'], 'keys', f'{part}.{c}.npy')
+            np.save(dest, np.unique(np.concatenate(parts)) if parts else np.empty(0, np.int64))
+            result['keys'][c] = dest
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    if not job['check']:
+        with open_reader(path, names, lambda row: 'skip', include=job['emit'], span=span) as reader:
+            for batch in reader:
+                for c in keys:
+                    typed, bad = parse_column(batch.column(c), SCHEMAS[base].columns[names.index(c)].type)
+                    keys[c].append(np.unique(typed.filter(pa.array(~bad)).drop_null().to_numpy()))
+        return save_keys()
+
+    lock    = threading.Lock()
+    out     = open(result['rejects'], 'w', newline='', encoding='utf-8')
+    rejects = csv.writer(out)
+    buf     = io.StringIO()
+    line    = csv.writer(buf, lineterminator='')
+
+    def record(values):
+        buf.seek(0)
+        buf.truncate()
+        line.writerow(['' if v is None else v for v in values])
+        return buf.getvalue()
+
+    malformed = []                     # reader row numbers of malformed rows
+    def bad_row(row):
+        with lock:
+            if row.number is not None:
+                malformed.append(row.number)
+            rejects.writerow([fname, row.number or '', 'columns', row.text])
+            result['reasons']['columns'] += 1
+        return 'skip'
+
+    parents  = {c: np.load(p, mmap_mode='r') for c, p in job['parents'].items()}
+    dropped  = []                      # ordinals of parsed rows that were rejected
+    ordinal  = 0
+    try:
+        reader = open_reader(path, names, bad_row, span=span)
+    except pa.ArrowInvalid as exc:
+        reader, result['header'] = None, str(exc).splitlines()[0]
+    if reader is not None and reader.schema.names != names:
+        result['header'] = f'columns {reader.schema.names} do not match the registry'
+        reader.close()
+        reader = None
+    if reader is None:
+        # No keys either: children's references to this table go unchecked
+        # rather than all turning into orphans.
+        rejects.writerow([fname, 1, 'header', result['header']])
+        out.close()
+        result['reasons']['header'] = 1
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    with reader:
+        for batch in reader:
+            m      = batch.num_rows
+            bad    = np.zeros(m, bool)
+            reason = np.empty(m, object)
+
+            def flag(mask, label):
+                new = mask & ~bad
+                reason[new] = label
+                np.logical_or(bad, mask, out=bad)
+
+            typed = {}
+            for c in SCHEMAS[base].columns:
+                values = batch.column(c.name)
+                if not c.nullable:
+                    flag(values.is_null().to_numpy(zero_copy_only=False), f'null {c.name}')
+                if c.type != STR:
+                    typed[c.name], wrong = parse_column(values, c.type)
+                    flag(wrong, f'type {c.name}')
+            for c, parent in parents.items():
+                values = int_values(typed[c])
+                flag((values != -1) & ~in_sorted(parent, values), f'orphan {c}')
+
+            if bad.any():
+                rows = batch.filter(pa.array(bad))
+                cols = [rows.column(n).to_pylist() for n in names]
+                with lock:
+                    for n, why, values in zip(np.flatnonzero(bad) + ordinal + 2, reason[bad], zip(*cols)):
+                        rejects.writerow([fname, int(n), why, record(values)])
+                result['reasons'].update(reason[bad].tolist())
+                dropped.append(np.flatnonzero(bad) + ordinal)
+            keep = pa.array(~bad)
+            for c in keys:
+                keys[c].append(np.unique(typed[c].filter(keep).drop_null().to_numpy()))
+            ordinal += m
+    out.close()
+    if malformed and len(result['reasons']) > 1:
+        count_malformed(out.name, sorted(malformed))
+
+    result['rejected'] = sum(result['reasons'].values())
+    result['rows']     = ordinal + result['reasons']['columns']
+    if result['rejected']:
+        # Written even when every row is rejected: another range of the file may keep rows.
+        result['clean'] = write_clean(path, names, np.concatenate(dropped) if dropped else np.empty(0, int),
+                                      os.path.join(job['work'], 'clean', part), span)
+    return save_keys()
+
+def count_malformed(part, malformed):
+    """
+    Shift the ordinals in a reject part past the malformed rows before them:
+    the reader skips those, so the ordinals only counted well-formed records.
+    """
+    # Malformed row i comes right before the record whose ordinal is malformed[i] - i.
+    gaps = np.array(malformed) - np.arange(len(malformed))
+    with open(part, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    for row in rows:
+        if row[2] not in ('columns', 'header'):
+            row[1] = int(row[1]) + int(np.searchsorted(gaps, int(row[1]), side='right'))
+    with open(part, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+
+def write_clean(path, names, dropped, dest, span=None) -> str:
+    """
+    Copy path (or its span) to dest without the rejected rows (malformed ones
+    are skipped by the reader). Only a copy from the start of the file gets
+    the header.
+    """
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    ordinal = 0
+    options = pa_csv.WriteOptions(quoting_style='needed', include_header=span is None or span[0] == 0)
+    with open_reader(path, names, lambda row: 'skip', span=span) as reader, \
+         pa_csv.CSVWriter(dest, reader.schema, write_options=options) as out:
+        for batch in reader:
+            rows = np.arange(ordinal, ordinal + batch.num_rows)
+            out.write_batch(batch.filter(pa.array(~np.isin(rows, dropped))))
+            ordinal += batch.num_rows
+    return dest
+
+def join_parts(path, parts, work) -> dict:
+    """
+    One result for path from the scans of its ranges: reject lines shifted by
+    the records before each range, and a cleaned copy stitched from the
+    ranges' cleaned copies and the untouched bytes of ranges without rejects.
+    A bad header is reported once, from the first range.
+    """
+    fname  = os.path.basename(path)
+    parts  = sorted(parts, key=lambda r: r['part'])
+    if parts[0]['header']:
+        parts = parts[:1]
+    result = {'path': path, 'base': parts[0]['base'], 'rows': 0, 'rejected': 0, 'reasons': Counter(),
+              'header': parts[0]['header'], 'clean': None, 'seconds': max(r['seconds'] for r in parts)}
+    with open(os.path.join(work, 'parts', f'{fname}.csv'), 'w', newline='', encoding='utf-8') as out:
+        rejects = csv.writer(out)
+        for r in parts:
+            with open(r['rejects'], newline='', encoding='utf-8') as f:
+                for row in csv.reader(f):
+                    if row[1]:
+                        row[1] = int(row[1]) + result['rows']
+                    rejects.writerow(row)
+            result['rows']     += r['rows']
+            result['rejected'] += r['rejected']
+            result['reasons'].update(r['reasons'])
+    if result['header'] or not 0 < result['rejected'] < result['rows']:
+        return result
+    if len(parts) == 1:
+        result['clean'] = parts[0]['clean']
+        return result
+    result['clean'] = os.path.join(work, 'clean', fname)
+    with open(result['clean'], 'wb') as out, open(path, 'rb') as src:
+        for r in parts:
+            if r['clean']:
+                with open(r['clean'], 'rb') as f:
+                    shutil.copyfileobj(f, out)
+                continue
+            start, end = r['span']
+            src.seek(start)
+            while start < end:
+                block  = src.read(min(BLOCK_BYTES, end - start))
+                start += len(block)
+                out.write(block)
+    return result
+
+# ── Orchestration ────────────────────────────────────────────
+def merge_rejects(results, reject_dir, work):
+    """One <table>.rejects.csv per scanned table with rejects; stale ones from clean tables are removed."""
+    by_table = {}
+    for r in results.values():
+        by_table.setdefault(r['base'], []).append(r)
+    for base, rs in by_table.items():
+        dest = os.path.join(reject_dir, f'{base}.rejects.csv')
+        if not any(r['rejected'] or r['header'] for r in rs):
+            if os.path.exists(dest):
+                os.remove(dest)
+            continue
+        with open(dest, 'w', newline='', encoding='utf-8') as out:
+            csv.writer(out).writerow(REJECT_COLUMNS)
+            for r in sorted(rs, key=lambda r: r['path']):
+                with open(os.path.join(work, 'parts', f"{os.path.basename(r['path'])}.csv"), encoding='utf-8') as part:
+                    shutil.copyfileobj(part, out)
+
+def validate(paths, reject_dir, work_dir, workers: int = WORKERS, reference=()) -> dict:
+    """
+    Scan the CSVs in paths; files in reference (already loaded) are read for
+    their keys only, so new children can point at old parents. A foreign key
+    whose parent table has no file in either list is not checked. Cleaned
+    copies are written under work_dir.
+
+    Returns {path: {base, rows, rejected, reasons, header, clean, seconds}}
+    where header is set when the whole file was rejected and clean is the
+    cleaned copy to load instead, if any rows were rejected.
+    """
+    for sub in ('parts', 'keys', 'clean'):
+        os.makedirs(os.path.join(work_dir, sub), exist_ok=True)
+    os.makedirs(reject_dir, exist_ok=True)
+    files   = {p: file_base(p) for p in [*paths, *reference] if file_base(p) in SCHEMAS}
+    check   = set(paths)
+    merged  = {}                      # (table, column) → sorted accepted keys .npy
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for level in table_levels(set(files.values())):
+            paths = [path for path, base in sorted(files.items()) if base in level]
+            spans = dict(zip(paths, pool.map(file_ranges, paths)))
+            jobs  = [{'path': path, 'base': files[path], 'check': path in check, 'work': work_dir,
+                      'span': span if len(spans[path]) > 1 else None, 'part': part,
+                      'emit': [c for t, c in REFERENCED if t == files[path]],
+                      'parents': {c: merged[parent] for (t, c), parent in FOREIGN_KEYS.items()
+                                  if t == files[path] and parent in merged}}
+                     for path in paths for part, span in enumerate(spans[path])]
+            done = list(pool.map(scan_file, jobs))
+            for table, c in REFERENCED:
+                parts = [np.load(r['keys'][c]) for r in done if r['base'] == table and c in r['keys']]
+                if parts:
+                    dest = os.path.join(work_dir, 'keys', f'{table}.{c}.npy')
+                    np.save(dest, np.unique(np.concatenate(parts)))
+                    merged[(table, c)] = dest
+            for path in paths:
+                if path in check:
+                    results[path] = join_parts(path, [r for r in done if r['path'] == path], work_dir)
+    merge_rejects(results, reject_dir, work_dir)
+    return results
+
+def print_summary(results: dict, reject_dir: str):
+    tables = {}
+    for r in results.values():
+        t = tables.setdefault(r['base'], {'files': 0, 'rows': 0, 'rejected': 0, 'seconds': 0.0,
+                                           'reasons': Counter()})
+        t['files']    += 1
+        t['rows']     += r['rows']
+        t['rejected'] += r['rejected']
+        t['seconds']   = max(t['seconds'], r['seconds'])
+        t['reasons'].update(r['reasons'])
+    print(f"\n{'table':<22}{'files':>6}{'rows':>14}{'rejected':>10}{'scan s':>8}  reasons")
+    for base, t in sorted(tables.items()):
+        reasons = ', '.join(f'{why} {n:,}' for why, n in t['reasons'].most_common(4))
+        print(f"{base:<22}{t['files']:>6}{t['rows']:>14,}{t['rejected']:>10,}{t['seconds']:>8.2f}  {reasons}")
+    if any(t['reasons'] for t in tables.values()):
+        print(f"Rejected rows written to {os.path.abspath(reject_dir)}/<table>.rejects.csv")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check generated CSVs against schema_registry before staging.')
+    parser.add_argument('data_dir', nargs='?', default=os.path.join(os.path.dirname(__file__), '..', 'data', 'csv'))
+    parser.add_argument('--rejects', help='reject file directory (default: <data dir>/rejects)')
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    args    = parser.parse_args()
+    rejects = args.rejects or os.path.join(args.data_dir, 'rejects')
+    work    = tempfile.mkdtemp(prefix='retail_validate_')
+    try:
+        start   = time.perf_counter()
+        results = validate(sorted(glob.glob(os.path.join(args.data_dir, '*.csv'))), rejects, work, args.workers)
+        print_summary(results, rejects)
+        print(f"Validated {len(results)} files in {time.perf_counter() - start:.2f}s")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    sys.exit(1 if any(r['rejected'] for r in results.values()) else 0)
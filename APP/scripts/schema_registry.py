@@ -0,0 +1,308 @@
+"""
+Schema Registry
+One declaration per source table: its stage, raw table, key and columns (name,
+logical type, nullability), mirroring sql/01_oltp/01_oltp_schema.sql. Everything
+that used to repeat the column lists is generated from it:
+  snowflake_loader.py : CSV / Parquet COPY statements (optionally pruned or typed)
+  generate_data.py    : CSV column order and Parquet schemas
+  02_stage_raw_tables : raw-table DDL (`ddl` prints it, `check` diffs the SQL file)
+validate_file() checks a CSV or Parquet file against its table before upload, so
+a bad file is rejected locally instead of being paid for in the warehouse.
+
+Usage: python scripts/schema_registry.py ddl | copy [--format parquet] [--typed] | check | validate FILE...
+"""
+import argparse
+import csv
+import gzip
+import io
+import os
+import re
+import sys
+from collections import namedtuple
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+SQL_DIR = os.path.join(os.path.dirname(__file__), '..', 'sql')
+
+# ── Registry ─────────────────────────────────────────────────
+Column = namedtuple('Column', 'name type nullable')
+Table  = namedtuple('Table', 'stage raw_table key columns')
+
+ID, INT, STR   = pa.int64(), pa.int32(), pa.string()
+TS, DATE, BOOL = pa.timestamp('s'), pa.date32(), pa.bool_()
+DEC = pa.decimal128
+
+def col(name, type_, nullable=False):
+    return Column(name, type_, nullable)
+
+def null(name, type_):
+    return Column(name, type_, True)
+
+SCHEMAS = {
+    'location': Table('STG_LOCATION_STAGE', 'STG_LOCATION_RAW', ['location_id'], [
+        col('location_id', ID), col('street_address', STR), col('city', STR), col('state', STR),
+        col('zip_code', STR), col('country', STR), col('region', STR),
+        col('created_at', TS), col('updated_at', TS),
+    ]),
+    'store': Table('STG_STORE_STAGE', 'STG_STORE_RAW', ['store_id'], [
+        col('store_id', ID), col('store_code', STR), col('store_name', STR), col('store_type', STR),
+        col('location_id', ID), null('manager_name', STR), null('phone_number', STR), null('email', STR),
+        col('open_date', DATE), null('close_date', DATE), col('is_active', BOOL),
+        null('square_footage', INT), col('created_at', TS), col('updated_at', TS),
+    ]),
+    'customer': Table('STG_CUSTOMER_STAGE', 'STG_CUSTOMER_RAW', ['customer_id'], [
+        col('customer_id', ID), col('customer_code', STR), col('first_name', STR), col('last_name', STR),
+        col('email', STR), null('phone_number', STR), null('date_of_birth', DATE), null('gender', STR),
+        col('loyalty_tier', STR), col('loyalty_points', INT), col('registration_date', DATE),
+        null('location_id', ID), col('is_active', BOOL), col('created_at', TS), col('updated_at', TS),
+    ]),
+    'product_category': Table('STG_PRODUCT_STAGE', 'STG_PRODUCT_CATEGORY_RAW', ['category_id'], [
+        col('category_id', ID), col('category_code', STR), col('category_name', STR),
+        null('parent_category_id', ID), null('description', STR), col('is_active', BOOL),
+        col('created_at', TS),
+    ]),
+    'product': Table('STG_PRODUCT_STAGE', 'STG_PRODUCT_RAW', ['product_id'], [
+        col('product_id', ID), col('product_code', STR), col('sku', STR), col('product_name', STR),
+        col('category_id', ID), null('supplier_id', ID), col('unit_cost', DEC(10, 2)),
+        col('unit_price', DEC(10, 2)), col('discount_pct', DEC(5, 2)), null('weight_kg', DEC(8, 3)),
+        null('brand', STR), null('size', STR), null('color', STR), col('is_perishable', BOOL),
+        col('is_active', BOOL), null('launch_date', DATE), null('discontinue_date', DATE),
+        col('created_at', TS), col('updated_at', TS),
+    ]),
+    'sales_transaction': Table('STG_SALES_STAGE', 'STG_SALES_TRANSACTION_RAW', ['transaction_id'], [
+        col('transaction_id', ID), col('transaction_code', STR), col('transaction_date', TS),
+        col('store_id', ID), null('customer_id', ID), null('cashier_id', INT),
+        col('transaction_type', STR), col('channel', STR), col('subtotal_amount', DEC(12, 2)),
+        col('discount_amount', DEC(12, 2)), col('tax_amount', DEC(12, 2)),
+        col('total_amount', DEC(12, 2)), col('loyalty_points_earned', INT),
+        col('loyalty_points_redeemed', INT), null('notes', STR), col('created_at', TS),
+    ]),
+    'sales_line': Table('STG_SALES_STAGE', 'STG_SALES_LINE_RAW', ['line_id'], [
+        col('line_id', ID), col('transaction_id', ID), col('line_number', INT), col('product_id', ID),
+        col('quantity', INT), col('unit_price', DEC(10, 2)), col('unit_cost', DEC(10, 2)),
+        col('discount_pct', DEC(5, 2)), col('discount_amount', DEC(10, 2)),
+        col('line_total_amount', DEC(12, 2)), col('line_cost_amount', DEC(12, 2)),
+        col('tax_rate', DEC(5, 2)), col('tax_amount', DEC(10, 2)), col('created_at', TS),
+    ]),
+    'payment': Table('STG_PAYMENT_STAGE', 'STG_PAYMENT_RAW', ['payment_id'], [
+        col('payment_id', ID), col('transaction_id', ID), col('payment_method', STR),
+        col('payment_amount', DEC(12, 2)), col('payment_status', STR), null('payment_reference', STR),
+        col('payment_date', TS), null('card_last_four', STR), col('created_at', TS),
+    ]),
+    'return_transaction': Table('STG_RETURN_STAGE', 'STG_RETURN_RAW', ['return_id'], [
+        col('return_id', ID), col('return_code', STR), col('original_transaction_id', ID),
+        col('return_date', TS), col('store_id', ID), null('customer_id', ID), null('return_reason', STR),
+        null('refund_method', STR), col('refund_amount', DEC(12, 2)), col('is_restocked', BOOL),
+        col('created_at', TS),
+    ]),
+    'inventory': Table('STG_INVENTORY_STAGE', 'STG_INVENTORY_RAW', ['inventory_id'], [
+        col('inventory_id', ID), col('store_id', ID), col('product_id', ID),
+        col('quantity_on_hand', INT), col('quantity_reserved', INT), col('quantity_available', INT),
+        col('reorder_point', INT), col('reorder_quantity', INT), null('last_restock_date', DATE),
+        null('last_sold_date', DATE), col('snapshot_date', DATE), col('created_at', TS),
+        col('updated_at', TS),
+    ]),
+}
+
+# Foreign keys between source files, as (table, column) → (table, column).
+# prevalidate.py checks every child value has its parent in the same load.
+FOREIGN_KEYS = {
+    ('store', 'location_id'):                          ('location', 'location_id'),
+    ('customer', 'location_id'):                       ('location', 'location_id'),
+    ('product', 'category_id'):                        ('product_category', 'category_id'),
+    ('sales_transaction', 'store_id'):                 ('store', 'store_id'),
+    ('sales_transaction', 'customer_id'):              ('customer', 'customer_id'),
+    ('sales_line', 'transaction_id'):                  ('sales_transaction', 'transaction_id'),
+    ('sales_line', 'product_id'):                      ('product', 'product_id'),
+    ('payment', 'transaction_id'):                     ('sales_transaction', 'transaction_id'),
+    ('return_transaction', 'original_transaction_id'): ('sales_transaction', 'transaction_id'),
+    ('return_transaction', 'store_id'):                ('store', 'store_id'),
+    ('return_transaction', 'customer_id'):             ('customer', 'customer_id'),
+    ('inventory', 'store_id'):                         ('store', 'store_id'),
+    ('inventory', 'product_id'):                       ('product', 'product_id'),
+}
+
+def column_names(base: str) -> list:
+    return [c.name for c in SCHEMAS[base].columns]
+
+def file_base(fname: str) -> str:
+    """Registry key of a generated, sharded or split file (sales_line_part0003_chunk0001.csv.gz → sales_line)."""
+    return re.sub(r'(_part\d+)?(_chunk\d+)?\.(csv|parquet)(\.gz)?$', '', os.path.basename(fname))
+
+def parquet_schema(base: str) -> pa.Schema:
+    # Fields stay nullable: NOT NULL is checked by validate_file, so a stray
+    # NULL is reported against its file rather than failing the writer.
+    return pa.schema([(c.name, c.type) for c in SCHEMAS[base].columns])
+
+def sql_type(type_) -> str:
+    if pa.types.is_decimal(type_):
+        return f'NUMBER({type_.precision},{type_.scale})'
+    return {ID: 'NUMBER(38,0)', INT: 'INTEGER', STR: 'VARCHAR', TS: 'TIMESTAMP_NTZ',
+            DATE: 'DATE', BOOL: 'BOOLEAN'}[type_]
+
+# ── Stage DDL ────────────────────────────────────────────────
+# Raw tables keep every source column as VARCHAR; the clean layer's TRY_TO_*
+# casts own the typing.
+def raw_ddl(base: str) -> str:
+    names = column_names(base) + ['_stg_file_name', '_stg_load_ts']
+    width = (max(map(len, names)) // 4 + 1) * 4
+    lines = [f'    {name:<{width}}VARCHAR,' for name in names[:-1]]
+    lines.append(f"    {'_stg_load_ts':<{width}}TIMESTAMP DEFAULT CURRENT_TIMESTAMP()")
+    return f'CREATE OR REPLACE TABLE {SCHEMAS[base].raw_table} (\n' + '\n'.join(lines) + '\n);'
+
+def ddl_columns(sql: str, raw_table: str) -> list:
+    """Source columns of raw_table's CREATE TABLE in sql (the _stg_* audit columns left out)."""
+    m = re.search(rf'CREATE\s+OR\s+REPLACE\s+TABLE\s+{raw_table}\s*\((.*?)\n\);', sql, re.DOTALL)
+    if not m:
+        return []
+    names = [line.split()[0] for line in m.group(1).splitlines() if line.strip()]
+    return [n for n in names if not n.startswith('_stg_')]
+
+# ── COPY statements ──────────────────────────────────────────
+def stage_location(base: str) -> str:
+    """STAGE/sub-path a table's files are PUT to and COPY'd from."""
+    return f'{SCHEMAS[base].stage}/{base}'
+
+def file_pattern(base: str, ext: str) -> str:
+    return f"(.*/)?{base}(_part[0-9]+)?(_chunk[0-9]+)?[.]{ext}([.]gz)?"
+
+def copy_sql(base: str, fmt: str = 'csv', columns=None, typed: bool = False) -> str:
+    """
+    COPY INTO the raw table from the table's stage path. CSV columns are picked
+    by position, Parquet columns by name; both land as VARCHAR.
+    columns : load only these (plus the key); the rest of the row stays NULL,
+              and Parquet never decodes them
+    typed   : cast each value to its registry type on the way in, so a value
+              that does not parse is rejected by COPY with its file and line
+              instead of landing as text and turning NULL in the clean layer
+    """
+    table = SCHEMAS[base]
+    keep  = set(columns or column_names(base)) | set(table.key)
+    cols  = [(i, c) for i, c in enumerate(table.columns, 1) if c.name in keep]
+    cast  = lambda c: f'::{sql_type(c.type)}' if typed and c.type != STR else ''
+    if fmt == 'parquet':
+        # generate_data.py --format parquet writes typed columns, cast back to VARCHAR.
+        select = ','.join(f'$1:{c.name}{cast(c)}::VARCHAR' for _, c in cols)
+        file_format = "TYPE='PARQUET' USE_LOGICAL_TYPE=TRUE"
+    else:
+        select = ','.join(f'${i}{cast(c)}::VARCHAR' if cast(c) else f'${i}' for i, c in cols)
+        file_format = """TYPE='CSV' FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1 NULL_IF=('','NULL')"""
+    return f"""
+        COPY INTO STAGE_LAYER.{table.raw_table}
+            ({','.join(c.name for _, c in cols)},_stg_file_name)
+        FROM (SELECT {select},METADATA$FILENAME
+              FROM @STAGE_LAYER.{stage_location(base)}/)
+        FILE_FORMAT=({file_format})
+        PATTERN='{file_pattern(base, fmt)}'
+        PURGE=FALSE ON_ERROR='CONTINUE'
+    """
+
+# ── Local validation ─────────────────────────────────────────
+# Same reading rules as the COPY file format: header row, '' and NULL are NULL,
+# generated flags are TRUE/FALSE.
+NULL_VALUES = ['', 'NULL']
+MAX_ERRORS  = 20
+
+def _header(path: str) -> list:
+    raw = gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+    with io.TextIOWrapper(raw, encoding='utf-8', newline='') as f:
+        return next(csv.reader(f), [])
+
+def _header_errors(found: list, expected: list) -> list:
+    if found == expected:
+        return []
+    missing = [n for n in expected if n not in found]
+    extra   = [n for n in found if n not in expected]
+    if missing or extra:
+        return [f'columns do not match the registry (missing {missing}, unexpected {extra})']
+    return [f'columns out of order: expected {expected}, got {found}']
+
+def _validate_csv(path: str, table: Table, max_errors: int) -> list:
+    names  = [c.name for c in table.columns]
+    errors = _header_errors(_header(path), names)
+    if errors:
+        return errors      # COPY maps CSV columns by position, nothing else can be trusted
+
+    def bad_row(row):
+        if len(errors) < max_errors:
+            where = f'row {row.number}' if row.number is not None else 'a row'
+            errors.append(f'{where} has {row.actual_columns} columns, expected {row.expected_columns}')
+        return 'skip'
+
+    nulls   = {c.name: 0 for c in table.columns if not c.nullable}
+    convert = pa_csv.ConvertOptions(column_types={c.name: c.type for c in table.columns},
+                                    null_values=NULL_VALUES, strings_can_be_null=True,
+                                    true_values=['TRUE', 'true'], false_values=['FALSE', 'false'])
+    try:
+        with pa_csv.open_csv(path, parse_options=pa_csv.ParseOptions(newlines_in_values=True,
+                                                                     invalid_row_handler=bad_row),
+                             convert_options=convert) as reader:
+            for batch in reader:
+                for name in nulls:
+                    nulls[name] += batch.column(name).null_count
+    except pa.ArrowInvalid as exc:
+        errors.append(str(exc).splitlines()[0])
+    errors += [f'{name}: {n:,} NULLs in a NOT NULL column' for name, n in nulls.items() if n]
+    return errors[:max_errors]
+
+def _validate_parquet(path: str, table: Table, max_errors: int) -> list:
+    pf     = pq.ParquetFile(path)
+    schema = pf.schema_arrow
+    errors = _header_errors(schema.names, [c.name for c in table.columns])
+    if errors:
+        return errors
+    for c in table.columns:
+        found = schema.field(c.name).type
+        # Parquet has no second-resolution timestamps; TS columns come back as ms.
+        if found != c.type and not (pa.types.is_timestamp(found) and pa.types.is_timestamp(c.type)):
+            errors.append(f'{c.name}: type {found}, expected {c.type}')
+        elif not c.nullable:
+            n = pf.read(columns=[c.name]).column(0).null_count
+            if n:
+                errors.append(f'{c.name}: {n:,} NULLs in a NOT NULL column')
+    return errors[:max_errors]
+
+def validate_file(path: str, base: str = None, max_errors: int = MAX_ERRORS) -> list:
+    """
+    Problems that would make COPY reject rows of path or load them wrong: header
+    or schema drift, rows with the wrong number of fields, values that do not
+    parse as their column's type and NULLs in NOT NULL columns. Empty if clean.
+    """
+    table = SCHEMAS[base or file_base(path)]
+    if re.search(r'\.parquet$', path):
+        return _validate_parquet(path, table, max_errors)
+    return _validate_csv(path, table, max_errors)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Print or check what the schema registry generates.')
+    parser.add_argument('command', choices=['ddl', 'copy', 'check', 'validate'])
+    parser.add_argument('files', nargs='*', help='files to validate')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--typed', action='store_true', help='COPY with registry type casts')
+    args = parser.parse_args()
+
+    if args.command == 'ddl':
+        print('\n\n'.join(raw_ddl(base) for base in SCHEMAS))
+    elif args.command == 'copy':
+        print(''.join(copy_sql(base, args.format, typed=args.typed) for base in SCHEMAS))
+    elif args.command == 'check':
+        ddl_path = os.path.join(SQL_DIR, '02_stage', '02_stage_raw_tables.sql')
+        with open(ddl_path) as f:
+            sql = f.read()
+        drift = [(t.raw_table, ddl_columns(sql, t.raw_table), column_names(base))
+                 for base, t in SCHEMAS.items() if ddl_columns(sql, t.raw_table) != column_names(base)]
+        for raw_table, found, expected in drift:
+            print(f'{raw_table}: {os.path.basename(ddl_path)} has {found}, registry has {expected}')
+        print('raw-table DDL matches the registry' if not drift else f'{len(drift)} tables drifted')
+        sys.exit(1 if drift else 0)
+    else:
+        failed = 0
+        for path in args.files:
+            errors = validate_file(path)
+            failed += bool(errors)
+            print(f"{os.path.basename(path)}: {'ok' if not errors else f'{len(errors)} problems'}")
+            for error in errors:
+                print(f'  {error}')
+        sys.exit(1 if failed else 0)
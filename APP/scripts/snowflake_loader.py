@@ -1,111 +1,57 @@
 """
 Snowflake Loader
-Uploads generated CSVs to Snowflake internal stages and loads into raw tables.
+Uploads generated CSV or Parquet files to Snowflake internal stages and loads into raw tables.
+CSVs are pre-validated first (prevalidate.py): rejected rows go to a reject file per
+table and only the good rows are uploaded. Parquet files are checked against
+schema_registry.py; ones that fail are never uploaded. Statements are retried
+with backoff behind a circuit breaker (load_retries.py), and each file's
+progress (pending, uploaded, copied, verified) is kept in a manifest
+(load_manifest.py) so a failed run resumes.
 Requires: SNOWFLAKE_ACCOUNT, SNOWFLAKE_USER, SNOWFLAKE_PASSWORD env vars
+(or --local DIR to run against the local stand-in connector)
 """
 import os
+import re
+import sys
 import glob
+import gzip
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import snowflake.connector
 from dotenv import load_dotenv
 
+import prevalidate
+from load_manifest import MANIFEST_NAME, LoadManifest
+from load_retries import TRANSIENT, CircuitBreaker, CircuitOpen, execute, execute_async, query_results
+from schema_registry import SCHEMAS, copy_sql, stage_location, validate_file
+
 load_dotenv()
 
+# ── Table registry ───────────────────────────────────────────
+# Tables, columns and COPY statements come from schema_registry.py. Every table
+# stages into its own sub-path (@STG_PRODUCT_STAGE/product_category/) and its
+# COPY reads only that path with a PATTERN for its own files, _partNNNN shards
+# and _chunkNNNN splits, so tables that share a stage never scan or parse each
+# other's files.
+BASES = {t.raw_table: base for base, t in SCHEMAS.items()}   # raw table → file base name
+
+# file name → (stage location, raw table), for both formats
 STAGE_MAP = {
-    'location.csv':           ('STG_LOCATION_STAGE',  'STG_LOCATION_RAW'),
-    'store.csv':              ('STG_STORE_STAGE',      'STG_STORE_RAW'),
-    'customer.csv':           ('STG_CUSTOMER_STAGE',   'STG_CUSTOMER_RAW'),
-    'product_category.csv':   ('STG_PRODUCT_STAGE',    'STG_PRODUCT_CATEGORY_RAW'),
-    'product.csv':            ('STG_PRODUCT_STAGE',    'STG_PRODUCT_RAW'),
-    'sales_transaction.csv':  ('STG_SALES_STAGE',      'STG_SALES_TRANSACTION_RAW'),
-    'sales_line.csv':         ('STG_SALES_STAGE',      'STG_SALES_LINE_RAW'),
-    'payment.csv':            ('STG_PAYMENT_STAGE',    'STG_PAYMENT_RAW'),
-    'return_transaction.csv': ('STG_RETURN_STAGE',     'STG_RETURN_RAW'),
-    'inventory.csv':          ('STG_INVENTORY_STAGE',  'STG_INVENTORY_RAW'),
+    f'{base}.{ext}': (stage_location(base), t.raw_table)
+    for base, t in SCHEMAS.items() for ext in ('csv', 'parquet')
 }
 
-COPY_SQLS = {
-    'STG_LOCATION_RAW': """
-        COPY INTO STAGE_LAYER.STG_LOCATION_RAW
-            (location_id,street_address,city,state,zip_code,country,region,created_at,updated_at,_stg_file_name)
-        FROM (SELECT $1,$2,$3,$4,$5,$6,$7,$8,$9,METADATA$FILENAME FROM @STAGE_LAYER.STG_LOCATION_STAGE)
-        FILE_FORMAT=(TYPE='CSV' FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1 NULL_IF=('','NULL'))
-        PURGE=FALSE ON_ERROR='CONTINUE'
-    """,
-    'STG_STORE_RAW': """
-        COPY INTO STAGE_LAYER.STG_STORE_RAW
-            (store_id,store_code,store_name,store_type,location_id,manager_name,phone_number,email,
-             open_date,close_date,is_active,square_footage,created_at,updated_at,_stg_file_name)
-        FROM (SELECT $1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14,METADATA$FILENAME FROM @STAGE_LAYER.STG_STORE_STAGE)
-        FILE_FORMAT=(TYPE='CSV' FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1 NULL_IF=('','NULL'))
-        PURGE=FALSE ON_ERROR='CONTINUE'
-    """,
-    'STG_CUSTOMER_RAW': """
-        COPY INTO STAGE_LAYER.STG_CUSTOMER_RAW
-            (customer_id,customer_code,first_name,last_name,email,phone_number,date_of_birth,
-             gender,loyalty_tier,loyalty_points,registration_date,location_id,is_active,created_at,updated_at,_stg_file_name)
-        FROM (SELECT $1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14,$15,METADATA$FILENAME FROM @STAGE_LAYER.STG_CUSTOMER_STAGE)
-        FILE_FORMAT=(TYPE='CSV' FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1 NULL_IF=('','NULL'))
-        PURGE=FALSE ON_ERROR='CONTINUE'
-    """,
-    'STG_PRODUCT_CATEGORY_RAW': """
-        COPY INTO STAGE_LAYER.STG_PRODUCT_CATEGORY_RAW
-            (category_id,category_code,category_name,parent_category_id,description,is_active,created_at,_stg_file_name)
-        FROM (SELECT $1,$2,$3,$4,$5,$6,$7,METADATA$FILENAME FROM @STAGE_LAYER.STG_PRODUCT_STAGE)
-        FILE_FORMAT=(TYPE='CSV' FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1 NULL_IF=('','NULL'))
-        PURGE=FALSE ON_ERROR='CONTINUE'
-    """,
-    'STG_PRODUCT_RAW': """
-        COPY INTO STAGE_LAYER.STG_PRODUCT_RAW
-            (product_id,product_code,sku,product_name,category_id,supplier_id,unit_cost,unit_price,
-             discount_pct,weight_kg,brand,size,color,is_perishable,is_active,launch_date,discontinue_date,
-             created_at,updated_at,_stg_file_name)
-        FROM (SELECT $1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14,$15,$16,$17,$18,$19,METADATA$FILENAME FROM @STAGE_LAYER.STG_PRODUCT_STAGE)
-        FILE_FORMAT=(TYPE='CSV' FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1 NULL_IF=('','NULL'))
-        PURGE=FALSE ON_ERROR='CONTINUE'
-    """,
-    'STG_SALES_TRANSACTION_RAW': """
-        COPY INTO STAGE_LAYER.STG_SALES_TRANSACTION_RAW
-            (transaction_id,transaction_code,transaction_date,store_id,customer_id,cashier_id,
-             transaction_type,channel,subtotal_amount,discount_amount,tax_amount,total_amount,
-             loyalty_points_earned,loyalty_points_redeemed,notes,created_at,_stg_file_name)
-        FROM (SELECT $1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14,$15,$16,METADATA$FILENAME FROM @STAGE_LAYER.STG_SALES_STAGE)
-        FILE_FORMAT=(TYPE='CSV' FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1 NULL_IF=('','NULL'))
-        PURGE=FALSE ON_ERROR='CONTINUE'
-    """,
-    'STG_SALES_LINE_RAW': """
-        COPY INTO STAGE_LAYER.STG_SALES_LINE_RAW
-            (line_id,transaction_id,line_number,product_id,quantity,unit_price,unit_cost,
-             discount_pct,discount_amount,line_total_amount,line_cost_amount,tax_rate,tax_amount,created_at,_stg_file_name)
-        FROM (SELECT $1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14,METADATA$FILENAME FROM @STAGE_LAYER.STG_SALES_STAGE)
-        FILE_FORMAT=(TYPE='CSV' FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1 NULL_IF=('','NULL'))
-        PURGE=FALSE ON_ERROR='CONTINUE'
-    """,
-    'STG_PAYMENT_RAW': """
-        COPY INTO STAGE_LAYER.STG_PAYMENT_RAW
-            (payment_id,transaction_id,payment_method,payment_amount,payment_status,
-             payment_reference,payment_date,card_last_four,created_at,_stg_file_name)
-        FROM (SELECT $1,$2,$3,$4,$5,$6,$7,$8,$9,METADATA$FILENAME FROM @STAGE_LAYER.STG_PAYMENT_STAGE)
-        FILE_FORMAT=(TYPE='CSV' FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1 NULL_IF=('','NULL'))
-        PURGE=FALSE ON_ERROR='CONTINUE'
-    """,
-    'STG_RETURN_RAW': """
-        COPY INTO STAGE_LAYER.STG_RETURN_RAW
-            (return_id,return_code,original_transaction_id,return_date,store_id,customer_id,
-             return_reason,refund_method,refund_amount,is_restocked,created_at,_stg_file_name)
-        FROM (SELECT $1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,METADATA$FILENAME FROM @STAGE_LAYER.STG_RETURN_STAGE)
-        FILE_FORMAT=(TYPE='CSV' FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1 NULL_IF=('','NULL'))
-        PURGE=FALSE ON_ERROR='CONTINUE'
-    """,
-    'STG_INVENTORY_RAW': """
-        COPY INTO STAGE_LAYER.STG_INVENTORY_RAW
-            (inventory_id,store_id,product_id,quantity_on_hand,quantity_reserved,quantity_available,
-             reorder_point,reorder_quantity,last_restock_date,last_sold_date,snapshot_date,
-             created_at,updated_at,_stg_file_name)
-        FROM (SELECT $1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,METADATA$FILENAME FROM @STAGE_LAYER.STG_INVENTORY_STAGE)
-        FILE_FORMAT=(TYPE='CSV' FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1 NULL_IF=('','NULL'))
-        PURGE=FALSE ON_ERROR='CONTINUE'
-    """,
-}
+COPY_SQLS         = {t.raw_table: copy_sql(base, 'csv') for base, t in SCHEMAS.items()}
+PARQUET_COPY_SQLS = {t.raw_table: copy_sql(base, 'parquet') for base, t in SCHEMAS.items()}
+
+def table_file(fname: str) -> str:
+    """Map a sharded or split file (sales_line_part0003_chunk0001.csv.gz) to its STAGE_MAP key."""
+    return re.sub(r'(_part\d+)?(_chunk\d+)?\.(csv|parquet)(\.gz)?$', r'.\3', fname)
 
 def get_connection():
     return snowflake.connector.connect(
@@ -117,29 +63,621 @@ def get_connection():
         role      = os.getenv('SNOWFLAKE_ROLE', 'SYSADMIN'),
     )
 
-def upload_and_load(csv_dir: str):
-    conn = get_connection()
-    cs   = conn.cursor()
+# ── Splitting large CSVs ─────────────────────────────────────
+# One staged file is loaded by one warehouse thread, so big CSVs are cut into
+# gzip chunks first; COPY then spreads the chunks across the warehouse.
+SPLIT_OVER_BYTES = int(float(os.getenv('SPLIT_OVER_MB', 500)) * 1e6)   # raw CSV size that triggers a split
+CHUNK_BYTES      = int(float(os.getenv('SPLIT_CHUNK_MB', 150)) * 1e6)  # compressed chunk size, 100–250 MB is the sweet spot
+GZIP_LEVEL       = 6
+WRITE_BATCH      = 1 << 20
+
+def split_csv(path: str, out_dir: str, chunk_bytes: int = CHUNK_BYTES) -> list:
+    """
+    Stream a CSV into gzip chunks of about chunk_bytes compressed. Every chunk
+    starts with the source header, so SKIP_HEADER=1 holds for each of them, and
+    cuts only fall between records (even number of quotes so far), never inside
+    a quoted field that spans lines.
+    """
+    base   = os.path.basename(path)[:-len('.csv')]
+    chunks = []
+    raw = out = None
+
+    def write(batch):
+        nonlocal raw, out
+        if out is None:
+            chunks.append(os.path.join(out_dir, f'{base}_chunk{len(chunks):04d}.csv.gz'))
+            raw = open(chunks[-1], 'wb')
+            out = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_LEVEL, mtime=0)
+            out.write(header)
+        out.writelines(batch)
+        if raw.tell() >= chunk_bytes:
+            out.close()
+            raw.close()
+            out = None
+
+    with open(path, 'rb') as src:
+        header = src.readline()
+        batch, batch_bytes, quotes = [], 0, 0
+        for line in src:
+            batch.append(line)
+            batch_bytes += len(line)
+            quotes      += line.count(b'"')
+            if batch_bytes >= WRITE_BATCH and quotes % 2 == 0:
+                write(batch)
+                batch, batch_bytes = [], 0
+        if batch or not chunks:
+            write(batch)
+    if out is not None:
+        out.close()
+        raw.close()
+    return chunks
+
+# COPY INTO accepts at most this many FILES=(...) entries per statement.
+COPY_FILES_MAX = 1000
+
+# ── Parallel PUT / COPY ──────────────────────────────────────
+# PUTs for every file run on a thread pool sharing one connection (the
+# connector is thread-safe per connection, one cursor per statement). Each
+# table's COPY fires as soon as the last upload to its stage path is done, so
+# small tables load while the big sales files are still uploading.
+CPUS         = os.cpu_count() or 4
+LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', min(8, 2 * CPUS)))
+# Threads each PUT uses to upload/compress its file; split the machine across workers.
+PUT_PARALLEL = int(os.getenv('PUT_PARALLEL', max(1, min(99, 4 * CPUS // LOAD_WORKERS))))
+
+# One file to load: its stage location, raw table and format, and the file to
+# PUT in its place when that differs (prevalidate's cleaned copy).
+Upload = namedtuple('Upload', ['path', 'stage', 'table', 'parquet', 'source'], defaults=[None])
+
+def plan_files(data_dir: str) -> list:
+    """An Upload for every generated file that maps to a raw table."""
+    files = sorted(glob.glob(os.path.join(data_dir, '*.csv')) + glob.glob(os.path.join(data_dir, '*.parquet')))
+    plan  = []
+    for path in files:
+        key = table_file(os.path.basename(path))
+        if key in STAGE_MAP:
+            plan.append(Upload(path, *STAGE_MAP[key], key.endswith('.parquet')))
+    return plan
+
+def put_file(conn, path: str, stage_name: str, breaker: CircuitBreaker = None) -> list:
+    """PUT one file; returns the staged file names (PUT's target column)."""
+    # Parquet pages are already snappy-compressed and split chunks are already
+    # gzipped; compressing them again only costs CPU.
+    compress = path.endswith('.csv')
+    rows     = execute(conn, f"PUT file://{path} @STAGE_LAYER.{stage_name}/ "
+                             f"AUTO_COMPRESS={'TRUE' if compress else 'FALSE'} OVERWRITE=TRUE "
+                             f"PARALLEL={PUT_PARALLEL}", breaker)
+    staged   = [row[1] for row in rows]
+    print(f"  PUT {os.path.basename(path)} → @{stage_name}")
+    return staged
+
+def with_files(sql: str, staged: list) -> str:
+    """Restrict a COPY statement to an explicit FILES list (replaces any PATTERN)."""
+    files = ', '.join(f"'{name}'" for name in staged)
+    sql   = re.sub(r"\n\s*PATTERN='[^']*'", '', sql)
+    return sql.replace('FILE_FORMAT=', f"FILES=({files})\n        FILE_FORMAT=", 1)
+
+# ── COPY ─────────────────────────────────────────────────────
+# COPY statements are submitted with execute_async and tracked by query id, so
+# a slow table never holds a worker: upload_and_load polls every COPY_POLL_S
+# and fetches each query's result rows once it has finished.
+COPY_POLL_S = float(os.getenv('COPY_POLL_SECONDS', 2))
+
+def copy_statements(table_name: str, parquet: bool, staged: list = None,
+                    columns: list = None, typed: bool = False) -> list:
+    """
+    COPY INTO table_name, limited to the staged files when given (in batches of
+    COPY_FILES_MAX); columns and typed prune and type the load (see copy_sql).
+    """
+    sql = copy_sql(BASES[table_name], 'parquet' if parquet else 'csv', columns, typed)
+    if staged is None:
+        batches = [sql]
+    else:
+        batches = [with_files(sql, staged[i:i + COPY_FILES_MAX])
+                   for i in range(0, len(staged), COPY_FILES_MAX)]
+    return batches
+
+def submit_copy(conn, table_name: str, parquet: bool, staged: list = None, columns: list = None,
+                typed: bool = False, breaker: CircuitBreaker = None) -> list:
+    """Start the COPY statements for table_name; returns their query ids."""
+    query_ids = [execute_async(conn, stmt, breaker)
+                 for stmt in copy_statements(table_name, parquet, staged, columns, typed)]
+    print(f"  COPY INTO {table_name} submitted ({', '.join(query_ids)})")
+    return query_ids
+
+def copy_results(copy_rows: list) -> list:
+    """
+    COPY's per-file result rows (file, status, rows_parsed, rows_loaded,
+    error_limit, errors_seen, first_error, ...) as dicts; a single-column
+    message row means there was nothing new to load.
+    """
+    return [{'file': r[0], 'status': r[1], 'rows_parsed': r[2], 'rows_loaded': r[3],
+             'errors': r[5] or 0, 'first_error': r[6]}
+            for r in copy_rows if len(r) > 5 and isinstance(r[3], int)]
+
+def loaded_by_file(results: list) -> dict:
+    """Rows loaded per staged file name, from copy_results."""
+    return {os.path.basename(f['file']): f['rows_loaded'] for f in results}
+
+def verify_files(conn, table_name: str, names: list, breaker: CircuitBreaker = None) -> dict:
+    """Rows in table_name per staged file, by the METADATA$FILENAME kept in _stg_file_name."""
+    counts = {}
+    for i in range(0, len(names), COPY_FILES_MAX):
+        in_list = ', '.join(f"'{name}'" for name in names[i:i + COPY_FILES_MAX])
+        counts.update(execute(conn, f"SELECT _stg_file_name, COUNT(*) FROM STAGE_LAYER.{table_name} "
+                                    f"WHERE _stg_file_name IN ({in_list}) GROUP BY _stg_file_name", breaker))
+    return counts
+
+def copy_counts(results: list) -> dict:
+    """Totals over copy_results."""
+    counts = {'parsed': 0, 'rows': 0, 'rejected': 0, 'first_error': None}
+    for f in results:
+        counts['parsed']   += f['rows_parsed']
+        counts['rows']     += f['rows_loaded']
+        counts['rejected'] += f['errors']
+        counts['first_error'] = counts['first_error'] or f['first_error']
+    return counts
+
+def print_report(report: dict):
+    print(f"\n{'table':<28}{'files':>6}{'skipped':>8}{'invalid':>8}{'pre-rej':>9}{'chunks':>7}{'chunk MB':>14}{'MB':>9}{'parsed':>12}"
+          f"{'loaded':>12}{'rejected':>10}{'verified':>9}{'left':>6}{'wall s':>9}{'MB/s':>8}{'rows/s':>11}")
+    for table, r in sorted(report.items(), key=lambda kv: -kv[1]['wall_s']):
+        wall  = max(r['wall_s'], 1e-9)
+        sizes = r['chunk_bytes']
+        span  = f"{min(sizes) / 1e6:.1f}–{max(sizes) / 1e6:.1f}" if sizes else '-'
+        print(f"{table:<28}{r['files']:>6}{r['skipped']:>8}{r['invalid']:>8}{r['pre_rejected']:>9,}{len(sizes):>7}{span:>14}{r['bytes'] / 1e6:>9.1f}"
+              f"{r['parsed']:>12,}{r['rows']:>12,}{r['rejected']:>10,}{r['verified']:>9}{r['left']:>6}{r['wall_s']:>9.2f}"
+              f"{r['bytes'] / 1e6 / wall:>8.1f}{r['rows'] / wall:>11,.0f}")
+    for table, r in sorted(report.items()):
+        if r['first_error']:
+            print(f"  {table}: {r['first_error']}")
+
+# ── Load run ─────────────────────────────────────────────────
+# upload_and_load runs the phases below in order. plan_load sorts the files by
+# where each one resumes, prevalidate_uploads scans the CSVs about to be
+# uploaded, and start_load submits the first tasks. run_load then hands each
+# finished task to its handler (upload_done, chunk_done, copy_submitted,
+# collect_results, check_done) and polls running COPYs (poll_copies) until
+# nothing is left. build_report closes the run. All tasks go through submit,
+# which takes no new work once the circuit breaker has given up. LoadRun holds
+# only what the handlers share; the rest is passed from phase to phase, and a
+# split's or a COPY's progress travels with its tasks.
+class LoadRun:
+    """State shared by the phases of one upload_and_load run."""
+    def __init__(self, conn, manifest: LoadManifest, breaker: CircuitBreaker, split_dir: str,
+                 split_over: int, chunk_bytes: int, columns: dict, typed: bool):
+        self.conn        = conn
+        self.manifest    = manifest
+        self.breaker     = breaker
+        self.split_dir   = split_dir
+        self.split_over  = split_over
+        self.chunk_bytes = chunk_bytes
+        self.columns     = columns
+        self.typed       = typed
+        self.pool        = None   # the task pool, while run_load is going
+        self.report      = {}     # table → counters (see upload_and_load)
+        self.pending     = {}     # stage → splits/uploads still running
+        self.targets     = {}     # stage → {(table, parquet)} with something to COPY
+        self.staged      = {}     # (table, parquet) → [(source, staged names)]
+        self.tasks       = {}     # future → (kind, item)
+        self.running     = {}     # COPY query id → (its copy, submitted at), until it finishes
+        self.failed      = set()  # sources already reported as failed
+        self.stopped     = None   # the CircuitOpen that ended the run
+
+def table_report(run: LoadRun, table_name: str) -> dict:
+    return run.report.setdefault(table_name, {'files': 0, 'skipped': 0, 'invalid': 0, 'pre_rejected': 0,
+                                              'bytes': 0, 'chunk_bytes': [],
+                                              'parsed': 0, 'rows': 0, 'rejected': 0,
+                                              'verified': 0, 'left': 0, 'first_error': None,
+                                              'wall_s': 0.0, 'start': None, 'copy': [], 'queries': []})
+
+def plan_load(run: LoadRun, plan: list, full: bool, validate: bool):
+    """
+    Sort the planned files by where their load resumes (LoadManifest.RESUME_AT).
+    Returns (uploads, loaded, checks): the Uploads to check and PUT, the CSVs
+    already staged or loaded (parents for the foreign key check), and
+    {table: [(source, staged names)]} to check again.
+    """
+    uploads, loaded, checks = [], [], {}
+    for item in plan:
+        r = table_report(run, item.table)
+        r['files'] += 1
+        entry = run.manifest.check(item.path, item.table, item.stage)
+        if full:
+            entry['status'] = 'pending'
+        step = run.manifest.resume_at(item.path)
+        if step in ('copy', 'check', 'skip') and not item.parquet:
+            loaded.append(item.path)
+        if step == 'skip':
+            r['skipped'] += 1
+            continue
+        if step == 'invalid' and validate:
+            r['invalid'] += 1
+            r['first_error'] = r['first_error'] or f"{os.path.basename(item.path)}: {entry['errors'][0]}"
+            continue
+        if step == 'check':
+            checks.setdefault(item.table, []).append((item.path, entry['staged']))
+            continue
+        run.targets.setdefault(item.stage, set()).add((item.table, item.parquet))
+        if step == 'copy':
+            run.staged.setdefault((item.table, item.parquet), []).append((item.path, entry['staged']))
+            continue
+        run.pending[item.stage] = run.pending.get(item.stage, 0) + 1
+        r['bytes'] += os.path.getsize(item.path)
+        uploads.append(item)
+    run.manifest.save()
+    return uploads, loaded, checks
+
+def prevalidate_uploads(run: LoadRun, uploads: list, loaded: list, reject_dir: str, workers: int) -> list:
+    """
+    Scan the CSVs in uploads with prevalidate and return the uploads that go
+    ahead. A file with rejects is uploaded from its cleaned copy; one with a
+    bad header or no good rows drops out of the load as invalid.
+    """
+    csv_paths = [item.path for item in uploads if not item.parquet]
+    if not csv_paths:
+        return uploads
+    checked = prevalidate.validate(csv_paths, reject_dir, os.path.join(run.split_dir, 'validate'),
+                                   workers, loaded)
+    prevalidate.print_summary(checked, reject_dir)
+    keep = []
+    for item in uploads:
+        res = checked.get(item.path)
+        if res and not (res['rejected'] or res['header']):
+            run.manifest.validated(item.path, res['rows'])
+        if not res or not (res['rejected'] or res['header']):
+            keep.append(item)
+            continue
+        r = run.report[item.table]
+        r['pre_rejected'] += res['rejected']
+        if res['clean']:
+            run.manifest.validated(item.path, res['rows'] - res['rejected'])
+            keep.append(item._replace(source=res['clean']))
+            continue
+        error = res['header'] or 'every row rejected'
+        run.manifest.invalid(item.path, [error])
+        run.pending[item.stage] -= 1
+        r['invalid'] += 1
+        r['bytes']   -= os.path.getsize(item.path)
+        r['first_error'] = r['first_error'] or f'{os.path.basename(item.path)}: {error}'
+    return keep
+
+def timed(fn, *args):
+    """(start, result, end, error) of fn(*args); errors are returned, not raised."""
+    start = time.perf_counter()
     try:
-        cs.execute('USE DATABASE RETAIL_DW')
-        cs.execute('USE WAREHOUSE RETAIL_WH')
-
-        csv_files = glob.glob(os.path.join(csv_dir, '*.csv'))
-        for csv_path in csv_files:
-            fname = os.path.basename(csv_path)
-            if fname not in STAGE_MAP:
-                continue
-            stage_name, table_name = STAGE_MAP[fname]
-            print(f"\nUploading {fname} → @{stage_name}")
-            cs.execute(f"PUT file://{csv_path} @STAGE_LAYER.{stage_name} AUTO_COMPRESS=TRUE OVERWRITE=TRUE")
-            print(f"  PUT complete. Running COPY INTO {table_name}...")
-            cs.execute(COPY_SQLS[table_name])
-            for row in cs.fetchall():
-                print(f"    {row}")
+        return start, fn(*args), time.perf_counter(), None
+    except Exception as exc:
+        return start, None, time.perf_counter(), exc
+
+def submit(run: LoadRun, kind: str, item, fn, *args):
+    if run.stopped is None:
+        run.tasks[run.pool.submit(timed, fn, *args)] = (kind, item)
+
+def upload(run: LoadRun, item: Upload):
+    source = item.source or item.path
+    if not item.parquet and os.path.getsize(source) > run.split_over:
+        submit(run, 'split', item, split_csv, source, run.split_dir, run.chunk_bytes)
+    else:
+        submit(run, 'put', item, put_file, run.conn, source, item.stage, run.breaker)
+
+def submit_copies(run: LoadRun, stage_name: str):
+    """Start the COPYs for everything staged under stage_name."""
+    for target in sorted(run.targets[stage_name]):
+        sources = run.staged.get(target, [])
+        names   = [name for _, names in sources for name in names]
+        if names:
+            submit(run, 'copy', (target[0], sources), submit_copy, run.conn, *target, names,
+                   run.columns.get(target[0]), run.typed, run.breaker)
+
+def submit_check(run: LoadRun, table_name: str, sources: list, reported=()):
+    """Check sources in the raw table; reported are the ones this run's COPY results counted."""
+    names = [f'{BASES[table_name]}/{name}' for _, names in sources for name in names]
+    submit(run, 'verify', (table_name, sources, set(reported)), verify_files, run.conn, table_name, names,
+           run.breaker)
+
+def record_failure(run: LoadRun, r: dict, path: str, kind: str, error: Exception):
+    """A task for path failed: the file keeps its last good state, only the error is recorded."""
+    if isinstance(error, CircuitOpen):
+        if run.stopped is None:
+            run.stopped = error
+            print(f"  Stopping: {error}; unfinished files resume on the next run")
+        return
+    message = f'{kind}: {str(error).splitlines()[0]}'
+    run.manifest.failed(path, message)
+    note_failure(run, r, path, message)
+
+def note_failure(run: LoadRun, r: dict, path: str, message: str):
+    if path not in run.failed:
+        run.failed.add(path)
+        print(f"  Failed {os.path.basename(path)} ({message})")
+        r['first_error'] = r['first_error'] or f'{os.path.basename(path)}: {message}'
+
+def start_load(run: LoadRun, uploads: list, checks: dict, validate: bool):
+    """Submit the first tasks: checks and uploads, COPYs that are due, resumed checks."""
+    for item in uploads:
+        if validate and item.parquet:
+            submit(run, 'validate', item, validate_file, item.path, BASES[item.table])
+        else:
+            upload(run, item)
+    for stage_name in run.targets:
+        if not run.pending.get(stage_name):
+            submit_copies(run, stage_name)
+    for table_name, sources in checks.items():
+        submit_check(run, table_name, sources)
+
+def upload_finished(run: LoadRun, stage_name: str):
+    """One split or upload to stage_name is done; the stage gets its COPY once none are left."""
+    run.pending[stage_name] -= 1
+    if run.pending[stage_name] == 0:
+        submit_copies(run, stage_name)
+
+def upload_done(run: LoadRun, kind: str, item: Upload, start, result, end, error):
+    """A Parquet check, split or PUT finished."""
+    r = run.report[item.table]
+    r['start'] = start if r['start'] is None else min(r['start'], start)
+    if error is not None:
+        record_failure(run, r, item.path, kind, error)
+    elif kind == 'validate':
+        if not result:
+            upload(run, item)
+            return
+        print(f"  Invalid {os.path.basename(item.path)}: {result[0]}")
+        run.manifest.invalid(item.path, result)
+        r['invalid'] += 1
+        r['bytes']   -= os.path.getsize(item.path)
+        r['first_error'] = r['first_error'] or f'{os.path.basename(item.path)}: {result[0]}'
+        r['wall_s'] = max(r['wall_s'], end - r['start'])
+    elif kind == 'split':
+        print(f"  Split {os.path.basename(item.path)} into {len(result)} chunks")
+        r['chunk_bytes'] += [os.path.getsize(c) for c in result]
+        run.pending[item.stage] += len(result)
+        split = {'upload': item, 'left': len(result), 'staged': [], 'failed': False}
+        for chunk in result:
+            submit(run, 'chunk', split, put_file, run.conn, chunk, item.stage, run.breaker)
+    else:
+        run.manifest.uploaded(item.path, result)
+        run.staged.setdefault((item.table, item.parquet), []).append((item.path, sorted(result)))
+    upload_finished(run, item.stage)
+
+def chunk_done(run: LoadRun, split: dict, start, result, end, error):
+    """One chunk of a split CSV was PUT; the file counts as uploaded once all its chunks are."""
+    item = split['upload']
+    if error is not None:
+        record_failure(run, run.report[item.table], item.path, 'chunk', error)
+        split['failed'] = True
+    else:
+        split['staged'] += result
+    split['left'] -= 1
+    if not split['left'] and not split['failed']:
+        run.manifest.uploaded(item.path, split['staged'])
+        run.staged.setdefault((item.table, item.parquet), []).append((item.path, sorted(split['staged'])))
+    upload_finished(run, item.stage)
+
+def copy_submitted(run: LoadRun, item, start, result, end, error):
+    """A table's COPY statements were submitted; track their query ids until they finish."""
+    table_name, sources = item
+    r = run.report[table_name]
+    r['wall_s'] = max(r['wall_s'], end - (r['start'] or start))
+    if error is not None:
+        for src, _ in sources:
+            record_failure(run, r, src, 'copy', error)
+        return
+    copy = {'table': table_name, 'sources': sources, 'start': start,
+            'left': len(result), 'rows': [], 'error': None}
+    for query_id in result:
+        run.running[query_id] = (copy, end)
+
+def poll_copies(run: LoadRun):
+    """Fetch the results of every COPY query that is no longer running."""
+    for query_id, (copy, submitted) in list(run.running.items()):
+        try:
+            status = run.conn.get_query_status(query_id)
+        except TRANSIENT:
+            continue                      # ask again at the next poll
+        if not run.conn.is_still_running(status):
+            del run.running[query_id]
+            submit(run, 'results', (copy, query_id, submitted), query_results, run.conn, query_id, run.breaker)
+
+def collect_results(run: LoadRun, item, result, end, error):
+    """One COPY query's result rows arrived; the copy is done once all its queries are."""
+    copy, query_id, submitted = item
+    copy['left'] -= 1
+    run.report[copy['table']]['queries'].append(
+        {'query_id': query_id, 'seconds': round(end - submitted, 3),
+         'status': 'SUCCESS' if error is None else str(error).splitlines()[0]})
+    if error is None:
+        copy['rows'] += result
+    else:
+        copy['error'] = copy['error'] or error
+    if not copy['left']:
+        copy_done(run, copy, end)
+
+def copy_done(run: LoadRun, copy: dict, end: float):
+    """Count a finished copy into the report, mark its sources copied and check them."""
+    table_name, sources = copy['table'], copy['sources']
+    r = run.report[table_name]
+    r['wall_s'] = max(r['wall_s'], end - (r['start'] or copy['start']))
+    if copy['error'] is not None:
+        for src, _ in sources:
+            record_failure(run, r, src, 'copy', copy['error'])
+        return
+    results     = copy_results(copy['rows'])
+    counts      = copy_counts(results)
+    r['copy']  += results
+    for key in ('parsed', 'rows', 'rejected'):
+        r[key] += counts[key]
+    r['first_error'] = r['first_error'] or counts['first_error']
+    print(f"  COPY INTO {table_name} done ({len(results)} files, {counts['rows']:,} rows loaded)")
+    by_file = loaded_by_file(results)
+    for src, _ in sources:
+        run.manifest.copied(src, by_file)
+    submit_check(run, table_name, sources,
+                 [src for src, names in sources if all(name in by_file for name in names)])
+
+def check_done(run: LoadRun, item, start, result, end, error):
+    """
+    The raw table's rows per staged file arrived; verify each source against
+    them. A verified file COPY reported no rows for (loaded by a query whose
+    result was lost, or by an earlier run) is counted in the report from them.
+    """
+    table_name, sources, reported = item
+    r = run.report[table_name]
+    r['wall_s'] = max(r['wall_s'], end - (r['start'] or start))
+    if error is not None:
+        for src, _ in sources:
+            record_failure(run, r, src, 'verify', error)
+        return
+    for src, names in sources:
+        found    = sum(result.get(f'{BASES[table_name]}/{name}', 0) for name in names)
+        mismatch = run.manifest.verify(src, found)
+        if mismatch is None:
+            r['verified'] += 1
+            if src not in reported:
+                r['parsed'] += found
+                r['rows']   += found
+        else:
+            note_failure(run, r, src, f'verify: {mismatch}')
+
+def run_load(run: LoadRun):
+    """Handle tasks as they finish and poll running COPYs until no work is left."""
+    last_poll = 0.0
+    while run.tasks or run.running:
+        done, _ = wait(run.tasks, timeout=COPY_POLL_S if run.running else None, return_when=FIRST_COMPLETED)
+        if run.running and time.perf_counter() - last_poll >= COPY_POLL_S:
+            last_poll = time.perf_counter()
+            poll_copies(run)
+        for fut in done:
+            kind, item = run.tasks.pop(fut)
+            start, result, end, error = fut.result()
+            if kind == 'copy':
+                copy_submitted(run, item, start, result, end, error)
+            elif kind == 'results':
+                collect_results(run, item, result, end, error)
+            elif kind == 'verify':
+                check_done(run, item, start, result, end, error)
+            elif kind == 'chunk':
+                chunk_done(run, item, start, result, end, error)
+            else:
+                upload_done(run, kind, item, start, result, end, error)
+
+def build_report(run: LoadRun, plan: list) -> dict:
+    """Count the files still unverified, print the report and return it."""
+    for item in plan:
+        if not run.manifest.finished(item.path):
+            run.report[item.table]['left'] += 1
+    for r in run.report.values():
+        del r['start']
+    print_report(run.report)
+    left = sum(r['left'] for r in run.report.values())
+    if left:
+        print(f"\n{left} files not verified yet; run again to resume them")
+    return run.report
+
+def upload_and_load(data_dir: str, connect=get_connection, workers: int = LOAD_WORKERS,
+                    split_over: int = SPLIT_OVER_BYTES, chunk_bytes: int = CHUNK_BYTES,
+                    manifest_path: str = None, full: bool = False, validate: bool = True,
+                    columns: dict = None, typed: bool = False, reject_dir: str = None,
+                    validate_workers: int = prevalidate.WORKERS) -> dict:
+    """
+    PUT new or changed files in data_dir in parallel and COPY each table, with an
+    explicit FILES list, once its stage is fully uploaded, then check that the
+    raw table holds each file's rows. COPYs run asynchronously: any number of
+    them can be in flight while uploads go on, polled by query id. CSVs larger
+    than split_over bytes are first split into gzip chunks of about chunk_bytes.
+
+    With validate, CSVs to upload are scanned by prevalidate first: rejected
+    rows go to reject_dir (default data_dir/rejects) and the file's cleaned
+    copy is uploaded in its place. Files already loaded only lend their keys to
+    the foreign key check. Parquet files are checked with validate_file. A file
+    that fails as a whole is left out of the load (status invalid). columns
+    maps a raw table to the columns to load; typed casts values to their
+    registry types inside COPY.
+
+    Statements are retried with backoff behind a shared circuit breaker. A file
+    whose PUT, COPY or check still fails keeps its last state in the manifest
+    (default data_dir/load_manifest.json) while the rest of the load goes on;
+    if the breaker gives up, running work finishes and nothing new starts.
+    The next run skips verified files, resumes uploaded ones at COPY and
+    copied ones at the check. full=True ignores the manifest.
+
+    Returns {table: {files, skipped, invalid, pre_rejected, bytes, chunk_bytes,
+    parsed, rows, rejected, verified, left, first_error, wall_s, copy, queries}}
+    where invalid counts files and pre_rejected rows rejected locally, rows is
+    rows loaded (the checked count for a file COPY reported nothing for),
+    rejected counts rows ON_ERROR='CONTINUE' skipped, left counts
+    files not verified by the end of the run, and wall_s runs from the table's
+    first check/split/PUT to the end of its last COPY or check. copy holds
+    COPY's per-file results ({file, status, rows_parsed, rows_loaded, errors,
+    first_error}) and queries each COPY query ({query_id, seconds, status}).
+    """
+    manifest  = LoadManifest(manifest_path or os.path.join(data_dir, MANIFEST_NAME))
+    breaker   = CircuitBreaker()
+    conn      = connect()
+    split_dir = tempfile.mkdtemp(prefix='retail_split_')
+    run       = LoadRun(conn, manifest, breaker, split_dir, split_over, chunk_bytes, columns or {}, typed)
+    try:
+        execute(conn, 'USE DATABASE RETAIL_DW', breaker)
+        execute(conn, 'USE WAREHOUSE RETAIL_WH', breaker)
+
+        plan = plan_files(data_dir)
+        uploads, loaded, checks = plan_load(run, plan, full, validate)
+        if validate:
+            uploads = prevalidate_uploads(run, uploads, loaded, reject_dir or os.path.join(data_dir, 'rejects'),
+                                          validate_workers)
+
+        print(f"Loading {len(uploads)} of {len(plan)} files with {workers} workers "
+              f"(PUT PARALLEL={PUT_PARALLEL}, {sum(len(v) for v in run.staged.values())} resumed at COPY, "
+              f"{sum(len(v) for v in checks.values())} at the check)")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            run.pool = pool
+            start_load(run, uploads, checks, validate)
+            run_load(run)
+        return build_report(run, plan)
     finally:
-        cs.close()
+        shutil.rmtree(split_dir, ignore_errors=True)
         conn.close()
 
 if __name__ == '__main__':
-    csv_dir = os.path.join(os.path.dirname(__file__), '..', 'data', 'csv')
-    upload_and_load(csv_dir)
+    parser = argparse.ArgumentParser(description='PUT generated files to Snowflake stages and COPY them into raw tables.')
+    parser.add_argument('format', nargs='?', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--workers', type=int, default=LOAD_WORKERS)
+    parser.add_argument('--split-over-mb', type=float, default=SPLIT_OVER_BYTES / 1e6,
+                        help='split CSVs larger than this before PUT')
+    parser.add_argument('--chunk-mb', type=float, default=CHUNK_BYTES / 1e6,
+                        help='target compressed size of each split chunk')
+    parser.add_argument('--manifest', help=f'load manifest path (default: <data dir>/{MANIFEST_NAME})')
+    parser.add_argument('--full', action='store_true', help='ignore the manifest and reload every file')
+    parser.add_argument('--no-validate', action='store_true',
+                        help='skip local pre-validation before upload')
+    parser.add_argument('--rejects', help='reject file directory (default: <data dir>/rejects)')
+    parser.add_argument('--validate-workers', type=int, default=prevalidate.WORKERS,
+                        help='processes scanning CSVs before upload')
+    parser.add_argument('--typed', action='store_true',
+                        help='cast values to their registry types in COPY, rejecting ones that do not parse')
+    parser.add_argument('--columns', action='append', default=[], metavar='TABLE=COL,...',
+                        help='load only these columns (plus the key) of a raw table; repeatable')
+    parser.add_argument('--report', metavar='FILE', help='also write the load report as JSON')
+    parser.add_argument('--local', metavar='DIR',
+                        help='load into a local stand-in (local_snowflake.py) staged under DIR instead of Snowflake')
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help='with --local, fail this share of PUT/COPY/SELECT statements to exercise retries')
+    parser.add_argument('--outage', type=int, default=0,
+                        help='with --local, fail the first N statements outright to open the circuit breaker')
+    parser.add_argument('--seed', type=int, help='with --local, seed for the injected faults')
+    args     = parser.parse_args()
+    columns  = {table.upper(): cols.split(',') for table, _, cols in (c.partition('=') for c in args.columns)}
+    data_dir = os.path.join(os.path.dirname(__file__), '..', 'data', args.format)
+    connect  = get_connection
+    manifest = args.manifest
+    if args.local:
+        import local_snowflake
+        connect  = lambda: local_snowflake.connect(args.local, args.fail_rate, args.seed, args.outage)
+        manifest = manifest or os.path.join(args.local, f'{args.format}_{MANIFEST_NAME}')
+    report   = upload_and_load(data_dir, connect, args.workers,
+                               int(args.split_over_mb * 1e6), int(args.chunk_mb * 1e6), manifest, args.full,
+                               not args.no_validate, columns, args.typed, args.rejects, args.validate_workers)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if any(r['left'] for r in report.values()) else 0)
@@ -2,6 +2,8 @@
 -- STAGE LAYER (Layer 1) - RAW TABLES
 -- Exact copies of source CSV columns, all VARCHAR
 -- Loaded via COPY INTO from internal stages
+-- Column lists come from scripts/schema_registry.py: its `ddl`
+-- command prints these tables and `check` diffs this file
 -- ============================================================
 
 USE DATABASE RETAIL_DW;
@@ -198,19 +200,93 @@ CREATE OR REPLACE TABLE STG_RETURN_RAW (
 -- RAW INVENTORY
 -- ============================================================
 CREATE OR REPLACE TABLE STG_INVENTORY_RAW (
-    inventory_id            VARCHAR,
-    store_id                VARCHAR,
-    product_id              VARCHAR,
-    quantity_on_hand        VARCHAR,
-    quantity_reserved       VARCHAR,
-    quantity_available      VARCHAR,
-    reorder_point           VARCHAR,
-    reorder_quantity        VARCHAR,
-    last_restock_date       VARCHAR,
-    last_sold_date          VARCHAR,
-    snapshot_date           VARCHAR,
-    created_at              VARCHAR,
-    updated_at              VARCHAR,
-    _stg_file_name          VARCHAR,
-    _stg_load_ts            TIMESTAMP DEFAULT CURRENT_TIMESTAMP()
+    inventory_id        VARCHAR,
+    store_id            VARCHAR,
+    product_id          VARCHAR,
+    quantity_on_hand    VARCHAR,
+    quantity_reserved   VARCHAR,
+    quantity_available  VARCHAR,
+    reorder_point       VARCHAR,
+    reorder_quantity    VARCHAR,
+    last_restock_date   VARCHAR,
+    last_sold_date      VARCHAR,
+    snapshot_date       VARCHAR,
+    created_at          VARCHAR,
+    updated_at          VARCHAR,
+    _stg_file_name      VARCHAR,
+    _stg_load_ts        TIMESTAMP DEFAULT CURRENT_TIMESTAMP()
 );
+
+-- ============================================================
+-- ARCHIVE TABLES
+-- Raw rows already merged into the clean layer are moved here by
+-- 05_Transformation/05_stage_retention.sql, keeping the raw tables
+-- small. Kept across redeploys of the raw tables; to replay a
+-- table, insert its rows back and reset its ETL_WATERMARK row
+-- ============================================================
+CREATE TABLE IF NOT EXISTS STG_LOCATION_RAW_ARCHIVE LIKE STG_LOCATION_RAW;
+CREATE TABLE IF NOT EXISTS STG_STORE_RAW_ARCHIVE LIKE STG_STORE_RAW;
+CREATE TABLE IF NOT EXISTS STG_CUSTOMER_RAW_ARCHIVE LIKE STG_CUSTOMER_RAW;
+CREATE TABLE IF NOT EXISTS STG_PRODUCT_CATEGORY_RAW_ARCHIVE LIKE STG_PRODUCT_CATEGORY_RAW;
+CREATE TABLE IF NOT EXISTS STG_PRODUCT_RAW_ARCHIVE LIKE STG_PRODUCT_RAW;
+CREATE TABLE IF NOT EXISTS STG_SALES_TRANSACTION_RAW_ARCHIVE LIKE STG_SALES_TRANSACTION_RAW;
+CREATE TABLE IF NOT EXISTS STG_SALES_LINE_RAW_ARCHIVE LIKE STG_SALES_LINE_RAW;
+CREATE TABLE IF NOT EXISTS STG_PAYMENT_RAW_ARCHIVE LIKE STG_PAYMENT_RAW;
+CREATE TABLE IF NOT EXISTS STG_RETURN_RAW_ARCHIVE LIKE STG_RETURN_RAW;
+CREATE TABLE IF NOT EXISTS STG_INVENTORY_RAW_ARCHIVE LIKE STG_INVENTORY_RAW;
+
+-- ============================================================
+-- CREATE STREAMS for new raw rows
+-- Append-only: COPY INTO only inserts, and the retention job's
+-- deletes are ignored. TASK_STAGE_TO_CLEAN runs only WHEN one of
+-- them has data, and consumes them on success
+-- ============================================================
+CREATE OR REPLACE STREAM STM_STG_LOCATION_RAW
+    ON TABLE STG_LOCATION_RAW
+    APPEND_ONLY = TRUE
+    COMMENT = 'New rows in raw location table';
+
+CREATE OR REPLACE STREAM STM_STG_STORE_RAW
+    ON TABLE STG_STORE_RAW
+    APPEND_ONLY = TRUE
+    COMMENT = 'New rows in raw store table';
+
+CREATE OR REPLACE STREAM STM_STG_CUSTOMER_RAW
+    ON TABLE STG_CUSTOMER_RAW
+    APPEND_ONLY = TRUE
+    COMMENT = 'New rows in raw customer table';
+
+CREATE OR REPLACE STREAM STM_STG_PRODUCT_CATEGORY_RAW
+    ON TABLE STG_PRODUCT_CATEGORY_RAW
+    APPEND_ONLY = TRUE
+    COMMENT = 'New rows in raw product category table';
+
+CREATE OR REPLACE STREAM STM_STG_PRODUCT_RAW
+    ON TABLE STG_PRODUCT_RAW
+    APPEND_ONLY = TRUE
+    COMMENT = 'New rows in raw product table';
+
+CREATE OR REPLACE STREAM STM_STG_SALES_TRANSACTION_RAW
+    ON TABLE STG_SALES_TRANSACTION_RAW
+    APPEND_ONLY = TRUE
+    COMMENT = 'New rows in raw sales transaction table';
+
+CREATE OR REPLACE STREAM STM_STG_SALES_LINE_RAW
+    ON TABLE STG_SALES_LINE_RAW
+    APPEND_ONLY = TRUE
+    COMMENT = 'New rows in raw sales line table';
+
+CREATE OR REPLACE STREAM STM_STG_PAYMENT_RAW
+    ON TABLE STG_PAYMENT_RAW
+    APPEND_ONLY = TRUE
+    COMMENT = 'New rows in raw payment table';
+
+CREATE OR REPLACE STREAM STM_STG_RETURN_RAW
+    ON TABLE STG_RETURN_RAW
+    APPEND_ONLY = TRUE
+    COMMENT = 'New rows in raw return table';
+
+CREATE OR REPLACE STREAM STM_STG_INVENTORY_RAW
+    ON TABLE STG_INVENTORY_RAW
+    APPEND_ONLY = TRUE
+    COMMENT = 'New rows in raw inventory table';
@@ -10,17 +10,23 @@ USE WAREHOUSE RETAIL_WH;
 -- ============================================================
 -- Step 1: PUT local CSV files to Snowflake stages
 -- (Run from SnowSQL CLI or Python connector)
+-- Each table's files go to their own sub-path, so tables sharing
+-- a stage (PRODUCT, SALES) never scan or parse each other's
+-- files; PATTERN further limits COPY to the table's own files
+-- (and their _partNNNN / _chunkNNNN pieces).
+-- scripts/snowflake_loader.py generates the same statements
+-- from scripts/schema_registry.py (`schema_registry.py copy`).
 -- ============================================================
--- PUT file:///path/to/data/location.csv           @STG_LOCATION_STAGE;
--- PUT file:///path/to/data/store.csv              @STG_STORE_STAGE;
--- PUT file:///path/to/data/customer.csv           @STG_CUSTOMER_STAGE;
--- PUT file:///path/to/data/product_category.csv   @STG_PRODUCT_STAGE;
--- PUT file:///path/to/data/product.csv            @STG_PRODUCT_STAGE;
--- PUT file:///path/to/data/sales_transaction.csv  @STG_SALES_STAGE;
--- PUT file:///path/to/data/sales_line.csv         @STG_SALES_STAGE;
--- PUT file:///path/to/data/payment.csv            @STG_PAYMENT_STAGE;
--- PUT file:///path/to/data/return_transaction.csv @STG_RETURN_STAGE;
--- PUT file:///path/to/data/inventory.csv          @STG_INVENTORY_STAGE;
+-- PUT file:///path/to/data/location.csv           @STG_LOCATION_STAGE/location/;
+-- PUT file:///path/to/data/store.csv              @STG_STORE_STAGE/store/;
+-- PUT file:///path/to/data/customer.csv           @STG_CUSTOMER_STAGE/customer/;
+-- PUT file:///path/to/data/product_category.csv   @STG_PRODUCT_STAGE/product_category/;
+-- PUT file:///path/to/data/product.csv            @STG_PRODUCT_STAGE/product/;
+-- PUT file:///path/to/data/sales_transaction.csv  @STG_SALES_STAGE/sales_transaction/;
+-- PUT file:///path/to/data/sales_line.csv         @STG_SALES_STAGE/sales_line/;
+-- PUT file:///path/to/data/payment.csv            @STG_PAYMENT_STAGE/payment/;
+-- PUT file:///path/to/data/return_transaction.csv @STG_RETURN_STAGE/return_transaction/;
+-- PUT file:///path/to/data/inventory.csv          @STG_INVENTORY_STAGE/inventory/;
 
 -- ============================================================
 -- Step 2: COPY INTO raw tables
@@ -34,9 +40,10 @@ FROM (
     SELECT
         $1, $2, $3, $4, $5, $6, $7, $8, $9,
         METADATA$FILENAME
-    FROM @STG_LOCATION_STAGE
+    FROM @STG_LOCATION_STAGE/location/
 )
 FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 1 NULL_IF = ('', 'NULL'))
+PATTERN = '(.*/)?location(_part[0-9]+)?(_chunk[0-9]+)?[.]csv([.]gz)?'
 ON_ERROR = 'CONTINUE';
 
 COPY INTO STG_STORE_RAW (
@@ -48,9 +55,10 @@ FROM (
     SELECT
         $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14,
         METADATA$FILENAME
-    FROM @STG_STORE_STAGE
+    FROM @STG_STORE_STAGE/store/
 )
 FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 1 NULL_IF = ('', 'NULL'))
+PATTERN = '(.*/)?store(_part[0-9]+)?(_chunk[0-9]+)?[.]csv([.]gz)?'
 ON_ERROR = 'CONTINUE';
 
 COPY INTO STG_CUSTOMER_RAW (
@@ -62,9 +70,24 @@ FROM (
     SELECT
         $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15,
         METADATA$FILENAME
-    FROM @STG_CUSTOMER_STAGE
+    FROM @STG_CUSTOMER_STAGE/customer/
 )
 FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 1 NULL_IF = ('', 'NULL'))
+PATTERN = '(.*/)?customer(_part[0-9]+)?(_chunk[0-9]+)?[.]csv([.]gz)?'
+ON_ERROR = 'CONTINUE';
+
+COPY INTO STG_PRODUCT_CATEGORY_RAW (
+    category_id, category_code, category_name, parent_category_id, description,
+    is_active, created_at, _stg_file_name
+)
+FROM (
+    SELECT
+        $1, $2, $3, $4, $5, $6, $7,
+        METADATA$FILENAME
+    FROM @STG_PRODUCT_STAGE/product_category/
+)
+FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 1 NULL_IF = ('', 'NULL'))
+PATTERN = '(.*/)?product_category(_part[0-9]+)?(_chunk[0-9]+)?[.]csv([.]gz)?'
 ON_ERROR = 'CONTINUE';
 
 COPY INTO STG_PRODUCT_RAW (
@@ -77,9 +100,10 @@ FROM (
     SELECT
         $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19,
         METADATA$FILENAME
-    FROM @STG_PRODUCT_STAGE
+    FROM @STG_PRODUCT_STAGE/product/
 )
 FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 1 NULL_IF = ('', 'NULL'))
+PATTERN = '(.*/)?product(_part[0-9]+)?(_chunk[0-9]+)?[.]csv([.]gz)?'
 ON_ERROR = 'CONTINUE';
 
 COPY INTO STG_SALES_TRANSACTION_RAW (
@@ -92,9 +116,10 @@ FROM (
     SELECT
         $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16,
         METADATA$FILENAME
-    FROM @STG_SALES_STAGE
+    FROM @STG_SALES_STAGE/sales_transaction/
 )
 FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 1 NULL_IF = ('', 'NULL'))
+PATTERN = '(.*/)?sales_transaction(_part[0-9]+)?(_chunk[0-9]+)?[.]csv([.]gz)?'
 ON_ERROR = 'CONTINUE';
 
 COPY INTO STG_SALES_LINE_RAW (
@@ -106,9 +131,10 @@ FROM (
     SELECT
         $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14,
         METADATA$FILENAME
-    FROM @STG_SALES_STAGE
+    FROM @STG_SALES_STAGE/sales_line/
 )
 FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 1 NULL_IF = ('', 'NULL'))
+PATTERN = '(.*/)?sales_line(_part[0-9]+)?(_chunk[0-9]+)?[.]csv([.]gz)?'
 ON_ERROR = 'CONTINUE';
 
 COPY INTO STG_PAYMENT_RAW (
@@ -119,9 +145,10 @@ FROM (
     SELECT
         $1, $2, $3, $4, $5, $6, $7, $8, $9,
         METADATA$FILENAME
-    FROM @STG_PAYMENT_STAGE
+    FROM @STG_PAYMENT_STAGE/payment/
 )
 FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 1 NULL_IF = ('', 'NULL'))
+PATTERN = '(.*/)?payment(_part[0-9]+)?(_chunk[0-9]+)?[.]csv([.]gz)?'
 ON_ERROR = 'CONTINUE';
 
 COPY INTO STG_RETURN_RAW (
@@ -133,9 +160,10 @@ FROM (
     SELECT
         $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11,
         METADATA$FILENAME
-    FROM @STG_RETURN_STAGE
+    FROM @STG_RETURN_STAGE/return_transaction/
 )
 FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 1 NULL_IF = ('', 'NULL'))
+PATTERN = '(.*/)?return_transaction(_part[0-9]+)?(_chunk[0-9]+)?[.]csv([.]gz)?'
 ON_ERROR = 'CONTINUE';
 
 COPY INTO STG_INVENTORY_RAW (
@@ -147,11 +175,46 @@ FROM (
     SELECT
         $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13,
         METADATA$FILENAME
-    FROM @STG_INVENTORY_STAGE
+    FROM @STG_INVENTORY_STAGE/inventory/
 )
 FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 1 NULL_IF = ('', 'NULL'))
+PATTERN = '(.*/)?inventory(_part[0-9]+)?(_chunk[0-9]+)?[.]csv([.]gz)?'
 ON_ERROR = 'CONTINUE';
 
+-- ============================================================
+-- Per-table load report: rows parsed, loaded and rejected by
+-- ON_ERROR = 'CONTINUE' over the last day
+-- ============================================================
+SELECT table_name,
+       COUNT(*)                 AS files,
+       SUM(row_parsed)          AS rows_parsed,
+       SUM(row_count)           AS rows_loaded,
+       SUM(error_count)         AS rows_rejected,
+       MAX(first_error_message) AS sample_error
+FROM (
+    SELECT 'STG_LOCATION_RAW' AS table_name, * FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(TABLE_NAME => 'STG_LOCATION_RAW', START_TIME => DATEADD(DAY, -1, CURRENT_TIMESTAMP())))
+    UNION ALL
+    SELECT 'STG_STORE_RAW', * FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(TABLE_NAME => 'STG_STORE_RAW', START_TIME => DATEADD(DAY, -1, CURRENT_TIMESTAMP())))
+    UNION ALL
+    SELECT 'STG_CUSTOMER_RAW', * FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(TABLE_NAME => 'STG_CUSTOMER_RAW', START_TIME => DATEADD(DAY, -1, CURRENT_TIMESTAMP())))
+    UNION ALL
+    SELECT 'STG_PRODUCT_CATEGORY_RAW', * FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(TABLE_NAME => 'STG_PRODUCT_CATEGORY_RAW', START_TIME => DATEADD(DAY, -1, CURRENT_TIMESTAMP())))
+    UNION ALL
+    SELECT 'STG_PRODUCT_RAW', * FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(TABLE_NAME => 'STG_PRODUCT_RAW', START_TIME => DATEADD(DAY, -1, CURRENT_TIMESTAMP())))
+    UNION ALL
+    SELECT 'STG_SALES_TRANSACTION_RAW', * FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(TABLE_NAME => 'STG_SALES_TRANSACTION_RAW', START_TIME => DATEADD(DAY, -1, CURRENT_TIMESTAMP())))
+    UNION ALL
+    SELECT 'STG_SALES_LINE_RAW', * FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(TABLE_NAME => 'STG_SALES_LINE_RAW', START_TIME => DATEADD(DAY, -1, CURRENT_TIMESTAMP())))
+    UNION ALL
+    SELECT 'STG_PAYMENT_RAW', * FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(TABLE_NAME => 'STG_PAYMENT_RAW', START_TIME => DATEADD(DAY, -1, CURRENT_TIMESTAMP())))
+    UNION ALL
+    SELECT 'STG_RETURN_RAW', * FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(TABLE_NAME => 'STG_RETURN_RAW', START_TIME => DATEADD(DAY, -1, CURRENT_TIMESTAMP())))
+    UNION ALL
+    SELECT 'STG_INVENTORY_RAW', * FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(TABLE_NAME => 'STG_INVENTORY_RAW', START_TIME => DATEADD(DAY, -1, CURRENT_TIMESTAMP())))
+)
+GROUP BY table_name
+ORDER BY table_name;
+
 -- ============================================================
 -- Verify row counts after loading
 -- ============================================================
@@ -161,6 +224,8 @@ SELECT 'STG_STORE_RAW',         COUNT(*) FROM STG_STORE_RAW
 UNION ALL
 SELECT 'STG_CUSTOMER_RAW',      COUNT(*) FROM STG_CUSTOMER_RAW
 UNION ALL
+SELECT 'STG_PRODUCT_CATEGORY_RAW', COUNT(*) FROM STG_PRODUCT_CATEGORY_RAW
+UNION ALL
 SELECT 'STG_PRODUCT_RAW',       COUNT(*) FROM STG_PRODUCT_RAW
 UNION ALL
 SELECT 'STG_SALES_TRANSACTION_RAW', COUNT(*) FROM STG_SALES_TRANSACTION_RAW
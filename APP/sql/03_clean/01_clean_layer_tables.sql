@@ -238,8 +238,13 @@ CREATE OR REPLACE TABLE CLN_INVENTORY (
 
 -- ============================================================
 -- CREATE STREAMS for CDC (Change Data Capture)
--- Used by MERGE jobs to propagate changes to Consumption layer
+-- Gate the dimension and fact tasks (WHEN SYSTEM$STREAM_HAS_DATA),
+-- which consume them on success
 -- ============================================================
+CREATE OR REPLACE STREAM STM_CLN_LOCATION
+    ON TABLE CLN_LOCATION
+    COMMENT = 'CDC stream on clean location table';
+
 CREATE OR REPLACE STREAM STM_CLN_CUSTOMER
     ON TABLE CLN_CUSTOMER
     COMMENT = 'CDC stream on clean customer table';
@@ -248,6 +253,10 @@ CREATE OR REPLACE STREAM STM_CLN_STORE
     ON TABLE CLN_STORE
     COMMENT = 'CDC stream on clean store table';
 
+CREATE OR REPLACE STREAM STM_CLN_PRODUCT_CATEGORY
+    ON TABLE CLN_PRODUCT_CATEGORY
+    COMMENT = 'CDC stream on clean product category table';
+
 CREATE OR REPLACE STREAM STM_CLN_PRODUCT
     ON TABLE CLN_PRODUCT
     COMMENT = 'CDC stream on clean product table';
@@ -263,3 +272,11 @@ CREATE OR REPLACE STREAM STM_CLN_SALES_LINE
 CREATE OR REPLACE STREAM STM_CLN_INVENTORY
     ON TABLE CLN_INVENTORY
     COMMENT = 'CDC stream on clean inventory table';
+
+CREATE OR REPLACE STREAM STM_CLN_PAYMENT
+    ON TABLE CLN_PAYMENT
+    COMMENT = 'CDC stream on clean payment table';
+
+CREATE OR REPLACE STREAM STM_CLN_RETURN
+    ON TABLE CLN_RETURN
+    COMMENT = 'CDC stream on clean return table';
@@ -43,7 +43,8 @@ CREATE OR REPLACE TABLE FACT_SALES (
     loyalty_points_earned   NUMBER          NOT NULL DEFAULT 0,
 
     -- Audit
-    _dw_inserted_ts         TIMESTAMP       DEFAULT CURRENT_TIMESTAMP()
+    _dw_inserted_ts         TIMESTAMP       DEFAULT CURRENT_TIMESTAMP(),
+    _dw_updated_ts          TIMESTAMP       DEFAULT CURRENT_TIMESTAMP()
 );
 
 -- ============================================================
@@ -157,3 +158,65 @@ CREATE OR REPLACE TABLE AGG_MONTHLY_PRODUCT_SALES (
     transaction_count       NUMBER          NOT NULL DEFAULT 0,
     _dw_refreshed_ts        TIMESTAMP       DEFAULT CURRENT_TIMESTAMP()
 );
+
+-- ============================================================
+-- ETL WATERMARKS
+-- One row per incrementally loaded table: the source-layer
+-- timestamp already merged (high_water_ts) and the upper bound
+-- of the run in progress (next_high_water_ts). CLN_* rows track
+-- _stg_load_ts of the raw table feeding that clean table. A COPY
+-- stamps its rows with its start time but they only become visible
+-- when it commits, so a CLN_* mark stays settle_minutes behind the
+-- clock; keep that longer than the longest COPY
+-- ============================================================
+CREATE OR REPLACE TABLE ETL_WATERMARK (
+    table_name              VARCHAR(100)    NOT NULL PRIMARY KEY,
+    high_water_ts           TIMESTAMP       NOT NULL,
+    next_high_water_ts      TIMESTAMP       NOT NULL,
+    settle_minutes          NUMBER(5,0)     DEFAULT 30 NOT NULL,
+    _dw_updated_ts          TIMESTAMP       DEFAULT CURRENT_TIMESTAMP()
+);
+
+INSERT INTO ETL_WATERMARK (table_name, high_water_ts, next_high_water_ts) VALUES
+    ('CLN_LOCATION',              '1900-01-01', '1900-01-01'),
+    ('CLN_STORE',                 '1900-01-01', '1900-01-01'),
+    ('CLN_CUSTOMER',              '1900-01-01', '1900-01-01'),
+    ('CLN_PRODUCT_CATEGORY',      '1900-01-01', '1900-01-01'),
+    ('CLN_PRODUCT',               '1900-01-01', '1900-01-01'),
+    ('CLN_SALES_TRANSACTION',     '1900-01-01', '1900-01-01'),
+    ('CLN_SALES_LINE',            '1900-01-01', '1900-01-01'),
+    ('CLN_PAYMENT',               '1900-01-01', '1900-01-01'),
+    ('CLN_RETURN',                '1900-01-01', '1900-01-01'),
+    ('CLN_INVENTORY',             '1900-01-01', '1900-01-01'),
+    ('FACT_SALES',                '1900-01-01', '1900-01-01'),
+    ('AGG_MONTHLY_STORE_SALES',   '1900-01-01', '1900-01-01'),
+    ('AGG_MONTHLY_PRODUCT_SALES', '1900-01-01', '1900-01-01');
+
+-- ============================================================
+-- TASK RUN AUDIT
+-- One row per table a task run processed: the change rows it
+-- consumed from that table's stream, and the run's start and end.
+-- Shown on the dashboard's Architecture page
+-- ============================================================
+CREATE OR REPLACE TABLE TASK_RUN_AUDIT (
+    audit_sk                NUMBER AUTOINCREMENT PRIMARY KEY,
+    task_name               VARCHAR(100)    NOT NULL,
+    run_group_id            VARCHAR(100),                       -- one run of the task DAG
+    table_name              VARCHAR(200)    NOT NULL,
+    rows_processed          NUMBER          NOT NULL DEFAULT 0,
+    started_ts              TIMESTAMP       NOT NULL,
+    completed_ts            TIMESTAMP       NOT NULL
+);
+
+-- ============================================================
+-- CREATE STREAMS on facts
+-- TASK_REFRESH_AGGREGATES runs only WHEN one of them has data
+-- ============================================================
+CREATE OR REPLACE STREAM STM_FACT_SALES
+    ON TABLE FACT_SALES
+    COMMENT = 'CDC stream on sales facts';
+
+CREATE OR REPLACE STREAM STM_FACT_RETURNS
+    ON TABLE FACT_RETURNS
+    APPEND_ONLY = TRUE
+    COMMENT = 'New return facts';
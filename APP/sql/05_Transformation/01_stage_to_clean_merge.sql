@@ -1,17 +1,57 @@
 -- ============================================================
 -- STAGE → CLEAN LAYER MERGE TRANSFORMATIONS
 -- Cleans, validates, and casts data from Stage raw tables
+--
+-- Raw tables only grow, so each MERGE reads just the rows loaded
+-- since its clean table's ETL_WATERMARK: _stg_load_ts in
+-- (high_water_ts, next_high_water_ts]. Within that window the
+-- latest version of each business key wins (newest _stg_load_ts,
+-- then _stg_file_name). Processed rows are archived by
+-- 05_stage_retention.sql.
 -- ============================================================
 
 USE DATABASE RETAIL_DW;
 USE WAREHOUSE RETAIL_WH;
 
+BEGIN TRANSACTION;
+
+-- Fix this run's upper bound per table; rows loaded while it runs
+-- are left for the next run. The bound stays settle_minutes behind
+-- the clock: a COPY still running has stamped its rows with its
+-- start time, and they must not commit below a mark already passed
+UPDATE CONSUMPTION_LAYER.ETL_WATERMARK wm
+SET next_high_water_ts = GREATEST(wm.high_water_ts,
+        LEAST(COALESCE(m.max_load_ts, wm.high_water_ts),
+              DATEADD(MINUTE, -wm.settle_minutes, CURRENT_TIMESTAMP())))
+FROM (
+    SELECT 'CLN_LOCATION' AS table_name, MAX(_stg_load_ts) AS max_load_ts FROM STAGE_LAYER.STG_LOCATION_RAW
+    UNION ALL
+    SELECT 'CLN_STORE',             MAX(_stg_load_ts) FROM STAGE_LAYER.STG_STORE_RAW
+    UNION ALL
+    SELECT 'CLN_CUSTOMER',          MAX(_stg_load_ts) FROM STAGE_LAYER.STG_CUSTOMER_RAW
+    UNION ALL
+    SELECT 'CLN_PRODUCT_CATEGORY',  MAX(_stg_load_ts) FROM STAGE_LAYER.STG_PRODUCT_CATEGORY_RAW
+    UNION ALL
+    SELECT 'CLN_PRODUCT',           MAX(_stg_load_ts) FROM STAGE_LAYER.STG_PRODUCT_RAW
+    UNION ALL
+    SELECT 'CLN_SALES_TRANSACTION', MAX(_stg_load_ts) FROM STAGE_LAYER.STG_SALES_TRANSACTION_RAW
+    UNION ALL
+    SELECT 'CLN_SALES_LINE',        MAX(_stg_load_ts) FROM STAGE_LAYER.STG_SALES_LINE_RAW
+    UNION ALL
+    SELECT 'CLN_PAYMENT',           MAX(_stg_load_ts) FROM STAGE_LAYER.STG_PAYMENT_RAW
+    UNION ALL
+    SELECT 'CLN_RETURN',            MAX(_stg_load_ts) FROM STAGE_LAYER.STG_RETURN_RAW
+    UNION ALL
+    SELECT 'CLN_INVENTORY',         MAX(_stg_load_ts) FROM STAGE_LAYER.STG_INVENTORY_RAW
+) m
+WHERE wm.table_name = m.table_name;
+
 -- ============================================================
 -- MERGE: Location
 -- ============================================================
 MERGE INTO CLEAN_LAYER.CLN_LOCATION tgt
 USING (
-    SELECT DISTINCT
+    SELECT
         TRY_TO_NUMBER(location_id)                              AS location_id,
         TRIM(street_address)                                    AS street_address,
         INITCAP(TRIM(city))                                     AS city,
@@ -22,8 +62,15 @@ USING (
         TRY_TO_TIMESTAMP(created_at)                            AS created_at,
         TRY_TO_TIMESTAMP(updated_at)                            AS updated_at
     FROM STAGE_LAYER.STG_LOCATION_RAW
+    JOIN CONSUMPTION_LAYER.ETL_WATERMARK wm
+      ON wm.table_name = 'CLN_LOCATION'
+     AND _stg_load_ts >  wm.high_water_ts
+     AND _stg_load_ts <= wm.next_high_water_ts
     WHERE location_id IS NOT NULL
       AND TRY_TO_NUMBER(location_id) IS NOT NULL
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY TRY_TO_NUMBER(location_id)
+        ORDER BY _stg_load_ts DESC, _stg_file_name DESC) = 1
 ) src
 ON tgt.location_id = src.location_id
 WHEN MATCHED AND (
@@ -53,7 +100,7 @@ WHEN NOT MATCHED THEN INSERT (
 -- ============================================================
 MERGE INTO CLEAN_LAYER.CLN_STORE tgt
 USING (
-    SELECT DISTINCT
+    SELECT
         TRY_TO_NUMBER(store_id)                                 AS store_id,
         UPPER(TRIM(store_code))                                 AS store_code,
         TRIM(store_name)                                        AS store_name,
@@ -69,8 +116,15 @@ USING (
         TRY_TO_TIMESTAMP(created_at)                           AS created_at,
         TRY_TO_TIMESTAMP(updated_at)                           AS updated_at
     FROM STAGE_LAYER.STG_STORE_RAW
+    JOIN CONSUMPTION_LAYER.ETL_WATERMARK wm
+      ON wm.table_name = 'CLN_STORE'
+     AND _stg_load_ts >  wm.high_water_ts
+     AND _stg_load_ts <= wm.next_high_water_ts
     WHERE store_id IS NOT NULL
       AND TRY_TO_NUMBER(store_id) IS NOT NULL
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY TRY_TO_NUMBER(store_id)
+        ORDER BY _stg_load_ts DESC, _stg_file_name DESC) = 1
 ) src
 ON tgt.store_id = src.store_id
 WHEN MATCHED AND (
@@ -105,7 +159,7 @@ WHEN NOT MATCHED THEN INSERT (
 -- ============================================================
 MERGE INTO CLEAN_LAYER.CLN_CUSTOMER tgt
 USING (
-    SELECT DISTINCT
+    SELECT
         TRY_TO_NUMBER(customer_id)                             AS customer_id,
         UPPER(TRIM(customer_code))                             AS customer_code,
         INITCAP(TRIM(first_name))                              AS first_name,
@@ -122,9 +176,16 @@ USING (
         TRY_TO_TIMESTAMP(created_at)                           AS created_at,
         TRY_TO_TIMESTAMP(updated_at)                           AS updated_at
     FROM STAGE_LAYER.STG_CUSTOMER_RAW
+    JOIN CONSUMPTION_LAYER.ETL_WATERMARK wm
+      ON wm.table_name = 'CLN_CUSTOMER'
+     AND _stg_load_ts >  wm.high_water_ts
+     AND _stg_load_ts <= wm.next_high_water_ts
     WHERE customer_id IS NOT NULL
       AND TRY_TO_NUMBER(customer_id) IS NOT NULL
       AND email IS NOT NULL AND TRIM(email) != ''
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY TRY_TO_NUMBER(customer_id)
+        ORDER BY _stg_load_ts DESC, _stg_file_name DESC) = 1
 ) src
 ON tgt.customer_id = src.customer_id
 WHEN MATCHED AND (
@@ -155,12 +216,55 @@ WHEN NOT MATCHED THEN INSERT (
     src.created_at, src.updated_at
 );
 
+-- ============================================================
+-- MERGE: Product Category
+-- ============================================================
+MERGE INTO CLEAN_LAYER.CLN_PRODUCT_CATEGORY tgt
+USING (
+    SELECT
+        TRY_TO_NUMBER(category_id)                             AS category_id,
+        UPPER(TRIM(category_code))                             AS category_code,
+        TRIM(category_name)                                    AS category_name,
+        TRY_TO_NUMBER(parent_category_id)                      AS parent_category_id,
+        TRIM(description)                                      AS description,
+        CASE WHEN UPPER(is_active) IN ('TRUE','1','YES') THEN TRUE ELSE FALSE END AS is_active,
+        TRY_TO_TIMESTAMP(created_at)                           AS created_at
+    FROM STAGE_LAYER.STG_PRODUCT_CATEGORY_RAW
+    JOIN CONSUMPTION_LAYER.ETL_WATERMARK wm
+      ON wm.table_name = 'CLN_PRODUCT_CATEGORY'
+     AND _stg_load_ts >  wm.high_water_ts
+     AND _stg_load_ts <= wm.next_high_water_ts
+    WHERE category_id IS NOT NULL
+      AND TRY_TO_NUMBER(category_id) IS NOT NULL
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY TRY_TO_NUMBER(category_id)
+        ORDER BY _stg_load_ts DESC, _stg_file_name DESC) = 1
+) src
+ON tgt.category_id = src.category_id
+WHEN MATCHED AND (
+    tgt.category_name      <> src.category_name      OR
+    tgt.is_active          <> src.is_active          OR
+    COALESCE(tgt.parent_category_id, -1) <> COALESCE(src.parent_category_id, -1)
+) THEN UPDATE SET
+    tgt.category_name      = src.category_name,
+    tgt.parent_category_id = src.parent_category_id,
+    tgt.description        = src.description,
+    tgt.is_active          = src.is_active,
+    tgt._dw_updated_ts     = CURRENT_TIMESTAMP()
+WHEN NOT MATCHED THEN INSERT (
+    category_id, category_code, category_name, parent_category_id,
+    description, is_active, created_at
+) VALUES (
+    src.category_id, src.category_code, src.category_name, src.parent_category_id,
+    src.description, src.is_active, src.created_at
+);
+
 -- ============================================================
 -- MERGE: Product
 -- ============================================================
 MERGE INTO CLEAN_LAYER.CLN_PRODUCT tgt
 USING (
-    SELECT DISTINCT
+    SELECT
         TRY_TO_NUMBER(product_id)                              AS product_id,
         UPPER(TRIM(product_code))                              AS product_code,
         UPPER(TRIM(sku))                                       AS sku,
@@ -181,8 +285,15 @@ USING (
         TRY_TO_TIMESTAMP(created_at)                           AS created_at,
         TRY_TO_TIMESTAMP(updated_at)                           AS updated_at
     FROM STAGE_LAYER.STG_PRODUCT_RAW
+    JOIN CONSUMPTION_LAYER.ETL_WATERMARK wm
+      ON wm.table_name = 'CLN_PRODUCT'
+     AND _stg_load_ts >  wm.high_water_ts
+     AND _stg_load_ts <= wm.next_high_water_ts
     WHERE product_id IS NOT NULL
       AND TRY_TO_NUMBER(product_id) IS NOT NULL
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY TRY_TO_NUMBER(product_id)
+        ORDER BY _stg_load_ts DESC, _stg_file_name DESC) = 1
 ) src
 ON tgt.product_id = src.product_id
 WHEN MATCHED AND (
@@ -215,7 +326,7 @@ WHEN NOT MATCHED THEN INSERT (
 -- ============================================================
 MERGE INTO CLEAN_LAYER.CLN_SALES_TRANSACTION tgt
 USING (
-    SELECT DISTINCT
+    SELECT
         TRY_TO_NUMBER(transaction_id)                          AS transaction_id,
         UPPER(TRIM(transaction_code))                          AS transaction_code,
         TRY_TO_TIMESTAMP(transaction_date)                     AS transaction_date,
@@ -233,10 +344,17 @@ USING (
         TRIM(notes)                                            AS notes,
         TRY_TO_TIMESTAMP(created_at)                           AS created_at
     FROM STAGE_LAYER.STG_SALES_TRANSACTION_RAW
+    JOIN CONSUMPTION_LAYER.ETL_WATERMARK wm
+      ON wm.table_name = 'CLN_SALES_TRANSACTION'
+     AND _stg_load_ts >  wm.high_water_ts
+     AND _stg_load_ts <= wm.next_high_water_ts
     WHERE transaction_id IS NOT NULL
       AND TRY_TO_NUMBER(transaction_id) IS NOT NULL
       AND TRY_TO_TIMESTAMP(transaction_date) IS NOT NULL
       AND TRY_TO_DECIMAL(total_amount, 12, 2) >= 0
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY TRY_TO_NUMBER(transaction_id)
+        ORDER BY _stg_load_ts DESC, _stg_file_name DESC) = 1
 ) src
 ON tgt.transaction_id = src.transaction_id
 WHEN NOT MATCHED THEN INSERT (
@@ -256,7 +374,7 @@ WHEN NOT MATCHED THEN INSERT (
 -- ============================================================
 MERGE INTO CLEAN_LAYER.CLN_SALES_LINE tgt
 USING (
-    SELECT DISTINCT
+    SELECT
         TRY_TO_NUMBER(line_id)                                 AS line_id,
         TRY_TO_NUMBER(transaction_id)                          AS transaction_id,
         TRY_TO_NUMBER(line_number)                             AS line_number,
@@ -272,9 +390,16 @@ USING (
         COALESCE(TRY_TO_DECIMAL(tax_amount, 10, 2), 0)         AS tax_amount,
         TRY_TO_TIMESTAMP(created_at)                           AS created_at
     FROM STAGE_LAYER.STG_SALES_LINE_RAW
+    JOIN CONSUMPTION_LAYER.ETL_WATERMARK wm
+      ON wm.table_name = 'CLN_SALES_LINE'
+     AND _stg_load_ts >  wm.high_water_ts
+     AND _stg_load_ts <= wm.next_high_water_ts
     WHERE line_id IS NOT NULL
       AND TRY_TO_NUMBER(line_id) IS NOT NULL
       AND TRY_TO_NUMBER(quantity) > 0
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY TRY_TO_NUMBER(line_id)
+        ORDER BY _stg_load_ts DESC, _stg_file_name DESC) = 1
 ) src
 ON tgt.line_id = src.line_id
 WHEN NOT MATCHED THEN INSERT (
@@ -292,7 +417,7 @@ WHEN NOT MATCHED THEN INSERT (
 -- ============================================================
 MERGE INTO CLEAN_LAYER.CLN_PAYMENT tgt
 USING (
-    SELECT DISTINCT
+    SELECT
         TRY_TO_NUMBER(payment_id)                              AS payment_id,
         TRY_TO_NUMBER(transaction_id)                          AS transaction_id,
         UPPER(TRIM(payment_method))                            AS payment_method,
@@ -303,8 +428,15 @@ USING (
         RIGHT(TRIM(card_last_four), 4)                         AS card_last_four,
         TRY_TO_TIMESTAMP(created_at)                           AS created_at
     FROM STAGE_LAYER.STG_PAYMENT_RAW
+    JOIN CONSUMPTION_LAYER.ETL_WATERMARK wm
+      ON wm.table_name = 'CLN_PAYMENT'
+     AND _stg_load_ts >  wm.high_water_ts
+     AND _stg_load_ts <= wm.next_high_water_ts
     WHERE payment_id IS NOT NULL
       AND TRY_TO_NUMBER(payment_id) IS NOT NULL
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY TRY_TO_NUMBER(payment_id)
+        ORDER BY _stg_load_ts DESC, _stg_file_name DESC) = 1
 ) src
 ON tgt.payment_id = src.payment_id
 WHEN NOT MATCHED THEN INSERT (
@@ -316,6 +448,44 @@ WHEN NOT MATCHED THEN INSERT (
     src.card_last_four, src.created_at
 );
 
+-- ============================================================
+-- MERGE: Return
+-- ============================================================
+MERGE INTO CLEAN_LAYER.CLN_RETURN tgt
+USING (
+    SELECT
+        TRY_TO_NUMBER(return_id)                               AS return_id,
+        UPPER(TRIM(return_code))                               AS return_code,
+        TRY_TO_NUMBER(original_transaction_id)                 AS original_transaction_id,
+        TRY_TO_TIMESTAMP(return_date)                          AS return_date,
+        TRY_TO_NUMBER(store_id)                                AS store_id,
+        TRY_TO_NUMBER(customer_id)                             AS customer_id,
+        UPPER(TRIM(return_reason))                             AS return_reason,
+        UPPER(TRIM(refund_method))                             AS refund_method,
+        COALESCE(TRY_TO_DECIMAL(refund_amount, 12, 2), 0)      AS refund_amount,
+        CASE WHEN UPPER(is_restocked) IN ('TRUE','1','YES') THEN TRUE ELSE FALSE END AS is_restocked,
+        TRY_TO_TIMESTAMP(created_at)                           AS created_at
+    FROM STAGE_LAYER.STG_RETURN_RAW
+    JOIN CONSUMPTION_LAYER.ETL_WATERMARK wm
+      ON wm.table_name = 'CLN_RETURN'
+     AND _stg_load_ts >  wm.high_water_ts
+     AND _stg_load_ts <= wm.next_high_water_ts
+    WHERE return_id IS NOT NULL
+      AND TRY_TO_NUMBER(return_id) IS NOT NULL
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY TRY_TO_NUMBER(return_id)
+        ORDER BY _stg_load_ts DESC, _stg_file_name DESC) = 1
+) src
+ON tgt.return_id = src.return_id
+WHEN NOT MATCHED THEN INSERT (
+    return_id, return_code, original_transaction_id, return_date, store_id,
+    customer_id, return_reason, refund_method, refund_amount, is_restocked, created_at
+) VALUES (
+    src.return_id, src.return_code, src.original_transaction_id, src.return_date,
+    src.store_id, src.customer_id, src.return_reason, src.refund_method,
+    src.refund_amount, src.is_restocked, src.created_at
+);
+
 -- ============================================================
 -- MERGE: Inventory
 -- ============================================================
@@ -336,8 +506,15 @@ USING (
         TRY_TO_TIMESTAMP(created_at)                           AS created_at,
         TRY_TO_TIMESTAMP(updated_at)                           AS updated_at
     FROM STAGE_LAYER.STG_INVENTORY_RAW
+    JOIN CONSUMPTION_LAYER.ETL_WATERMARK wm
+      ON wm.table_name = 'CLN_INVENTORY'
+     AND _stg_load_ts >  wm.high_water_ts
+     AND _stg_load_ts <= wm.next_high_water_ts
     WHERE inventory_id IS NOT NULL
       AND TRY_TO_NUMBER(inventory_id) IS NOT NULL
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY TRY_TO_NUMBER(inventory_id), COALESCE(TRY_TO_DATE(snapshot_date), CURRENT_DATE())
+        ORDER BY _stg_load_ts DESC, _stg_file_name DESC) = 1
 ) src
 ON tgt.inventory_id = src.inventory_id AND tgt.snapshot_date = src.snapshot_date
 WHEN MATCHED AND tgt.quantity_on_hand <> src.quantity_on_hand THEN UPDATE SET
@@ -358,3 +535,13 @@ WHEN NOT MATCHED THEN INSERT (
     src.reorder_quantity, src.last_restock_date, src.last_sold_date,
     src.snapshot_date, src.created_at, src.updated_at
 );
+
+-- ============================================================
+-- Advance the watermarks past the rows merged above
+-- ============================================================
+UPDATE CONSUMPTION_LAYER.ETL_WATERMARK
+SET high_water_ts  = next_high_water_ts,
+    _dw_updated_ts = CURRENT_TIMESTAMP()
+WHERE LEFT(table_name, 4) = 'CLN_';
+
+COMMIT;
@@ -55,7 +55,7 @@ WHEN NOT MATCHED THEN INSERT (
     src.store_id, src.store_code, src.store_name, src.store_type, src.location_id,
     src.city, src.state, src.region, src.manager_name, src.phone_number,
     src.email, src.open_date, src.close_date, src.is_active, src.square_footage,
-    src.effective_date, '9999-12-31', TRUE, 'INSERT'
+    '1900-01-01', '9999-12-31', TRUE, 'INSERT'      -- first version covers history already in the facts
 );
 
 -- Insert new current version after expiring old (for changed records)
@@ -139,7 +139,7 @@ WHEN NOT MATCHED THEN INSERT (
     src.email, src.phone_number, src.date_of_birth, src.age_group, src.gender,
     src.loyalty_tier, src.loyalty_points, src.registration_date,
     src.city, src.state, src.region, src.is_active,
-    src.effective_date, '9999-12-31', TRUE, 'INSERT'
+    '1900-01-01', '9999-12-31', TRUE, 'INSERT'
 );
 
 -- Insert new version after expiry
@@ -228,7 +228,7 @@ WHEN NOT MATCHED THEN INSERT (
     src.category_name, src.parent_category_name, src.brand, src.size, src.color,
     src.unit_cost, src.unit_price, src.gross_margin_pct, src.discount_pct,
     src.weight_kg, src.is_perishable, src.is_active, src.launch_date,
-    src.effective_date, '9999-12-31', TRUE, 'INSERT'
+    '1900-01-01', '9999-12-31', TRUE, 'INSERT'
 );
 
 -- Insert new version for changed product records
@@ -8,94 +8,167 @@ USE SCHEMA CONSUMPTION_LAYER;
 USE WAREHOUSE RETAIL_WH;
 
 -- ============================================================
--- LOAD FACT_SALES
--- Joins clean sales lines with dimension surrogate keys
+-- LOAD FACT_SALES (incremental)
+-- Merges only clean sales lines changed since the last run, found
+-- through the ETL_WATERMARK high-water mark on _dw_updated_ts, so
+-- each run scales with new sales rather than with history:
+--   1. fix the run's upper bound (next_high_water_ts)
+--   2. MERGE lines in (high_water_ts, next_high_water_ts]
+--   3. advance high_water_ts
+-- A failed run leaves the mark unchanged and the next run retries
+-- the same lines; the MERGE on line_id makes that idempotent.
 -- ============================================================
-INSERT INTO FACT_SALES (
-    date_key, store_sk, customer_sk, product_sk, payment_method_sk, channel_sk,
-    transaction_id, transaction_code, line_id, line_number, transaction_type,
-    quantity_sold, unit_price, unit_cost, gross_sales_amount, discount_amount,
-    net_sales_amount, tax_amount, total_sales_amount, cogs_amount, gross_profit_amount,
-    gross_margin_pct, loyalty_points_earned
-)
-SELECT
-    -- Date key from transaction date
-    TO_NUMBER(TO_CHAR(t.transaction_date::DATE, 'YYYYMMDD'))    AS date_key,
+UPDATE ETL_WATERMARK
+SET next_high_water_ts = COALESCE((
+        SELECT MAX(_dw_updated_ts) FROM (
+            SELECT _dw_updated_ts FROM CLEAN_LAYER.CLN_SALES_LINE
+            UNION ALL
+            SELECT _dw_updated_ts FROM CLEAN_LAYER.CLN_SALES_TRANSACTION
+        )
+    ), high_water_ts)
+WHERE table_name = 'FACT_SALES';
 
-    -- Store SCD lookup (current version at transaction time)
-    ds.store_sk,
+MERGE INTO FACT_SALES tgt
+USING (
+    WITH wm AS (
+        SELECT high_water_ts, next_high_water_ts
+        FROM ETL_WATERMARK
+        WHERE table_name = 'FACT_SALES'
+    ),
+    delta AS (
+        -- Lines inserted or corrected since the last run
+        SELECT l.line_id
+        FROM CLEAN_LAYER.CLN_SALES_LINE l
+        JOIN wm ON l._dw_updated_ts > wm.high_water_ts
+               AND l._dw_updated_ts <= wm.next_high_water_ts
+        UNION
+        -- Lines whose transaction header arrived or changed since the last run
+        SELECT l.line_id
+        FROM CLEAN_LAYER.CLN_SALES_TRANSACTION t
+        JOIN wm ON t._dw_updated_ts > wm.high_water_ts
+               AND t._dw_updated_ts <= wm.next_high_water_ts
+        JOIN CLEAN_LAYER.CLN_SALES_LINE l ON l.transaction_id = t.transaction_id
+    )
+    SELECT
+        -- Date key from transaction date
+        TO_NUMBER(TO_CHAR(t.transaction_date::DATE, 'YYYYMMDD'))    AS date_key,
 
-    -- Customer SCD lookup
-    dc.customer_sk,
+        -- Store SCD lookup (current version at transaction time)
+        ds.store_sk,
 
-    -- Product SCD lookup (version active at transaction time)
-    dp.product_sk,
+        -- Customer SCD lookup
+        dc.customer_sk,
 
-    -- Payment method lookup
-    pm.payment_method_sk,
+        -- Product SCD lookup (version active at transaction time)
+        dp.product_sk,
 
-    -- Channel lookup
-    ch.channel_sk,
-
-    -- Degenerate dimensions
-    t.transaction_id,
-    t.transaction_code,
-    l.line_id,
-    l.line_number,
-    t.transaction_type,
-
-    -- Measures
-    l.quantity                                                  AS quantity_sold,
-    l.unit_price,
-    l.unit_cost,
-    l.quantity * l.unit_price                                   AS gross_sales_amount,
-    l.discount_amount,
-    l.line_total_amount                                         AS net_sales_amount,
-    l.tax_amount,
-    l.line_total_amount + l.tax_amount                          AS total_sales_amount,
-    l.line_cost_amount                                          AS cogs_amount,
-    l.line_total_amount - l.line_cost_amount                    AS gross_profit_amount,
-    ROUND((l.line_total_amount - l.line_cost_amount) /
-          NULLIF(l.line_total_amount, 0), 4)                    AS gross_margin_pct,
-    ROUND(l.line_total_amount * 0.01)                           AS loyalty_points_earned
-
-FROM CLEAN_LAYER.CLN_SALES_LINE      l
-JOIN CLEAN_LAYER.CLN_SALES_TRANSACTION t ON l.transaction_id = t.transaction_id
-
--- Store SCD Type 2 resolution
-LEFT JOIN DIM_STORE ds ON
-    ds.store_id = t.store_id AND
-    t.transaction_date::DATE BETWEEN ds.scd_effective_date AND ds.scd_expiry_date
+        -- Payment method lookup
+        pm.payment_method_sk,
 
--- Customer SCD Type 2 resolution
-LEFT JOIN DIM_CUSTOMER dc ON
-    dc.customer_id = t.customer_id AND
-    t.transaction_date::DATE BETWEEN dc.scd_effective_date AND dc.scd_expiry_date
+        -- Channel lookup
+        ch.channel_sk,
 
--- Product SCD Type 2 resolution (price at time of sale)
-LEFT JOIN DIM_PRODUCT dp ON
-    dp.product_id = l.product_id AND
-    t.transaction_date::DATE BETWEEN dp.scd_effective_date AND dp.scd_expiry_date
+        -- Degenerate dimensions
+        t.transaction_id,
+        t.transaction_code,
+        l.line_id,
+        l.line_number,
+        t.transaction_type,
 
--- Payment method lookup
-LEFT JOIN (
-    SELECT DISTINCT
-        p.transaction_id,
-        pm.payment_method_sk,
-        ROW_NUMBER() OVER (PARTITION BY p.transaction_id ORDER BY p.payment_date) AS rn
-    FROM CLEAN_LAYER.CLN_PAYMENT p
-    JOIN DIM_PAYMENT_METHOD pm ON pm.payment_method_code = p.payment_method
-) pm ON pm.transaction_id = t.transaction_id AND pm.rn = 1
+        -- Measures
+        l.quantity                                                  AS quantity_sold,
+        l.unit_price,
+        l.unit_cost,
+        l.quantity * l.unit_price                                   AS gross_sales_amount,
+        l.discount_amount,
+        l.line_total_amount                                         AS net_sales_amount,
+        l.tax_amount,
+        l.line_total_amount + l.tax_amount                          AS total_sales_amount,
+        l.line_cost_amount                                          AS cogs_amount,
+        l.line_total_amount - l.line_cost_amount                    AS gross_profit_amount,
+        ROUND((l.line_total_amount - l.line_cost_amount) /
+              NULLIF(l.line_total_amount, 0), 4)                    AS gross_margin_pct,
+        ROUND(l.line_total_amount * 0.01)                           AS loyalty_points_earned
 
--- Channel lookup
-LEFT JOIN DIM_CHANNEL ch ON ch.channel_code = t.channel
+    FROM delta
+    JOIN CLEAN_LAYER.CLN_SALES_LINE        l ON l.line_id = delta.line_id
+    JOIN CLEAN_LAYER.CLN_SALES_TRANSACTION t ON l.transaction_id = t.transaction_id
 
--- Exclude already loaded lines
-WHERE NOT EXISTS (
-    SELECT 1 FROM FACT_SALES fs
-    WHERE fs.line_id = l.line_id
+    -- Store SCD Type 2 resolution
+    LEFT JOIN DIM_STORE ds ON
+        ds.store_id = t.store_id AND
+        t.transaction_date::DATE BETWEEN ds.scd_effective_date AND ds.scd_expiry_date
+
+    -- Customer SCD Type 2 resolution
+    LEFT JOIN DIM_CUSTOMER dc ON
+        dc.customer_id = t.customer_id AND
+        t.transaction_date::DATE BETWEEN dc.scd_effective_date AND dc.scd_expiry_date
+
+    -- Product SCD Type 2 resolution (price at time of sale)
+    LEFT JOIN DIM_PRODUCT dp ON
+        dp.product_id = l.product_id AND
+        t.transaction_date::DATE BETWEEN dp.scd_effective_date AND dp.scd_expiry_date
+
+    -- Payment method lookup (first payment of each delta transaction)
+    LEFT JOIN (
+        SELECT
+            p.transaction_id,
+            pm.payment_method_sk,
+            ROW_NUMBER() OVER (PARTITION BY p.transaction_id ORDER BY p.payment_date) AS rn
+        FROM CLEAN_LAYER.CLN_PAYMENT p
+        JOIN DIM_PAYMENT_METHOD pm ON pm.payment_method_code = p.payment_method
+        WHERE p.transaction_id IN (
+            SELECT l.transaction_id
+            FROM delta
+            JOIN CLEAN_LAYER.CLN_SALES_LINE l ON l.line_id = delta.line_id
+        )
+    ) pm ON pm.transaction_id = t.transaction_id AND pm.rn = 1
+
+    -- Channel lookup
+    LEFT JOIN DIM_CHANNEL ch ON ch.channel_code = t.channel
+) src
+ON tgt.line_id = src.line_id
+WHEN MATCHED THEN UPDATE SET
+    tgt.date_key              = src.date_key,
+    tgt.store_sk              = src.store_sk,
+    tgt.customer_sk           = src.customer_sk,
+    tgt.product_sk            = src.product_sk,
+    tgt.payment_method_sk     = src.payment_method_sk,
+    tgt.channel_sk            = src.channel_sk,
+    tgt.transaction_type      = src.transaction_type,
+    tgt.quantity_sold         = src.quantity_sold,
+    tgt.unit_price            = src.unit_price,
+    tgt.unit_cost             = src.unit_cost,
+    tgt.gross_sales_amount    = src.gross_sales_amount,
+    tgt.discount_amount       = src.discount_amount,
+    tgt.net_sales_amount      = src.net_sales_amount,
+    tgt.tax_amount            = src.tax_amount,
+    tgt.total_sales_amount    = src.total_sales_amount,
+    tgt.cogs_amount           = src.cogs_amount,
+    tgt.gross_profit_amount   = src.gross_profit_amount,
+    tgt.gross_margin_pct      = src.gross_margin_pct,
+    tgt.loyalty_points_earned = src.loyalty_points_earned,
+    tgt._dw_updated_ts        = CURRENT_TIMESTAMP()
+WHEN NOT MATCHED THEN INSERT (
+    date_key, store_sk, customer_sk, product_sk, payment_method_sk, channel_sk,
+    transaction_id, transaction_code, line_id, line_number, transaction_type,
+    quantity_sold, unit_price, unit_cost, gross_sales_amount, discount_amount,
+    net_sales_amount, tax_amount, total_sales_amount, cogs_amount, gross_profit_amount,
+    gross_margin_pct, loyalty_points_earned
+) VALUES (
+    src.date_key, src.store_sk, src.customer_sk, src.product_sk, src.payment_method_sk,
+    src.channel_sk, src.transaction_id, src.transaction_code, src.line_id, src.line_number,
+    src.transaction_type, src.quantity_sold, src.unit_price, src.unit_cost,
+    src.gross_sales_amount, src.discount_amount, src.net_sales_amount, src.tax_amount,
+    src.total_sales_amount, src.cogs_amount, src.gross_profit_amount,
+    src.gross_margin_pct, src.loyalty_points_earned
 );
 
+UPDATE ETL_WATERMARK
+SET high_water_ts  = next_high_water_ts,
+    _dw_updated_ts = CURRENT_TIMESTAMP()
+WHERE table_name = 'FACT_SALES';
+
 -- ============================================================
 -- LOAD FACT_INVENTORY
 -- ============================================================
@@ -171,85 +244,217 @@ WHERE NOT EXISTS (
 );
 
 -- ============================================================
--- REFRESH AGGREGATE TABLES
+-- REFRESH AGGREGATE TABLES (incremental)
+-- Recomputes only the (month, store) and (month, product) buckets
+-- touched by fact rows merged since the aggregate's high-water mark
+-- and applies them with MERGE: changed buckets are updated, new ones
+-- inserted, and buckets left without sales deleted. Everything runs
+-- in one transaction, so readers see either the previous or the new
+-- aggregates, never an empty or half-refreshed table.
 -- ============================================================
+BEGIN TRANSACTION;
+
+UPDATE ETL_WATERMARK
+SET next_high_water_ts = COALESCE((
+        SELECT MAX(ts) FROM (
+            SELECT MAX(_dw_updated_ts)  AS ts FROM FACT_SALES
+            UNION ALL
+            SELECT MAX(_dw_inserted_ts) AS ts FROM FACT_RETURNS
+        )
+    ), high_water_ts)
+WHERE table_name IN ('AGG_MONTHLY_STORE_SALES', 'AGG_MONTHLY_PRODUCT_SALES');
 
 -- Monthly Store Sales
-TRUNCATE TABLE AGG_MONTHLY_STORE_SALES;
-INSERT INTO AGG_MONTHLY_STORE_SALES (
+MERGE INTO AGG_MONTHLY_STORE_SALES tgt
+USING (
+    WITH wm AS (
+        SELECT high_water_ts, next_high_water_ts
+        FROM ETL_WATERMARK
+        WHERE table_name = 'AGG_MONTHLY_STORE_SALES'
+    ),
+    touched AS (
+        SELECT d.year_number, d.month_number, fs.store_sk
+        FROM FACT_SALES fs
+        JOIN wm ON fs._dw_updated_ts > wm.high_water_ts
+               AND fs._dw_updated_ts <= wm.next_high_water_ts
+        JOIN DIM_DATE d ON fs.date_key = d.date_key
+        UNION
+        SELECT d.year_number, d.month_number, fr.store_sk
+        FROM FACT_RETURNS fr
+        JOIN wm ON fr._dw_inserted_ts > wm.high_water_ts
+               AND fr._dw_inserted_ts <= wm.next_high_water_ts
+        JOIN DIM_DATE d ON fr.return_date_key = d.date_key
+    ),
+    sales AS (
+        SELECT
+            b.year_number,
+            b.month_number,
+            b.store_sk,
+            ds.store_id,
+            ds.store_name,
+            ds.store_type,
+            ds.region,
+            COUNT(DISTINCT fs.transaction_id)                   AS transaction_count,
+            COUNT(DISTINCT fs.customer_sk)                      AS customer_count,
+            SUM(fs.quantity_sold)                               AS total_quantity,
+            SUM(fs.gross_sales_amount)                          AS gross_sales_amount,
+            SUM(fs.discount_amount)                             AS discount_amount,
+            SUM(fs.net_sales_amount)                            AS net_sales_amount,
+            SUM(fs.tax_amount)                                  AS tax_amount,
+            SUM(fs.total_sales_amount)                          AS total_sales_amount,
+            SUM(fs.cogs_amount)                                 AS cogs_amount,
+            SUM(fs.gross_profit_amount)                         AS gross_profit_amount,
+            ROUND(SUM(fs.gross_profit_amount) /
+                  NULLIF(SUM(fs.net_sales_amount), 0), 4)       AS gross_margin_pct
+        FROM touched b
+        JOIN DIM_DATE   d  ON d.year_number = b.year_number AND d.month_number = b.month_number
+        JOIN FACT_SALES fs ON fs.date_key = d.date_key AND fs.store_sk = b.store_sk
+        JOIN DIM_STORE  ds ON fs.store_sk = ds.store_sk
+        WHERE fs.transaction_type = 'SALE'
+        GROUP BY 1, 2, 3, 4, 5, 6, 7
+    ),
+    returns AS (
+        SELECT b.year_number, b.month_number, b.store_sk, SUM(fr.refund_amount) AS return_amount
+        FROM touched b
+        JOIN DIM_DATE     d  ON d.year_number = b.year_number AND d.month_number = b.month_number
+        JOIN FACT_RETURNS fr ON fr.return_date_key = d.date_key AND fr.store_sk = b.store_sk
+        GROUP BY 1, 2, 3
+    )
+    SELECT
+        b.year_number,
+        b.month_number,
+        b.year_number || '-' || LPAD(b.month_number::VARCHAR, 2, '0') AS year_month,
+        b.store_sk,
+        s.store_id, s.store_name, s.store_type, s.region,
+        s.transaction_count, s.customer_count, s.total_quantity,
+        s.gross_sales_amount, s.discount_amount, s.net_sales_amount, s.tax_amount,
+        s.total_sales_amount, s.cogs_amount, s.gross_profit_amount, s.gross_margin_pct,
+        COALESCE(r.return_amount, 0)                            AS return_amount,
+        s.net_sales_amount - COALESCE(r.return_amount, 0)       AS net_revenue,
+        s.store_sk IS NULL                                      AS no_sales
+    FROM touched b
+    LEFT JOIN sales   s ON s.year_number = b.year_number AND s.month_number = b.month_number AND s.store_sk = b.store_sk
+    LEFT JOIN returns r ON r.year_number = b.year_number AND r.month_number = b.month_number AND r.store_sk = b.store_sk
+) src
+ON  tgt.year_number  = src.year_number
+AND tgt.month_number = src.month_number
+AND tgt.store_sk     = src.store_sk
+WHEN MATCHED AND src.no_sales THEN DELETE
+WHEN MATCHED THEN UPDATE SET
+    tgt.store_id            = src.store_id,
+    tgt.store_name          = src.store_name,
+    tgt.store_type          = src.store_type,
+    tgt.region              = src.region,
+    tgt.transaction_count   = src.transaction_count,
+    tgt.customer_count      = src.customer_count,
+    tgt.total_quantity      = src.total_quantity,
+    tgt.gross_sales_amount  = src.gross_sales_amount,
+    tgt.discount_amount     = src.discount_amount,
+    tgt.net_sales_amount    = src.net_sales_amount,
+    tgt.tax_amount          = src.tax_amount,
+    tgt.total_sales_amount  = src.total_sales_amount,
+    tgt.cogs_amount         = src.cogs_amount,
+    tgt.gross_profit_amount = src.gross_profit_amount,
+    tgt.gross_margin_pct    = src.gross_margin_pct,
+    tgt.return_amount       = src.return_amount,
+    tgt.net_revenue         = src.net_revenue,
+    tgt._dw_refreshed_ts    = CURRENT_TIMESTAMP()
+WHEN NOT MATCHED AND NOT src.no_sales THEN INSERT (
     year_number, month_number, year_month, store_sk, store_id, store_name,
     store_type, region, transaction_count, customer_count, total_quantity,
     gross_sales_amount, discount_amount, net_sales_amount, tax_amount,
     total_sales_amount, cogs_amount, gross_profit_amount, gross_margin_pct,
     return_amount, net_revenue
-)
-SELECT
-    d.year_number,
-    d.month_number,
-    d.year_number || '-' || LPAD(d.month_number::VARCHAR, 2, '0') AS year_month,
-    fs.store_sk,
-    ds.store_id,
-    ds.store_name,
-    ds.store_type,
-    ds.region,
-    COUNT(DISTINCT fs.transaction_id)                   AS transaction_count,
-    COUNT(DISTINCT fs.customer_sk)                      AS customer_count,
-    SUM(fs.quantity_sold)                               AS total_quantity,
-    SUM(fs.gross_sales_amount)                          AS gross_sales_amount,
-    SUM(fs.discount_amount)                             AS discount_amount,
-    SUM(fs.net_sales_amount)                            AS net_sales_amount,
-    SUM(fs.tax_amount)                                  AS tax_amount,
-    SUM(fs.total_sales_amount)                          AS total_sales_amount,
-    SUM(fs.cogs_amount)                                 AS cogs_amount,
-    SUM(fs.gross_profit_amount)                         AS gross_profit_amount,
-    ROUND(SUM(fs.gross_profit_amount) /
-          NULLIF(SUM(fs.net_sales_amount), 0), 4)       AS gross_margin_pct,
-    COALESCE(r.return_amount, 0)                        AS return_amount,
-    SUM(fs.net_sales_amount) - COALESCE(r.return_amount, 0) AS net_revenue
-FROM FACT_SALES fs
-JOIN DIM_DATE  d  ON fs.date_key = d.date_key
-JOIN DIM_STORE ds ON fs.store_sk = ds.store_sk
-LEFT JOIN (
-    SELECT
-        fr.store_sk,
-        d2.year_number,
-        d2.month_number,
-        SUM(fr.refund_amount) AS return_amount
-    FROM FACT_RETURNS fr
-    JOIN DIM_DATE d2 ON fr.return_date_key = d2.date_key
-    GROUP BY 1, 2, 3
-) r ON r.store_sk = fs.store_sk
-    AND r.year_number  = d.year_number
-    AND r.month_number = d.month_number
-WHERE fs.transaction_type = 'SALE'
-GROUP BY 1, 2, 3, 4, 5, 6, 7, 8, r.return_amount;
+) VALUES (
+    src.year_number, src.month_number, src.year_month, src.store_sk, src.store_id,
+    src.store_name, src.store_type, src.region, src.transaction_count, src.customer_count,
+    src.total_quantity, src.gross_sales_amount, src.discount_amount, src.net_sales_amount,
+    src.tax_amount, src.total_sales_amount, src.cogs_amount, src.gross_profit_amount,
+    src.gross_margin_pct, src.return_amount, src.net_revenue
+);
 
 -- Monthly Product Sales
-TRUNCATE TABLE AGG_MONTHLY_PRODUCT_SALES;
-INSERT INTO AGG_MONTHLY_PRODUCT_SALES (
+MERGE INTO AGG_MONTHLY_PRODUCT_SALES tgt
+USING (
+    WITH wm AS (
+        SELECT high_water_ts, next_high_water_ts
+        FROM ETL_WATERMARK
+        WHERE table_name = 'AGG_MONTHLY_PRODUCT_SALES'
+    ),
+    touched AS (
+        SELECT DISTINCT d.year_number, d.month_number, fs.product_sk
+        FROM FACT_SALES fs
+        JOIN wm ON fs._dw_updated_ts > wm.high_water_ts
+               AND fs._dw_updated_ts <= wm.next_high_water_ts
+        JOIN DIM_DATE d ON fs.date_key = d.date_key
+    ),
+    sales AS (
+        SELECT
+            b.year_number,
+            b.month_number,
+            b.product_sk,
+            dp.product_id,
+            dp.product_name,
+            dp.category_name,
+            dp.brand,
+            SUM(fs.quantity_sold)                               AS total_quantity,
+            SUM(fs.gross_sales_amount)                          AS gross_sales_amount,
+            SUM(fs.net_sales_amount)                            AS net_sales_amount,
+            SUM(fs.cogs_amount)                                 AS cogs_amount,
+            SUM(fs.gross_profit_amount)                         AS gross_profit_amount,
+            ROUND(SUM(fs.gross_profit_amount) /
+                  NULLIF(SUM(fs.net_sales_amount), 0), 4)       AS gross_margin_pct,
+            COUNT(DISTINCT fs.transaction_id)                   AS transaction_count
+        FROM touched b
+        JOIN DIM_DATE    d  ON d.year_number = b.year_number AND d.month_number = b.month_number
+        JOIN FACT_SALES  fs ON fs.date_key = d.date_key AND fs.product_sk = b.product_sk
+        JOIN DIM_PRODUCT dp ON fs.product_sk = dp.product_sk
+        WHERE fs.transaction_type = 'SALE'
+        GROUP BY 1, 2, 3, 4, 5, 6, 7
+    )
+    SELECT
+        b.year_number,
+        b.month_number,
+        b.year_number || '-' || LPAD(b.month_number::VARCHAR, 2, '0') AS year_month,
+        b.product_sk,
+        s.product_id, s.product_name, s.category_name, s.brand,
+        s.total_quantity, s.gross_sales_amount, s.net_sales_amount, s.cogs_amount,
+        s.gross_profit_amount, s.gross_margin_pct, s.transaction_count,
+        s.product_sk IS NULL                                    AS no_sales
+    FROM touched b
+    LEFT JOIN sales s ON s.year_number = b.year_number AND s.month_number = b.month_number AND s.product_sk = b.product_sk
+) src
+ON  tgt.year_number  = src.year_number
+AND tgt.month_number = src.month_number
+AND tgt.product_sk   = src.product_sk
+WHEN MATCHED AND src.no_sales THEN DELETE
+WHEN MATCHED THEN UPDATE SET
+    tgt.product_id          = src.product_id,
+    tgt.product_name        = src.product_name,
+    tgt.category_name       = src.category_name,
+    tgt.brand               = src.brand,
+    tgt.total_quantity      = src.total_quantity,
+    tgt.gross_sales_amount  = src.gross_sales_amount,
+    tgt.net_sales_amount    = src.net_sales_amount,
+    tgt.cogs_amount         = src.cogs_amount,
+    tgt.gross_profit_amount = src.gross_profit_amount,
+    tgt.gross_margin_pct    = src.gross_margin_pct,
+    tgt.transaction_count   = src.transaction_count,
+    tgt._dw_refreshed_ts    = CURRENT_TIMESTAMP()
+WHEN NOT MATCHED AND NOT src.no_sales THEN INSERT (
     year_number, month_number, year_month, product_sk, product_id, product_name,
     category_name, brand, total_quantity, gross_sales_amount, net_sales_amount,
     cogs_amount, gross_profit_amount, gross_margin_pct, transaction_count
-)
-SELECT
-    d.year_number,
-    d.month_number,
-    d.year_number || '-' || LPAD(d.month_number::VARCHAR, 2, '0') AS year_month,
-    fs.product_sk,
-    dp.product_id,
-    dp.product_name,
-    dp.category_name,
-    dp.brand,
-    SUM(fs.quantity_sold)                               AS total_quantity,
-    SUM(fs.gross_sales_amount)                          AS gross_sales_amount,
-    SUM(fs.net_sales_amount)                            AS net_sales_amount,
-    SUM(fs.cogs_amount)                                 AS cogs_amount,
-    SUM(fs.gross_profit_amount)                         AS gross_profit_amount,
-    ROUND(SUM(fs.gross_profit_amount) /
-          NULLIF(SUM(fs.net_sales_amount), 0), 4)       AS gross_margin_pct,
-    COUNT(DISTINCT fs.transaction_id)                   AS transaction_count
-FROM FACT_SALES fs
-JOIN DIM_DATE    d  ON fs.date_key = d.date_key
-JOIN DIM_PRODUCT dp ON fs.product_sk = dp.product_sk
-WHERE fs.transaction_type = 'SALE'
-GROUP BY 1, 2, 3, 4, 5, 6, 7, 8;
+) VALUES (
+    src.year_number, src.month_number, src.year_month, src.product_sk, src.product_id,
+    src.product_name, src.category_name, src.brand, src.total_quantity,
+    src.gross_sales_amount, src.net_sales_amount, src.cogs_amount,
+    src.gross_profit_amount, src.gross_margin_pct, src.transaction_count
+);
+
+UPDATE ETL_WATERMARK
+SET high_water_ts  = next_high_water_ts,
+    _dw_updated_ts = CURRENT_TIMESTAMP()
+WHERE table_name IN ('AGG_MONTHLY_STORE_SALES', 'AGG_MONTHLY_PRODUCT_SALES');
+
+COMMIT;
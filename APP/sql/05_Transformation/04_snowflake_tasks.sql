@@ -1,24 +1,68 @@
 -- ============================================================
 -- SNOWFLAKE TASKS
 -- Orchestrates the full ETL pipeline using Snowflake Tasks
+--
+-- Each task runs only WHEN its upstream streams have data, so an
+-- hour without new files costs no warehouse time. Skipping a task
+-- skips every task after it, so a task's WHEN also covers the
+-- streams all of its downstream tasks read (the root's covers every
+-- stream in the DAG); a skipped task never holds back work further
+-- down, including streams a failed run left behind. Each run is one
+-- transaction that ends by writing per-table row counts to
+-- TASK_RUN_AUDIT; reading the streams there consumes them, so a
+-- failed run leaves them for the next one.
 -- ============================================================
 
 USE DATABASE RETAIL_DW;
 USE WAREHOUSE RETAIL_WH;
 
 -- ============================================================
--- TASK 1 (Root): Stage → Clean Layer (runs every hour)
+-- TASK 1 (Root): Stage → Clean Layer (checked every hour)
 -- ============================================================
 CREATE OR REPLACE TASK TASK_STAGE_TO_CLEAN
     WAREHOUSE   = RETAIL_WH
     SCHEDULE    = 'USING CRON 0 * * * * UTC'
     COMMENT     = 'Root task: merge raw stage data into clean layer'
+    WHEN        SYSTEM$STREAM_HAS_DATA('RETAIL_DW.STAGE_LAYER.STM_STG_LOCATION_RAW')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.STAGE_LAYER.STM_STG_STORE_RAW')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.STAGE_LAYER.STM_STG_CUSTOMER_RAW')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.STAGE_LAYER.STM_STG_PRODUCT_CATEGORY_RAW')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.STAGE_LAYER.STM_STG_PRODUCT_RAW')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.STAGE_LAYER.STM_STG_SALES_TRANSACTION_RAW')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.STAGE_LAYER.STM_STG_SALES_LINE_RAW')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.STAGE_LAYER.STM_STG_PAYMENT_RAW')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.STAGE_LAYER.STM_STG_RETURN_RAW')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.STAGE_LAYER.STM_STG_INVENTORY_RAW')
+        -- Streams read further down the DAG
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_LOCATION')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_STORE')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_CUSTOMER')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_PRODUCT_CATEGORY')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_PRODUCT')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_SALES_TRANSACTION')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_SALES_LINE')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_PAYMENT')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_RETURN')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_INVENTORY')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CONSUMPTION_LAYER.STM_FACT_SALES')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CONSUMPTION_LAYER.STM_FACT_RETURNS')
 AS
-CALL SYSTEM$EXECUTE_IMMEDIATE($$
-    -- Location
+EXECUTE IMMEDIATE $$
+DECLARE
+    run_start TIMESTAMP_LTZ DEFAULT CURRENT_TIMESTAMP();
+BEGIN
+    BEGIN TRANSACTION;
+
+    -- Location: raw rows loaded since the CLN_LOCATION watermark, latest per key
+    UPDATE RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK
+    SET next_high_water_ts = GREATEST(high_water_ts, LEAST(
+        COALESCE((SELECT MAX(_stg_load_ts) FROM RETAIL_DW.STAGE_LAYER.STG_LOCATION_RAW), high_water_ts),
+        DATEADD(MINUTE, -settle_minutes, CURRENT_TIMESTAMP())))
+    WHERE table_name = 'CLN_LOCATION';
+
     MERGE INTO RETAIL_DW.CLEAN_LAYER.CLN_LOCATION tgt
     USING (
-        SELECT DISTINCT
+        SELECT
             TRY_TO_NUMBER(location_id)  AS location_id,
             TRIM(street_address)        AS street_address,
             INITCAP(TRIM(city))         AS city,
@@ -29,12 +73,51 @@ CALL SYSTEM$EXECUTE_IMMEDIATE($$
             TRY_TO_TIMESTAMP(created_at) AS created_at,
             TRY_TO_TIMESTAMP(updated_at) AS updated_at
         FROM RETAIL_DW.STAGE_LAYER.STG_LOCATION_RAW
+        JOIN RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK wm
+          ON wm.table_name = 'CLN_LOCATION'
+         AND _stg_load_ts > wm.high_water_ts AND _stg_load_ts <= wm.next_high_water_ts
         WHERE TRY_TO_NUMBER(location_id) IS NOT NULL
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY TRY_TO_NUMBER(location_id)
+                                   ORDER BY _stg_load_ts DESC, _stg_file_name DESC) = 1
     ) src
     ON tgt.location_id = src.location_id
     WHEN NOT MATCHED THEN INSERT (location_id, street_address, city, state, zip_code, country, region, created_at, updated_at)
     VALUES (src.location_id, src.street_address, src.city, src.state, src.zip_code, src.country, src.region, src.created_at, src.updated_at);
-$$);
+
+    UPDATE RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK
+    SET high_water_ts = next_high_water_ts, _dw_updated_ts = CURRENT_TIMESTAMP()
+    WHERE table_name = 'CLN_LOCATION';
+
+    -- Audit the run; reading the streams inside the transaction consumes them
+    INSERT INTO RETAIL_DW.CONSUMPTION_LAYER.TASK_RUN_AUDIT
+        (task_name, run_group_id, table_name, rows_processed, started_ts, completed_ts)
+    SELECT 'TASK_STAGE_TO_CLEAN', SYSTEM$TASK_RUNTIME_INFO('CURRENT_TASK_GRAPH_RUN_GROUP_ID'),
+           table_name, rows_processed, :run_start, CURRENT_TIMESTAMP()
+    FROM (
+        SELECT 'STG_LOCATION_RAW' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.STAGE_LAYER.STM_STG_LOCATION_RAW
+        UNION ALL
+        SELECT 'STG_STORE_RAW' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.STAGE_LAYER.STM_STG_STORE_RAW
+        UNION ALL
+        SELECT 'STG_CUSTOMER_RAW' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.STAGE_LAYER.STM_STG_CUSTOMER_RAW
+        UNION ALL
+        SELECT 'STG_PRODUCT_CATEGORY_RAW' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.STAGE_LAYER.STM_STG_PRODUCT_CATEGORY_RAW
+        UNION ALL
+        SELECT 'STG_PRODUCT_RAW' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.STAGE_LAYER.STM_STG_PRODUCT_RAW
+        UNION ALL
+        SELECT 'STG_SALES_TRANSACTION_RAW' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.STAGE_LAYER.STM_STG_SALES_TRANSACTION_RAW
+        UNION ALL
+        SELECT 'STG_SALES_LINE_RAW' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.STAGE_LAYER.STM_STG_SALES_LINE_RAW
+        UNION ALL
+        SELECT 'STG_PAYMENT_RAW' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.STAGE_LAYER.STM_STG_PAYMENT_RAW
+        UNION ALL
+        SELECT 'STG_RETURN_RAW' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.STAGE_LAYER.STM_STG_RETURN_RAW
+        UNION ALL
+        SELECT 'STG_INVENTORY_RAW' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.STAGE_LAYER.STM_STG_INVENTORY_RAW
+    );
+
+    COMMIT;
+END;
+$$;
 
 -- ============================================================
 -- TASK 2: Clean → SCD Dimensions (depends on Task 1)
@@ -43,8 +126,25 @@ CREATE OR REPLACE TASK TASK_LOAD_DIMENSIONS
     WAREHOUSE   = RETAIL_WH
     AFTER       TASK_STAGE_TO_CLEAN
     COMMENT     = 'Load/update SCD Type 2 dimension tables'
+    WHEN        SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_LOCATION')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_STORE')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_CUSTOMER')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_PRODUCT_CATEGORY')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_PRODUCT')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_SALES_TRANSACTION')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_SALES_LINE')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_PAYMENT')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_RETURN')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_INVENTORY')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CONSUMPTION_LAYER.STM_FACT_SALES')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CONSUMPTION_LAYER.STM_FACT_RETURNS')
 AS
-CALL SYSTEM$EXECUTE_IMMEDIATE($$
+EXECUTE IMMEDIATE $$
+DECLARE
+    run_start TIMESTAMP_LTZ DEFAULT CURRENT_TIMESTAMP();
+BEGIN
+    BEGIN TRANSACTION;
+
     -- Refresh DIM_LOCATION
     MERGE INTO RETAIL_DW.CONSUMPTION_LAYER.DIM_LOCATION tgt
     USING (
@@ -54,7 +154,27 @@ CALL SYSTEM$EXECUTE_IMMEDIATE($$
     ON tgt.location_id = src.location_id
     WHEN NOT MATCHED THEN INSERT (location_id, street_address, city, state, zip_code, country, region)
     VALUES (src.location_id, src.street_address, src.city, src.state, src.zip_code, src.country, src.region);
-$$);
+
+    -- Audit the run; reading the streams inside the transaction consumes them
+    INSERT INTO RETAIL_DW.CONSUMPTION_LAYER.TASK_RUN_AUDIT
+        (task_name, run_group_id, table_name, rows_processed, started_ts, completed_ts)
+    SELECT 'TASK_LOAD_DIMENSIONS', SYSTEM$TASK_RUNTIME_INFO('CURRENT_TASK_GRAPH_RUN_GROUP_ID'),
+           table_name, rows_processed, :run_start, CURRENT_TIMESTAMP()
+    FROM (
+        SELECT 'CLN_LOCATION' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.CLEAN_LAYER.STM_CLN_LOCATION
+        UNION ALL
+        SELECT 'CLN_STORE' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.CLEAN_LAYER.STM_CLN_STORE
+        UNION ALL
+        SELECT 'CLN_CUSTOMER' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.CLEAN_LAYER.STM_CLN_CUSTOMER
+        UNION ALL
+        SELECT 'CLN_PRODUCT_CATEGORY' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.CLEAN_LAYER.STM_CLN_PRODUCT_CATEGORY
+        UNION ALL
+        SELECT 'CLN_PRODUCT' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.CLEAN_LAYER.STM_CLN_PRODUCT
+    );
+
+    COMMIT;
+END;
+$$;
 
 -- ============================================================
 -- TASK 3: Load Facts (depends on Task 2)
@@ -62,39 +182,115 @@ $$);
 CREATE OR REPLACE TASK TASK_LOAD_FACTS
     WAREHOUSE   = RETAIL_WH
     AFTER       TASK_LOAD_DIMENSIONS
-    COMMENT     = 'Load new records into fact tables'
+    COMMENT     = 'Merge new and changed sales lines into fact tables'
+    WHEN        SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_SALES_TRANSACTION')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_SALES_LINE')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_PAYMENT')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_RETURN')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CLEAN_LAYER.STM_CLN_INVENTORY')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CONSUMPTION_LAYER.STM_FACT_SALES')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CONSUMPTION_LAYER.STM_FACT_RETURNS')
 AS
-CALL SYSTEM$EXECUTE_IMMEDIATE($$
-    -- Insert new sales facts not yet in FACT_SALES
-    INSERT INTO RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES (
+EXECUTE IMMEDIATE $$
+DECLARE
+    run_start TIMESTAMP_LTZ DEFAULT CURRENT_TIMESTAMP();
+BEGIN
+    BEGIN TRANSACTION;
+
+    -- Merge sales lines changed since the FACT_SALES high-water mark
+    UPDATE RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK
+    SET next_high_water_ts = COALESCE((
+            SELECT MAX(_dw_updated_ts) FROM (
+                SELECT _dw_updated_ts FROM RETAIL_DW.CLEAN_LAYER.CLN_SALES_LINE
+                UNION ALL
+                SELECT _dw_updated_ts FROM RETAIL_DW.CLEAN_LAYER.CLN_SALES_TRANSACTION)
+        ), high_water_ts)
+    WHERE table_name = 'FACT_SALES';
+
+    MERGE INTO RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES tgt
+    USING (
+        WITH wm AS (
+            SELECT high_water_ts, next_high_water_ts
+            FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'FACT_SALES'
+        ),
+        delta AS (
+            SELECT l.line_id FROM RETAIL_DW.CLEAN_LAYER.CLN_SALES_LINE l
+            JOIN wm ON l._dw_updated_ts > wm.high_water_ts AND l._dw_updated_ts <= wm.next_high_water_ts
+            UNION
+            SELECT l.line_id FROM RETAIL_DW.CLEAN_LAYER.CLN_SALES_TRANSACTION t
+            JOIN wm ON t._dw_updated_ts > wm.high_water_ts AND t._dw_updated_ts <= wm.next_high_water_ts
+            JOIN RETAIL_DW.CLEAN_LAYER.CLN_SALES_LINE l ON l.transaction_id = t.transaction_id
+        )
+        SELECT
+            TO_NUMBER(TO_CHAR(t.transaction_date::DATE,'YYYYMMDD')) AS date_key,
+            ds.store_sk, dc.customer_sk, dp.product_sk,
+            t.transaction_id, t.transaction_code, l.line_id, l.line_number, t.transaction_type,
+            l.quantity AS quantity_sold, l.unit_price, l.unit_cost,
+            l.quantity * l.unit_price AS gross_sales_amount, l.discount_amount,
+            l.line_total_amount AS net_sales_amount, l.tax_amount,
+            l.line_total_amount + l.tax_amount AS total_sales_amount,
+            l.line_cost_amount AS cogs_amount,
+            l.line_total_amount - l.line_cost_amount AS gross_profit_amount,
+            ROUND((l.line_total_amount - l.line_cost_amount)/NULLIF(l.line_total_amount,0),4) AS gross_margin_pct,
+            ROUND(l.line_total_amount * 0.01) AS loyalty_points_earned
+        FROM delta
+        JOIN RETAIL_DW.CLEAN_LAYER.CLN_SALES_LINE l ON l.line_id = delta.line_id
+        JOIN RETAIL_DW.CLEAN_LAYER.CLN_SALES_TRANSACTION t ON l.transaction_id = t.transaction_id
+        LEFT JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_STORE ds
+            ON ds.store_id = t.store_id AND t.transaction_date::DATE BETWEEN ds.scd_effective_date AND ds.scd_expiry_date
+        LEFT JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_CUSTOMER dc
+            ON dc.customer_id = t.customer_id AND t.transaction_date::DATE BETWEEN dc.scd_effective_date AND dc.scd_expiry_date
+        LEFT JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_PRODUCT dp
+            ON dp.product_id = l.product_id AND t.transaction_date::DATE BETWEEN dp.scd_effective_date AND dp.scd_expiry_date
+    ) src
+    ON tgt.line_id = src.line_id
+    WHEN MATCHED THEN UPDATE SET
+        tgt.date_key = src.date_key, tgt.store_sk = src.store_sk, tgt.customer_sk = src.customer_sk,
+        tgt.product_sk = src.product_sk, tgt.transaction_type = src.transaction_type,
+        tgt.quantity_sold = src.quantity_sold, tgt.unit_price = src.unit_price, tgt.unit_cost = src.unit_cost,
+        tgt.gross_sales_amount = src.gross_sales_amount, tgt.discount_amount = src.discount_amount,
+        tgt.net_sales_amount = src.net_sales_amount, tgt.tax_amount = src.tax_amount,
+        tgt.total_sales_amount = src.total_sales_amount, tgt.cogs_amount = src.cogs_amount,
+        tgt.gross_profit_amount = src.gross_profit_amount, tgt.gross_margin_pct = src.gross_margin_pct,
+        tgt.loyalty_points_earned = src.loyalty_points_earned, tgt._dw_updated_ts = CURRENT_TIMESTAMP()
+    WHEN NOT MATCHED THEN INSERT (
         date_key, store_sk, customer_sk, product_sk,
         transaction_id, transaction_code, line_id, line_number, transaction_type,
         quantity_sold, unit_price, unit_cost, gross_sales_amount, discount_amount,
         net_sales_amount, tax_amount, total_sales_amount, cogs_amount, gross_profit_amount,
         gross_margin_pct, loyalty_points_earned
-    )
-    SELECT
-        TO_NUMBER(TO_CHAR(t.transaction_date::DATE,'YYYYMMDD')),
-        ds.store_sk, dc.customer_sk, dp.product_sk,
-        t.transaction_id, t.transaction_code, l.line_id, l.line_number, t.transaction_type,
-        l.quantity, l.unit_price, l.unit_cost,
-        l.quantity * l.unit_price, l.discount_amount, l.line_total_amount,
-        l.tax_amount, l.line_total_amount + l.tax_amount, l.line_cost_amount,
-        l.line_total_amount - l.line_cost_amount,
-        ROUND((l.line_total_amount - l.line_cost_amount)/NULLIF(l.line_total_amount,0),4),
-        ROUND(l.line_total_amount * 0.01)
-    FROM RETAIL_DW.CLEAN_LAYER.CLN_SALES_LINE l
-    JOIN RETAIL_DW.CLEAN_LAYER.CLN_SALES_TRANSACTION t ON l.transaction_id = t.transaction_id
-    LEFT JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_STORE ds
-        ON ds.store_id = t.store_id AND t.transaction_date::DATE BETWEEN ds.scd_effective_date AND ds.scd_expiry_date
-    LEFT JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_CUSTOMER dc
-        ON dc.customer_id = t.customer_id AND t.transaction_date::DATE BETWEEN dc.scd_effective_date AND dc.scd_expiry_date
-    LEFT JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_PRODUCT dp
-        ON dp.product_id = l.product_id AND t.transaction_date::DATE BETWEEN dp.scd_effective_date AND dp.scd_expiry_date
-    WHERE NOT EXISTS (
-        SELECT 1 FROM RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES fs WHERE fs.line_id = l.line_id
+    ) VALUES (
+        src.date_key, src.store_sk, src.customer_sk, src.product_sk,
+        src.transaction_id, src.transaction_code, src.line_id, src.line_number, src.transaction_type,
+        src.quantity_sold, src.unit_price, src.unit_cost, src.gross_sales_amount, src.discount_amount,
+        src.net_sales_amount, src.tax_amount, src.total_sales_amount, src.cogs_amount, src.gross_profit_amount,
+        src.gross_margin_pct, src.loyalty_points_earned
+    );
+
+    UPDATE RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK
+    SET high_water_ts = next_high_water_ts, _dw_updated_ts = CURRENT_TIMESTAMP()
+    WHERE table_name = 'FACT_SALES';
+
+    -- Audit the run; reading the streams inside the transaction consumes them
+    INSERT INTO RETAIL_DW.CONSUMPTION_LAYER.TASK_RUN_AUDIT
+        (task_name, run_group_id, table_name, rows_processed, started_ts, completed_ts)
+    SELECT 'TASK_LOAD_FACTS', SYSTEM$TASK_RUNTIME_INFO('CURRENT_TASK_GRAPH_RUN_GROUP_ID'),
+           table_name, rows_processed, :run_start, CURRENT_TIMESTAMP()
+    FROM (
+        SELECT 'CLN_SALES_TRANSACTION' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.CLEAN_LAYER.STM_CLN_SALES_TRANSACTION
+        UNION ALL
+        SELECT 'CLN_SALES_LINE' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.CLEAN_LAYER.STM_CLN_SALES_LINE
+        UNION ALL
+        SELECT 'CLN_PAYMENT' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.CLEAN_LAYER.STM_CLN_PAYMENT
+        UNION ALL
+        SELECT 'CLN_RETURN' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.CLEAN_LAYER.STM_CLN_RETURN
+        UNION ALL
+        SELECT 'CLN_INVENTORY' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.CLEAN_LAYER.STM_CLN_INVENTORY
     );
-$$);
+
+    COMMIT;
+END;
+$$;
 
 -- ============================================================
 -- TASK 4: Refresh Aggregates (depends on Task 3)
@@ -102,37 +298,281 @@ $$);
 CREATE OR REPLACE TASK TASK_REFRESH_AGGREGATES
     WAREHOUSE   = RETAIL_WH
     AFTER       TASK_LOAD_FACTS
-    COMMENT     = 'Refresh monthly aggregate tables for BI layer'
+    COMMENT     = 'Incrementally refresh touched monthly aggregate buckets for BI layer'
+    WHEN        SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CONSUMPTION_LAYER.STM_FACT_SALES')
+        OR SYSTEM$STREAM_HAS_DATA('RETAIL_DW.CONSUMPTION_LAYER.STM_FACT_RETURNS')
 AS
-CALL SYSTEM$EXECUTE_IMMEDIATE($$
-    TRUNCATE TABLE RETAIL_DW.CONSUMPTION_LAYER.AGG_MONTHLY_STORE_SALES;
-    INSERT INTO RETAIL_DW.CONSUMPTION_LAYER.AGG_MONTHLY_STORE_SALES (
+EXECUTE IMMEDIATE $$
+DECLARE
+    run_start TIMESTAMP_LTZ DEFAULT CURRENT_TIMESTAMP();
+BEGIN
+    BEGIN TRANSACTION;
+
+    -- Recompute only buckets touched since each aggregate's high-water mark;
+    -- the run's transaction means readers never see a partial refresh
+    UPDATE RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK
+    SET next_high_water_ts = COALESCE((
+            SELECT MAX(ts) FROM (
+                SELECT MAX(_dw_updated_ts)  AS ts FROM RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES
+                UNION ALL
+                SELECT MAX(_dw_inserted_ts) AS ts FROM RETAIL_DW.CONSUMPTION_LAYER.FACT_RETURNS)
+        ), high_water_ts)
+    WHERE table_name IN ('AGG_MONTHLY_STORE_SALES', 'AGG_MONTHLY_PRODUCT_SALES');
+
+    MERGE INTO RETAIL_DW.CONSUMPTION_LAYER.AGG_MONTHLY_STORE_SALES tgt
+    USING (
+        WITH wm AS (
+            SELECT high_water_ts, next_high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK
+            WHERE table_name = 'AGG_MONTHLY_STORE_SALES'
+        ),
+        touched AS (
+            SELECT d.year_number, d.month_number, fs.store_sk
+            FROM RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES fs
+            JOIN wm ON fs._dw_updated_ts > wm.high_water_ts AND fs._dw_updated_ts <= wm.next_high_water_ts
+            JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_DATE d ON fs.date_key = d.date_key
+            UNION
+            SELECT d.year_number, d.month_number, fr.store_sk
+            FROM RETAIL_DW.CONSUMPTION_LAYER.FACT_RETURNS fr
+            JOIN wm ON fr._dw_inserted_ts > wm.high_water_ts AND fr._dw_inserted_ts <= wm.next_high_water_ts
+            JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_DATE d ON fr.return_date_key = d.date_key
+        ),
+        sales AS (
+            SELECT b.year_number, b.month_number, b.store_sk,
+                ds.store_id, ds.store_name, ds.store_type, ds.region,
+                COUNT(DISTINCT fs.transaction_id) AS transaction_count, COUNT(DISTINCT fs.customer_sk) AS customer_count,
+                SUM(fs.quantity_sold) AS total_quantity, SUM(fs.gross_sales_amount) AS gross_sales_amount,
+                SUM(fs.discount_amount) AS discount_amount, SUM(fs.net_sales_amount) AS net_sales_amount,
+                SUM(fs.tax_amount) AS tax_amount, SUM(fs.total_sales_amount) AS total_sales_amount,
+                SUM(fs.cogs_amount) AS cogs_amount, SUM(fs.gross_profit_amount) AS gross_profit_amount,
+                ROUND(SUM(fs.gross_profit_amount)/NULLIF(SUM(fs.net_sales_amount),0),4) AS gross_margin_pct
+            FROM touched b
+            JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_DATE d ON d.year_number = b.year_number AND d.month_number = b.month_number
+            JOIN RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES fs ON fs.date_key = d.date_key AND fs.store_sk = b.store_sk
+            JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_STORE ds ON fs.store_sk = ds.store_sk
+            WHERE fs.transaction_type = 'SALE'
+            GROUP BY 1,2,3,4,5,6,7
+        ),
+        returns AS (
+            SELECT b.year_number, b.month_number, b.store_sk, SUM(fr.refund_amount) AS return_amount
+            FROM touched b
+            JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_DATE d ON d.year_number = b.year_number AND d.month_number = b.month_number
+            JOIN RETAIL_DW.CONSUMPTION_LAYER.FACT_RETURNS fr ON fr.return_date_key = d.date_key AND fr.store_sk = b.store_sk
+            GROUP BY 1,2,3
+        )
+        SELECT b.year_number, b.month_number,
+            b.year_number || '-' || LPAD(b.month_number::VARCHAR,2,'0') AS year_month, b.store_sk,
+            s.store_id, s.store_name, s.store_type, s.region, s.transaction_count, s.customer_count,
+            s.total_quantity, s.gross_sales_amount, s.discount_amount, s.net_sales_amount, s.tax_amount,
+            s.total_sales_amount, s.cogs_amount, s.gross_profit_amount, s.gross_margin_pct,
+            COALESCE(r.return_amount,0) AS return_amount,
+            s.net_sales_amount - COALESCE(r.return_amount,0) AS net_revenue,
+            s.store_sk IS NULL AS no_sales
+        FROM touched b
+        LEFT JOIN sales   s ON s.year_number = b.year_number AND s.month_number = b.month_number AND s.store_sk = b.store_sk
+        LEFT JOIN returns r ON r.year_number = b.year_number AND r.month_number = b.month_number AND r.store_sk = b.store_sk
+    ) src
+    ON tgt.year_number = src.year_number AND tgt.month_number = src.month_number AND tgt.store_sk = src.store_sk
+    WHEN MATCHED AND src.no_sales THEN DELETE
+    WHEN MATCHED THEN UPDATE SET
+        tgt.store_id = src.store_id, tgt.store_name = src.store_name, tgt.store_type = src.store_type,
+        tgt.region = src.region, tgt.transaction_count = src.transaction_count,
+        tgt.customer_count = src.customer_count, tgt.total_quantity = src.total_quantity,
+        tgt.gross_sales_amount = src.gross_sales_amount, tgt.discount_amount = src.discount_amount,
+        tgt.net_sales_amount = src.net_sales_amount, tgt.tax_amount = src.tax_amount,
+        tgt.total_sales_amount = src.total_sales_amount, tgt.cogs_amount = src.cogs_amount,
+        tgt.gross_profit_amount = src.gross_profit_amount, tgt.gross_margin_pct = src.gross_margin_pct,
+        tgt.return_amount = src.return_amount, tgt.net_revenue = src.net_revenue,
+        tgt._dw_refreshed_ts = CURRENT_TIMESTAMP()
+    WHEN NOT MATCHED AND NOT src.no_sales THEN INSERT (
         year_number, month_number, year_month, store_sk, store_id, store_name,
         store_type, region, transaction_count, customer_count, total_quantity,
         gross_sales_amount, discount_amount, net_sales_amount, tax_amount,
         total_sales_amount, cogs_amount, gross_profit_amount, gross_margin_pct,
         return_amount, net_revenue
-    )
-    SELECT
-        d.year_number, d.month_number,
-        d.year_number || '-' || LPAD(d.month_number::VARCHAR,2,'0'),
-        fs.store_sk, ds.store_id, ds.store_name, ds.store_type, ds.region,
-        COUNT(DISTINCT fs.transaction_id), COUNT(DISTINCT fs.customer_sk),
-        SUM(fs.quantity_sold), SUM(fs.gross_sales_amount), SUM(fs.discount_amount),
-        SUM(fs.net_sales_amount), SUM(fs.tax_amount), SUM(fs.total_sales_amount),
-        SUM(fs.cogs_amount), SUM(fs.gross_profit_amount),
-        ROUND(SUM(fs.gross_profit_amount)/NULLIF(SUM(fs.net_sales_amount),0),4),
-        0, SUM(fs.net_sales_amount)
-    FROM RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES fs
-    JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_DATE d ON fs.date_key = d.date_key
-    JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_STORE ds ON fs.store_sk = ds.store_sk
-    WHERE fs.transaction_type = 'SALE'
-    GROUP BY 1,2,3,4,5,6,7,8;
-$$);
+    ) VALUES (
+        src.year_number, src.month_number, src.year_month, src.store_sk, src.store_id,
+        src.store_name, src.store_type, src.region, src.transaction_count, src.customer_count,
+        src.total_quantity, src.gross_sales_amount, src.discount_amount, src.net_sales_amount,
+        src.tax_amount, src.total_sales_amount, src.cogs_amount, src.gross_profit_amount,
+        src.gross_margin_pct, src.return_amount, src.net_revenue
+    );
+
+    MERGE INTO RETAIL_DW.CONSUMPTION_LAYER.AGG_MONTHLY_PRODUCT_SALES tgt
+    USING (
+        WITH wm AS (
+            SELECT high_water_ts, next_high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK
+            WHERE table_name = 'AGG_MONTHLY_PRODUCT_SALES'
+        ),
+        touched AS (
+            SELECT DISTINCT d.year_number, d.month_number, fs.product_sk
+            FROM RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES fs
+            JOIN wm ON fs._dw_updated_ts > wm.high_water_ts AND fs._dw_updated_ts <= wm.next_high_water_ts
+            JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_DATE d ON fs.date_key = d.date_key
+        ),
+        sales AS (
+            SELECT b.year_number, b.month_number, b.product_sk,
+                dp.product_id, dp.product_name, dp.category_name, dp.brand,
+                SUM(fs.quantity_sold) AS total_quantity, SUM(fs.gross_sales_amount) AS gross_sales_amount,
+                SUM(fs.net_sales_amount) AS net_sales_amount, SUM(fs.cogs_amount) AS cogs_amount,
+                SUM(fs.gross_profit_amount) AS gross_profit_amount,
+                ROUND(SUM(fs.gross_profit_amount)/NULLIF(SUM(fs.net_sales_amount),0),4) AS gross_margin_pct,
+                COUNT(DISTINCT fs.transaction_id) AS transaction_count
+            FROM touched b
+            JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_DATE d ON d.year_number = b.year_number AND d.month_number = b.month_number
+            JOIN RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES fs ON fs.date_key = d.date_key AND fs.product_sk = b.product_sk
+            JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_PRODUCT dp ON fs.product_sk = dp.product_sk
+            WHERE fs.transaction_type = 'SALE'
+            GROUP BY 1,2,3,4,5,6,7
+        )
+        SELECT b.year_number, b.month_number,
+            b.year_number || '-' || LPAD(b.month_number::VARCHAR,2,'0') AS year_month, b.product_sk,
+            s.product_id, s.product_name, s.category_name, s.brand, s.total_quantity,
+            s.gross_sales_amount, s.net_sales_amount, s.cogs_amount, s.gross_profit_amount,
+            s.gross_margin_pct, s.transaction_count,
+            s.product_sk IS NULL AS no_sales
+        FROM touched b
+        LEFT JOIN sales s ON s.year_number = b.year_number AND s.month_number = b.month_number AND s.product_sk = b.product_sk
+    ) src
+    ON tgt.year_number = src.year_number AND tgt.month_number = src.month_number AND tgt.product_sk = src.product_sk
+    WHEN MATCHED AND src.no_sales THEN DELETE
+    WHEN MATCHED THEN UPDATE SET
+        tgt.product_id = src.product_id, tgt.product_name = src.product_name,
+        tgt.category_name = src.category_name, tgt.brand = src.brand,
+        tgt.total_quantity = src.total_quantity, tgt.gross_sales_amount = src.gross_sales_amount,
+        tgt.net_sales_amount = src.net_sales_amount, tgt.cogs_amount = src.cogs_amount,
+        tgt.gross_profit_amount = src.gross_profit_amount, tgt.gross_margin_pct = src.gross_margin_pct,
+        tgt.transaction_count = src.transaction_count, tgt._dw_refreshed_ts = CURRENT_TIMESTAMP()
+    WHEN NOT MATCHED AND NOT src.no_sales THEN INSERT (
+        year_number, month_number, year_month, product_sk, product_id, product_name,
+        category_name, brand, total_quantity, gross_sales_amount, net_sales_amount,
+        cogs_amount, gross_profit_amount, gross_margin_pct, transaction_count
+    ) VALUES (
+        src.year_number, src.month_number, src.year_month, src.product_sk, src.product_id,
+        src.product_name, src.category_name, src.brand, src.total_quantity,
+        src.gross_sales_amount, src.net_sales_amount, src.cogs_amount,
+        src.gross_profit_amount, src.gross_margin_pct, src.transaction_count
+    );
+
+    UPDATE RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK
+    SET high_water_ts = next_high_water_ts, _dw_updated_ts = CURRENT_TIMESTAMP()
+    WHERE table_name IN ('AGG_MONTHLY_STORE_SALES', 'AGG_MONTHLY_PRODUCT_SALES');
+
+    -- Audit the run; reading the streams inside the transaction consumes them
+    INSERT INTO RETAIL_DW.CONSUMPTION_LAYER.TASK_RUN_AUDIT
+        (task_name, run_group_id, table_name, rows_processed, started_ts, completed_ts)
+    SELECT 'TASK_REFRESH_AGGREGATES', SYSTEM$TASK_RUNTIME_INFO('CURRENT_TASK_GRAPH_RUN_GROUP_ID'),
+           table_name, rows_processed, :run_start, CURRENT_TIMESTAMP()
+    FROM (
+        SELECT 'FACT_SALES' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.CONSUMPTION_LAYER.STM_FACT_SALES
+        UNION ALL
+        SELECT 'FACT_RETURNS' AS table_name, COUNT(*) AS rows_processed FROM RETAIL_DW.CONSUMPTION_LAYER.STM_FACT_RETURNS
+    );
+
+    COMMIT;
+END;
+$$;
+
+-- ============================================================
+-- TASK 5: Archive processed raw rows (standalone, daily)
+-- Same statements as 05_stage_retention.sql
+-- ============================================================
+CREATE OR REPLACE TASK TASK_ARCHIVE_STAGE
+    WAREHOUSE   = RETAIL_WH
+    SCHEDULE    = 'USING CRON 30 2 * * * UTC'
+    COMMENT     = 'Move raw rows merged into the clean layer and older than 7 days to the archive tables'
+AS
+EXECUTE IMMEDIATE $$
+BEGIN
+    BEGIN TRANSACTION;
+
+    -- Location
+    INSERT INTO RETAIL_DW.STAGE_LAYER.STG_LOCATION_RAW_ARCHIVE SELECT * FROM RETAIL_DW.STAGE_LAYER.STG_LOCATION_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_LOCATION')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+    DELETE FROM RETAIL_DW.STAGE_LAYER.STG_LOCATION_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_LOCATION')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+    -- Store
+    INSERT INTO RETAIL_DW.STAGE_LAYER.STG_STORE_RAW_ARCHIVE SELECT * FROM RETAIL_DW.STAGE_LAYER.STG_STORE_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_STORE')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+    DELETE FROM RETAIL_DW.STAGE_LAYER.STG_STORE_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_STORE')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+    -- Customer
+    INSERT INTO RETAIL_DW.STAGE_LAYER.STG_CUSTOMER_RAW_ARCHIVE SELECT * FROM RETAIL_DW.STAGE_LAYER.STG_CUSTOMER_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_CUSTOMER')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+    DELETE FROM RETAIL_DW.STAGE_LAYER.STG_CUSTOMER_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_CUSTOMER')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+    -- Product Category
+    INSERT INTO RETAIL_DW.STAGE_LAYER.STG_PRODUCT_CATEGORY_RAW_ARCHIVE SELECT * FROM RETAIL_DW.STAGE_LAYER.STG_PRODUCT_CATEGORY_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_PRODUCT_CATEGORY')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+    DELETE FROM RETAIL_DW.STAGE_LAYER.STG_PRODUCT_CATEGORY_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_PRODUCT_CATEGORY')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+    -- Product
+    INSERT INTO RETAIL_DW.STAGE_LAYER.STG_PRODUCT_RAW_ARCHIVE SELECT * FROM RETAIL_DW.STAGE_LAYER.STG_PRODUCT_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_PRODUCT')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+    DELETE FROM RETAIL_DW.STAGE_LAYER.STG_PRODUCT_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_PRODUCT')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+    -- Sales Transaction
+    INSERT INTO RETAIL_DW.STAGE_LAYER.STG_SALES_TRANSACTION_RAW_ARCHIVE SELECT * FROM RETAIL_DW.STAGE_LAYER.STG_SALES_TRANSACTION_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_SALES_TRANSACTION')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+    DELETE FROM RETAIL_DW.STAGE_LAYER.STG_SALES_TRANSACTION_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_SALES_TRANSACTION')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+    -- Sales Line
+    INSERT INTO RETAIL_DW.STAGE_LAYER.STG_SALES_LINE_RAW_ARCHIVE SELECT * FROM RETAIL_DW.STAGE_LAYER.STG_SALES_LINE_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_SALES_LINE')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+    DELETE FROM RETAIL_DW.STAGE_LAYER.STG_SALES_LINE_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_SALES_LINE')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+    -- Payment
+    INSERT INTO RETAIL_DW.STAGE_LAYER.STG_PAYMENT_RAW_ARCHIVE SELECT * FROM RETAIL_DW.STAGE_LAYER.STG_PAYMENT_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_PAYMENT')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+    DELETE FROM RETAIL_DW.STAGE_LAYER.STG_PAYMENT_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_PAYMENT')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+    -- Return
+    INSERT INTO RETAIL_DW.STAGE_LAYER.STG_RETURN_RAW_ARCHIVE SELECT * FROM RETAIL_DW.STAGE_LAYER.STG_RETURN_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_RETURN')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+    DELETE FROM RETAIL_DW.STAGE_LAYER.STG_RETURN_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_RETURN')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+    -- Inventory
+    INSERT INTO RETAIL_DW.STAGE_LAYER.STG_INVENTORY_RAW_ARCHIVE SELECT * FROM RETAIL_DW.STAGE_LAYER.STG_INVENTORY_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_INVENTORY')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+    DELETE FROM RETAIL_DW.STAGE_LAYER.STG_INVENTORY_RAW
+    WHERE _stg_load_ts <= (SELECT high_water_ts FROM RETAIL_DW.CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_INVENTORY')
+      AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+    COMMIT;
+END;
+$$;
 
 -- ============================================================
 -- Resume all tasks (they start suspended by default)
 -- ============================================================
+ALTER TASK TASK_ARCHIVE_STAGE      RESUME;
 ALTER TASK TASK_REFRESH_AGGREGATES RESUME;
 ALTER TASK TASK_LOAD_FACTS         RESUME;
 ALTER TASK TASK_LOAD_DIMENSIONS    RESUME;
@@ -0,0 +1,137 @@
+-- ============================================================
+-- STAGE LAYER RETENTION
+-- Moves raw rows that the stage → clean MERGE has already
+-- processed (_stg_load_ts at or below the clean table's
+-- ETL_WATERMARK) and that are older than the 7-day retention
+-- window into STG_*_RAW_ARCHIVE, then deletes them from the raw
+-- table. The window keeps recent files at hand for debugging.
+-- Runs daily as TASK_ARCHIVE_STAGE; COPY's load history still
+-- stops archived files from being loaded again.
+-- ============================================================
+
+USE DATABASE RETAIL_DW;
+USE WAREHOUSE RETAIL_WH;
+
+BEGIN TRANSACTION;
+
+-- ============================================================
+-- Location
+-- ============================================================
+INSERT INTO STAGE_LAYER.STG_LOCATION_RAW_ARCHIVE
+SELECT * FROM STAGE_LAYER.STG_LOCATION_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_LOCATION')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+DELETE FROM STAGE_LAYER.STG_LOCATION_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_LOCATION')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+-- ============================================================
+-- Store
+-- ============================================================
+INSERT INTO STAGE_LAYER.STG_STORE_RAW_ARCHIVE
+SELECT * FROM STAGE_LAYER.STG_STORE_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_STORE')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+DELETE FROM STAGE_LAYER.STG_STORE_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_STORE')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+-- ============================================================
+-- Customer
+-- ============================================================
+INSERT INTO STAGE_LAYER.STG_CUSTOMER_RAW_ARCHIVE
+SELECT * FROM STAGE_LAYER.STG_CUSTOMER_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_CUSTOMER')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+DELETE FROM STAGE_LAYER.STG_CUSTOMER_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_CUSTOMER')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+-- ============================================================
+-- Product Category
+-- ============================================================
+INSERT INTO STAGE_LAYER.STG_PRODUCT_CATEGORY_RAW_ARCHIVE
+SELECT * FROM STAGE_LAYER.STG_PRODUCT_CATEGORY_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_PRODUCT_CATEGORY')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+DELETE FROM STAGE_LAYER.STG_PRODUCT_CATEGORY_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_PRODUCT_CATEGORY')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+-- ============================================================
+-- Product
+-- ============================================================
+INSERT INTO STAGE_LAYER.STG_PRODUCT_RAW_ARCHIVE
+SELECT * FROM STAGE_LAYER.STG_PRODUCT_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_PRODUCT')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+DELETE FROM STAGE_LAYER.STG_PRODUCT_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_PRODUCT')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+-- ============================================================
+-- Sales Transaction
+-- ============================================================
+INSERT INTO STAGE_LAYER.STG_SALES_TRANSACTION_RAW_ARCHIVE
+SELECT * FROM STAGE_LAYER.STG_SALES_TRANSACTION_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_SALES_TRANSACTION')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+DELETE FROM STAGE_LAYER.STG_SALES_TRANSACTION_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_SALES_TRANSACTION')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+-- ============================================================
+-- Sales Line
+-- ============================================================
+INSERT INTO STAGE_LAYER.STG_SALES_LINE_RAW_ARCHIVE
+SELECT * FROM STAGE_LAYER.STG_SALES_LINE_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_SALES_LINE')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+DELETE FROM STAGE_LAYER.STG_SALES_LINE_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_SALES_LINE')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+-- ============================================================
+-- Payment
+-- ============================================================
+INSERT INTO STAGE_LAYER.STG_PAYMENT_RAW_ARCHIVE
+SELECT * FROM STAGE_LAYER.STG_PAYMENT_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_PAYMENT')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+DELETE FROM STAGE_LAYER.STG_PAYMENT_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_PAYMENT')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+-- ============================================================
+-- Return
+-- ============================================================
+INSERT INTO STAGE_LAYER.STG_RETURN_RAW_ARCHIVE
+SELECT * FROM STAGE_LAYER.STG_RETURN_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_RETURN')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+DELETE FROM STAGE_LAYER.STG_RETURN_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_RETURN')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+-- ============================================================
+-- Inventory
+-- ============================================================
+INSERT INTO STAGE_LAYER.STG_INVENTORY_RAW_ARCHIVE
+SELECT * FROM STAGE_LAYER.STG_INVENTORY_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_INVENTORY')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+DELETE FROM STAGE_LAYER.STG_INVENTORY_RAW
+WHERE _stg_load_ts <= (SELECT high_water_ts FROM CONSUMPTION_LAYER.ETL_WATERMARK WHERE table_name = 'CLN_INVENTORY')
+  AND _stg_load_ts <  DATEADD(DAY, -7, CURRENT_DATE());
+
+COMMIT;
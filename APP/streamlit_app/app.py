@@ -1,17 +1,26 @@
 """
 Retail Chain Data Engineering – Streamlit Analytics Dashboard
 """
-import sys, os
+import sys, os, logging, threading
+from concurrent.futures import ThreadPoolExecutor
 sys.path.insert(0, os.path.dirname(__file__))
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 import mock_data as md
-from db import run_query, USE_MOCK, KPI_SUMMARY_SQL, MONTHLY_TREND_SQL
+from refresher import Refresher
+from db import (cached_query, pipeline_version, pool_metrics, cache_metrics, USE_MOCK,
+                kpi_summary_query, monthly_trend_query, top_products_query, store_perf_query,
+                TASK_AUDIT_SQL)
+
+# db logs which table each dashboard query was routed to.
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'),
+                    format='%(asctime)s %(name)s %(levelname)s %(message)s')
 
 # ── Page config ─────────────────────────────────────────────
 st.set_page_config(
@@ -55,6 +64,8 @@ PLOTLY_THEME = dict(
 )
 PALETTE = px.colors.qualitative.Set2
 
+YEARS = [2023, 2024]
+
 # ── Sidebar ──────────────────────────────────────────────────
 with st.sidebar:
     st.markdown("## 🛒 Retail Chain DW")
@@ -74,57 +85,179 @@ with st.sidebar:
     )
     st.markdown("---")
     st.markdown("### Filters")
-    year_filter = st.multiselect("Year", [2023, 2024], default=[2023, 2024])
-    region_filter = st.multiselect("Region", md.REGIONS, default=md.REGIONS)
+    year_filter = st.multiselect("Year", YEARS, default=YEARS,
+                                 help="Leave empty for all years")
+    region_filter = st.multiselect("Region", md.REGIONS, default=md.REGIONS,
+                                   help="Leave empty for all regions")
     st.markdown("---")
     st.caption("Tech Stack: Snowflake · Python · Streamlit")
     st.caption("Architecture: Stage → Clean → Consumption")
 
 
 # ── Data loading helpers ─────────────────────────────────────
+# Filtered loaders take (years, regions) as sorted tuples, so st.cache_data keys
+# each cached result by the selection it was computed for. Live queries push the
+# filters into SQL; mock frames are filtered in pandas.
+def apply_filters(df, years, regions):
+    if years and 'year_number' in df.columns:
+        df = df[df['year_number'].isin(years)]
+    if regions and 'region' in df.columns:
+        df = df[df['region'].isin(regions)]
+    return df.reset_index(drop=True)
+
+# Live datasets: fetch_* query the warehouse through db's shared result cache
+# and return None on failure. They run under the refresher below, which serves
+# the last good result and recomputes it off the request path once the task
+# DAG completes a new run.
+def fetch_summary(years, regions, version):
+    df = cached_query(*kpi_summary_query(years, regions), version=version)
+    return None if df is None else df.iloc[0].to_dict()
+
+def fetch_monthly(years, regions, version):
+    df = cached_query(*monthly_trend_query(years, regions), version=version)
+    if df is not None:
+        # Amounts arrive as exact decimals; the growth ratio is a float.
+        df['mom_growth_pct'] = df['net_revenue'].astype(float).pct_change().mul(100).round(2)
+    return df
+
+def fetch_stores(years, regions, version):
+    return cached_query(*store_perf_query(years, regions), version=version)
+
+def fetch_products(years, regions, version):
+    return cached_query(*top_products_query(years, regions), version=version)
+
+def fetch_audit(years, regions, version):
+    return cached_query(TASK_AUDIT_SQL, version=version)
+
+@st.cache_resource
+def get_refresher():
+    return Refresher(pipeline_version).start()
+
+# Mock data, also the fallback while a live dataset is unavailable.
 @st.cache_data(ttl=300)
-def load_summary():
-    df = run_query(KPI_SUMMARY_SQL)
-    return md.get_kpi_summary() if df is None else df.iloc[0].to_dict()
+def load_summary(years=(), regions=()):
+    return md.get_kpi_summary()
 
 @st.cache_data(ttl=300)
-def load_monthly():
-    df = run_query(MONTHLY_TREND_SQL)
-    return md.get_monthly_trend() if df is None else df
+def load_monthly(years=(), regions=()):
+    return apply_filters(md.get_monthly_trend(), years, ())
 
 @st.cache_data(ttl=300)
-def load_stores():    return md.get_store_performance()
+def load_stores(years=(), regions=()):
+    return apply_filters(md.get_store_performance(), years, regions)
+
 @st.cache_data(ttl=300)
-def load_products():  return md.get_top_products(20)
+def load_products(years=(), regions=()):
+    return md.get_top_products(20)
+
 @st.cache_data(ttl=300)
 def load_segments():  return md.get_customer_segments()
 @st.cache_data(ttl=300)
-def load_top_customers(): return md.get_top_customers()
+def load_top_customers(years=(), regions=()):
+    return apply_filters(md.get_top_customers(), years, regions)
 @st.cache_data(ttl=300)
 def load_pay_channel(): return md.get_payment_channel_mix()
 @st.cache_data(ttl=300)
 def load_categories(): return md.get_category_performance()
 @st.cache_data(ttl=300)
-def load_inventory(): return md.get_inventory_health()
+def load_inventory(years=(), regions=()):
+    return apply_filters(md.get_inventory_health(), years, regions)
 @st.cache_data(ttl=300)
 def load_returns():   return md.get_return_analysis()
 @st.cache_data(ttl=300)
 def load_yoy():       return md.get_yoy_comparison()
 @st.cache_data(ttl=300)
-def load_regional():  return md.get_regional_quarterly()
-
-summary  = load_summary()
-monthly  = load_monthly()
-stores   = load_stores()
-products = load_products()
-segments = load_segments()
-cats     = load_categories()
-inv      = load_inventory()
-returns  = load_returns()
-yoy      = load_yoy()
-regional = load_regional()
-pay_ch   = load_pay_channel()
-top_cust = load_top_customers()
+def load_regional(years=(), regions=()):
+    return apply_filters(md.get_regional_quarterly(), years, regions)
+@st.cache_data(ttl=300)
+def load_task_audit(): return md.get_task_audit()
+
+# ── Concurrent, page-scoped loading ──────────────────────────
+# Only the datasets the selected page renders are loaded, and they are fetched
+# in parallel, so a cold page waits for its slowest query rather than the sum.
+LOADERS = {
+    'summary':  load_summary,
+    'monthly':  load_monthly,
+    'stores':   load_stores,
+    'products': load_products,
+    'segments': load_segments,
+    'cats':     load_categories,
+    'inv':      load_inventory,
+    'returns':  load_returns,
+    'yoy':      load_yoy,
+    'regional': load_regional,
+    'pay_ch':   load_pay_channel,
+    'top_cust': load_top_customers,
+    'audit':    load_task_audit,
+}
+PAGE_DATASETS = {
+    "Executive Summary":       ['summary', 'monthly', 'cats', 'yoy', 'stores'],
+    "Sales Trends":            ['monthly', 'pay_ch', 'returns'],
+    "Store Performance":       ['stores', 'regional'],
+    "Product Analytics":       ['products', 'cats'],
+    "Customer Insights":       ['segments', 'top_cust'],
+    "Inventory Health":        ['inv'],
+    "Architecture & Pipeline": ['audit'],
+}
+
+FETCHERS = {
+    'summary':  fetch_summary,
+    'monthly':  fetch_monthly,
+    'stores':   fetch_stores,
+    'products': fetch_products,
+    'audit':    fetch_audit,
+}
+# Datasets that honour the sidebar filters; the rest are unaffected by them and
+# stay cached under a single key.
+FILTERED = {'summary', 'monthly', 'stores', 'products', 'regional', 'inv', 'top_cust'}
+
+def load_datasets(names, years=(), regions=()):
+    """{name: data} for names, and {name: age in seconds} for those served live."""
+    refresher = None if USE_MOCK else get_refresher()
+    def load(name):
+        if refresher and name in FETCHERS:
+            fetch    = FETCHERS[name]
+            value, _ = refresher.get((name, years, regions), lambda version: fetch(years, regions, version))
+            if value is not None:
+                return value
+        return LOADERS[name](years, regions) if name in FILTERED else LOADERS[name]()
+    def ages():
+        if refresher is None:
+            return {}
+        return {key[0]: age for key, age in refresher.ages([(n, years, regions) for n in names]).items()}
+    if len(names) <= 1:
+        return {name: load(name) for name in names}, ages()
+    # Worker threads need the script context for st.cache_data to work from them.
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=len(names),
+                            initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)) as pool:
+        futures = {name: pool.submit(load, name) for name in names}
+        return {name: fut.result() for name, fut in futures.items()}, ages()
+
+def selection(chosen, options):
+    # Everything selected is the same as no filter: same cache key, no predicate.
+    return () if set(chosen) >= set(options) else tuple(sorted(chosen))
+
+data, ages = load_datasets(PAGE_DATASETS[page], selection(year_filter, YEARS), selection(region_filter, md.REGIONS))
+summary  = data.get('summary')
+monthly  = data.get('monthly')
+stores   = data.get('stores')
+products = data.get('products')
+segments = data.get('segments')
+cats     = data.get('cats')
+inv      = data.get('inv')
+returns  = data.get('returns')
+yoy      = data.get('yoy')
+regional = data.get('regional')
+pay_ch   = data.get('pay_ch')
+top_cust = data.get('top_cust')
+
+if ages:
+    oldest = max(ages.values())
+    st.sidebar.caption(f"Data age: {oldest // 60:.0f}m {oldest % 60:.0f}s "
+                       f"(refreshed in the background after each pipeline run)")
+elif USE_MOCK:
+    st.sidebar.caption("Data: mock")
 
 
 def fmt_currency(v):
@@ -602,11 +735,11 @@ elif page == "Architecture & Pipeline":
         <div class="metric-label">Layer 2 – Clean / Curated</div>
         <div style="color:#64ffda;font-size:1.1rem;margin:8px 0">Validated & Typed</div>
         <div style="color:#8892b0;font-size:0.85rem;text-align:left">
-        • MERGE-based upserts (no duplicates)<br>
+        • Watermarked MERGE upserts (latest version per key)<br>
         • Type casting (TRY_TO_NUMBER, TRY_TO_DATE)<br>
         • Data quality: null checks, range validation<br>
         • Computed columns (gross_margin, age, etc.)<br>
-        • CDC Streams on all clean tables<br>
+        • CDC Streams on all clean tables (gate the tasks)<br>
         • Audit columns: _dw_inserted_ts, _is_deleted
         </div>
         </div>
@@ -646,25 +779,49 @@ elif page == "Architecture & Pipeline":
 
     st.markdown('<div class="section-header">Pipeline Orchestration (Snowflake Tasks)</div>', unsafe_allow_html=True)
     tasks = [
-        {"Step": 1, "Task": "TASK_STAGE_TO_CLEAN",    "Schedule": "Every Hour (CRON)",
-         "Action": "MERGE Stage raw → Clean typed tables", "Depends On": "Root"},
-        {"Step": 2, "Task": "TASK_LOAD_DIMENSIONS",    "Schedule": "After Step 1",
+        {"Step": 1, "Task": "TASK_STAGE_TO_CLEAN",    "Schedule": "Hourly, when a stage stream has data",
+         "Action": "MERGE raw rows past each table's ETL_WATERMARK, latest per key → Clean typed tables", "Depends On": "Root"},
+        {"Step": 2, "Task": "TASK_LOAD_DIMENSIONS",    "Schedule": "After Step 1, when a clean dim stream has data",
          "Action": "SCD Type 2 MERGE into DIM tables", "Depends On": "TASK_STAGE_TO_CLEAN"},
-        {"Step": 3, "Task": "TASK_LOAD_FACTS",         "Schedule": "After Step 2",
-         "Action": "INSERT new rows into FACT_SALES, FACT_INVENTORY, FACT_RETURNS", "Depends On": "TASK_LOAD_DIMENSIONS"},
-        {"Step": 4, "Task": "TASK_REFRESH_AGGREGATES", "Schedule": "After Step 3",
-         "Action": "TRUNCATE + INSERT monthly aggregate tables", "Depends On": "TASK_LOAD_FACTS"},
+        {"Step": 3, "Task": "TASK_LOAD_FACTS",         "Schedule": "After Step 2, when a clean fact stream has data",
+         "Action": "MERGE sales lines past the ETL_WATERMARK high-water mark into FACT_SALES; INSERT new FACT_INVENTORY, FACT_RETURNS rows", "Depends On": "TASK_LOAD_DIMENSIONS"},
+        {"Step": 4, "Task": "TASK_REFRESH_AGGREGATES", "Schedule": "After Step 3, when a fact stream has data",
+         "Action": "MERGE touched (month, store) / (month, product) buckets in one transaction", "Depends On": "TASK_LOAD_FACTS"},
+        {"Step": 5, "Task": "TASK_ARCHIVE_STAGE",      "Schedule": "Daily 02:30 UTC",
+         "Action": "Move processed raw rows older than 7 days to STG_*_RAW_ARCHIVE", "Depends On": "Standalone"},
     ]
     st.dataframe(pd.DataFrame(tasks), use_container_width=True)
 
+    st.markdown('<div class="section-header">Recent Task Runs (TASK_RUN_AUDIT, last 7 days)</div>', unsafe_allow_html=True)
+    audit = data['audit']
+    if audit is None or audit.empty:
+        st.info("No task runs recorded yet.")
+    else:
+        fig = px.bar(audit.sort_values('started_ts'), x='started_ts', y='duration_seconds', color='task_name',
+                     color_discrete_sequence=PALETTE, hover_data=['rows_processed', 'tables_changed'],
+                     labels={'started_ts': 'Run start', 'duration_seconds': 'Duration (s)', 'task_name': 'Task'})
+        fig.update_layout(height=300, **PLOTLY_THEME, legend=dict(orientation='h', y=1.15),
+                          margin=dict(l=0,r=0,t=20,b=0))
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(audit.head(40), use_container_width=True)
+
     st.markdown('<div class="section-header">Tech Stack</div>', unsafe_allow_html=True)
     tech = [
         {"Component": "Snowflake Warehouse", "Role": "Storage + Compute", "Details": "RETAIL_WH (X-Small, Auto-suspend 60s)"},
         {"Component": "Internal Stages",     "Role": "File Landing Zone",  "Details": "10 stages (CSV, gzip compressed)"},
-        {"Component": "Streams",             "Role": "CDC",                "Details": "6 streams on clean layer tables"},
-        {"Component": "Tasks",               "Role": "Orchestration",      "Details": "4 chained tasks, hourly schedule"},
+        {"Component": "Streams",             "Role": "CDC",                "Details": "10 stage, 10 clean, 2 fact streams gating the tasks"},
+        {"Component": "Tasks",               "Role": "Orchestration",      "Details": "4 chained tasks (hourly, audited per run) + daily stage archive"},
         {"Component": "Python + Faker",      "Role": "Data Generation",    "Details": "500 customers, 200 products, 3000 transactions"},
         {"Component": "Streamlit",           "Role": "BI Dashboard",       "Details": "12 KPI views, interactive charts"},
         {"Component": "Plotly",              "Role": "Visualization",      "Details": "Bar, Line, Scatter, Heatmap, Treemap, Pie"},
     ]
     st.dataframe(pd.DataFrame(tech), use_container_width=True)
+
+# ── Connection pool + result cache stats (after this run's queries)
+if not USE_MOCK:
+    pm = pool_metrics()
+    st.sidebar.caption(f"Pool: {pm['open']}/{pm['size']} open · {pm['hits']} hits · "
+                       f"{pm['waits']} waits · {pm['opens']} opens · {pm['evictions']} evicted")
+    cm = cache_metrics()
+    st.sidebar.caption(f"Result cache: {cm['entries']} results · {cm['mb']} MB · "
+                       f"pipeline run {get_refresher().version or 'unknown'}")
@@ -2,18 +2,39 @@
 Snowflake connector module for the Streamlit dashboard.
 Falls back to mock data when USE_MOCK_DATA=true or connection fails.
 """
+import hashlib
+import logging
 import os
-from typing import Optional
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Sequence, Tuple
 
 import pandas as pd
+import pyarrow as pa
 from dotenv import load_dotenv
 
+from result_cache import ResultCache, VersionMarker, cache_key
+
+try:
+    from snowflake.connector.errors import NotSupportedError
+except ImportError:                   # DW_BACKEND=duckdb without the connector installed
+    class NotSupportedError(Exception):
+        pass
+
 load_dotenv()
 
-USE_MOCK = os.getenv('USE_MOCK_DATA', 'true').lower() in ('true', '1', 'yes')
+USE_MOCK   = os.getenv('USE_MOCK_DATA', 'true').lower() in ('true', '1', 'yes')
+DW_BACKEND = os.getenv('DW_BACKEND', 'snowflake').lower()    # 'duckdb' → scripts/local_warehouse.py build
+
+log = logging.getLogger(__name__)
 
 
 def _get_conn():
+    if DW_BACKEND == 'duckdb':
+        return _get_local_conn()
     try:
         import snowflake.connector
         return snowflake.connector.connect(
@@ -23,87 +44,572 @@ def _get_conn():
             database  = os.getenv('SNOWFLAKE_DATABASE', 'RETAIL_DW'),
             warehouse = os.getenv('SNOWFLAKE_WAREHOUSE', 'RETAIL_WH'),
             role      = os.getenv('SNOWFLAKE_ROLE', 'SYSADMIN'),
+            arrow_number_to_decimal = True,
         )
     except Exception:
         return None
 
+def _get_local_conn():
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+    try:
+        import local_warehouse
+        return local_warehouse.connect()
+    except Exception:
+        log.warning('local warehouse unavailable', exc_info=True)
+        return None
+
+
+# ── Connection pool ──────────────────────────────────────────
+# One pool per process, shared by every Streamlit session and thread, so page
+# loads reuse logged-in sessions instead of paying the handshake per query.
+POOL_SIZE         = int(os.getenv('SNOWFLAKE_POOL_SIZE', 4))
+POOL_IDLE_SECONDS = float(os.getenv('SNOWFLAKE_POOL_IDLE_SECONDS', 600))   # evict after this long unused
+POOL_CHECK_AFTER  = float(os.getenv('SNOWFLAKE_POOL_CHECK_AFTER', 60))     # health-check if idle this long
+POOL_WAIT_SECONDS = float(os.getenv('SNOWFLAKE_POOL_WAIT_SECONDS', 30))
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of at most `size` connections. Checkout reuses the most
+    recently returned idle connection (hit), opens a new one while under size
+    (open), or blocks until one is returned (wait). Connections idle longer
+    than idle_seconds are closed; ones idle longer than check_after are
+    pinged with SELECT 1 before reuse and replaced if the ping fails.
+    """
+    def __init__(self, connect=None, size=POOL_SIZE, idle_seconds=POOL_IDLE_SECONDS,
+                 check_after=POOL_CHECK_AFTER, wait_seconds=POOL_WAIT_SECONDS):
+        self._connect     = connect or _get_conn
+        self.size         = size
+        self.idle_seconds = idle_seconds
+        self.check_after  = check_after
+        self.wait_seconds = wait_seconds
+        self._idle        = []       # [(conn, last_used)], most recent last
+        self._open        = 0
+        self._cond        = threading.Condition()
+        self.stats        = {'hits': 0, 'waits': 0, 'opens': 0, 'evictions': 0, 'failed_checks': 0}
+
+    def _evict_idle(self, now):
+        keep = []
+        for conn, last_used in self._idle:
+            if now - last_used > self.idle_seconds:
+                self._discard(conn)
+                self.stats['evictions'] += 1
+            else:
+                keep.append((conn, last_used))
+        self._idle = keep
+
+    def _discard(self, conn):
+        self._open -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _healthy(conn):
+        try:
+            if conn.is_closed():
+                return False
+            cs = conn.cursor()
+            cs.execute('SELECT 1')
+            cs.close()
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        deadline = time.monotonic() + self.wait_seconds
+        waited   = False
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._evict_idle(now)
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    if now - last_used <= self.check_after or self._healthy(conn):
+                        self.stats['hits'] += 1
+                        return conn
+                    self.stats['failed_checks'] += 1
+                    self._discard(conn)
+                    continue
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                if now >= deadline:
+                    raise TimeoutError(f'no Snowflake connection free after {self.wait_seconds}s')
+                if not waited:
+                    self.stats['waits'] += 1
+                    waited = True
+                self._cond.wait(deadline - now)
 
-def run_query(sql: str) -> Optional[pd.DataFrame]:
+        # Open outside the lock so a slow login doesn't block checkouts.
+        conn = self._connect()
+        with self._cond:
+            if conn is None:
+                self._open -= 1
+                self._cond.notify()
+                raise ConnectionError('could not connect to Snowflake')
+            self.stats['opens'] += 1
+        return conn
+
+    def release(self, conn):
+        with self._cond:
+            try:
+                closed = conn.is_closed()
+            except Exception:
+                closed = True
+            if closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {**self.stats, 'size': self.size, 'open': self._open,
+                    'idle': len(self._idle), 'in_use': self._open - len(self._idle)}
+
+    def close(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+
+
+_pool      = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+def pool_metrics() -> dict:
+    """Hits, waits, opens, evictions and current occupancy of the shared pool."""
+    return get_pool().metrics()
+
+
+# ── Result fetching ──────────────────────────────────────────
+# The connector receives results as Arrow record batches. fetchall() turns each
+# cell into a Python object only for pandas to copy them back into columns;
+# the Arrow path hands the batches to pandas column-wise, keeping numeric and
+# timestamp columns typed: NUMBER(p,0) → int64, scaled NUMBER(p,s) → exact
+# decimal128 (a pandas ArrowDtype, not a lossy float64), TIMESTAMP → datetime64.
+def _columns(cs):
+    return [desc[0].lower() for desc in cs.description]
+
+def _arrow_dtype(arrow_type):
+    """types_mapper for Table.to_pandas: decimals stay Arrow decimals, the rest convert as usual."""
+    return pd.ArrowDtype(arrow_type) if pa.types.is_decimal(arrow_type) else None
+
+def _arrow_frame(table) -> pd.DataFrame:
+    df = table.to_pandas(types_mapper=_arrow_dtype)
+    df.columns = [c.lower() for c in df.columns]
+    return df
+
+def _fetch_tuples(cs) -> pd.DataFrame:
+    return pd.DataFrame(cs.fetchall(), columns=_columns(cs))
+
+def _fetch_arrow(cs) -> pd.DataFrame:
+    try:
+        table = cs.fetch_arrow_all()
+    except NotSupportedError:
+        return _fetch_tuples(cs)      # result came back as JSON (e.g. SHOW/DESCRIBE)
+    if table is None:                 # empty result
+        return pd.DataFrame(columns=_columns(cs))
+    return _arrow_frame(table)
+
+
+def run_query(sql: str, params: Optional[Sequence] = None, arrow: bool = True) -> Optional[pd.DataFrame]:
+    """Run sql with optional bound params (%s placeholders) and return a DataFrame, or None."""
     if USE_MOCK:
         return None
-    conn = _get_conn()
-    if conn is None:
+    try:
+        with get_pool().connection() as conn:
+            cs = conn.cursor()
+            try:
+                cs.execute(sql, params)
+                return _fetch_arrow(cs) if arrow else _fetch_tuples(cs)
+            finally:
+                cs.close()
+    except Exception:
         return None
+
+
+def iter_query(sql: str, params: Optional[Sequence] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a large result as DataFrames, one per Arrow result batch, so the
+    whole result never has to sit in memory. Holds a pooled connection until
+    the iterator is exhausted or closed. Yields nothing in mock mode or when the
+    query fails before its first batch; a failure after that is logged and
+    raised, so a cut-off stream never passes for a complete result.
+    """
+    if USE_MOCK:
+        return
+    started = False
     try:
-        cs = conn.cursor()
-        cs.execute(sql)
-        cols = [desc[0].lower() for desc in cs.description]
-        rows = cs.fetchall()
-        return pd.DataFrame(rows, columns=cols)
+        with get_pool().connection() as conn:
+            cs = conn.cursor()
+            try:
+                cs.execute(sql, params)
+                for batch in cs.fetch_arrow_batches():
+                    started = True
+                    yield _arrow_frame(batch)
+            finally:
+                cs.close()
     except Exception:
+        if not started:
+            return
+        log.warning('query stream failed after some batches', exc_info=True)
+        raise
+
+
+# ── Shared result cache ──────────────────────────────────────
+# Results are cached on disk (result_cache.py) for every replica, keyed by SQL +
+# params, and namespaced by the pipeline version: the completion time of the
+# task DAG's last successful TASK_REFRESH_AGGREGATES run. Nothing expires on a
+# clock; when the DAG finishes a new run the version changes, the old namespace
+# is dropped and the next request for each query goes to the warehouse.
+PIPELINE_TASK          = os.getenv('PIPELINE_TASK', 'TASK_REFRESH_AGGREGATES')
+PIPELINE_CHECK_SECONDS = float(os.getenv('PIPELINE_CHECK_SECONDS', 60))
+
+PIPELINE_VERSION_SQL = """
+SELECT MAX(completed_time)::VARCHAR AS completed_time
+FROM TABLE(RETAIL_DW.INFORMATION_SCHEMA.TASK_HISTORY(TASK_NAME => %s, RESULT_LIMIT => 100))
+WHERE state = 'SUCCEEDED'
+"""
+
+_cache        = None
+_marker       = None
+_version_lock = threading.Lock()
+
+def get_cache() -> ResultCache:
+    global _cache, _marker
+    with _version_lock:
+        if _cache is None:
+            _cache, _marker = ResultCache(), VersionMarker()
+        return _cache
+
+def pipeline_version() -> Optional[str]:
+    """
+    Version of the data the warehouse is serving, or None in mock mode or when
+    it can't be determined. Polled at most every PIPELINE_CHECK_SECONDS across
+    all processes sharing the cache directory.
+    """
+    if USE_MOCK:
         return None
-    finally:
+    get_cache()
+    with _version_lock:
+        known = _marker.read()
+        if known and time.time() - known['checked_at'] < PIPELINE_CHECK_SECONDS:
+            return known['version']
+        df = run_query(PIPELINE_VERSION_SQL, [PIPELINE_TASK])
+        if df is None or df.empty or df.iloc[0, 0] is None:
+            return known.get('version')     # keep serving the last known version
+        version = str(df.iloc[0, 0])
+        _marker.write(version)
+        return version
+
+def cached_query(sql: str, params: Optional[Sequence] = None,
+                 version: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """run_query through the shared disk cache; uncached if the version is unknown."""
+    version = version or pipeline_version()
+    if version is None:
+        return run_query(sql, params)
+    cache     = get_cache()
+    namespace = hashlib.sha1(version.encode()).hexdigest()[:16]
+    key       = cache_key(sql, params)
+    df        = cache.get(namespace, key)
+    if df is not None:
+        return df
+    df = run_query(sql, params)
+    if df is not None:
         try:
-            conn.close()
+            cache.put(namespace, key, df)
         except Exception:
-            pass
+            log.warning('result cache write failed', exc_info=True)
+    return df
 
+def cache_metrics() -> dict:
+    return get_cache().stats()
 
-# ── Pre-built query helpers ──────────────────────────────────
-
-KPI_SUMMARY_SQL = """
-SELECT
-    SUM(net_sales_amount)           AS gross_revenue,
-    SUM(discount_amount)            AS total_discounts,
-    SUM(net_sales_amount)           AS net_revenue,
-    SUM(cogs_amount)                AS total_cogs,
-    SUM(gross_profit_amount)        AS gross_profit,
-    ROUND(SUM(gross_profit_amount)/NULLIF(SUM(net_sales_amount),0)*100,2) AS gross_margin_pct,
-    COUNT(DISTINCT transaction_id)  AS total_transactions,
-    COUNT(DISTINCT customer_sk)     AS unique_customers,
-    SUM(quantity_sold)              AS units_sold,
-    ROUND(SUM(net_sales_amount)/NULLIF(COUNT(DISTINCT transaction_id),0),2) AS avg_transaction_value
-FROM RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES
-WHERE transaction_type='SALE'
-"""
 
-MONTHLY_TREND_SQL = """
-SELECT
-    d.year_number, d.month_number, d.month_name,
-    d.year_number||'-'||LPAD(d.month_number::VARCHAR,2,'0') AS year_month,
-    SUM(fs.net_sales_amount)   AS net_revenue,
-    SUM(fs.gross_profit_amount) AS gross_profit,
-    COUNT(DISTINCT fs.transaction_id) AS transactions,
-    COUNT(DISTINCT fs.customer_sk) AS unique_customers,
-    SUM(fs.quantity_sold) AS units_sold,
-    ROUND(SUM(fs.net_sales_amount)/NULLIF(COUNT(DISTINCT fs.transaction_id),0),2) AS avg_basket_size
-FROM RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES fs
-JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_DATE d ON fs.date_key=d.date_key
-WHERE fs.transaction_type='SALE'
-GROUP BY 1,2,3,4 ORDER BY 1,2
-"""
+# ── Aggregate-aware query routing ────────────────────────────
+# Dashboard queries are declared as specs (dimensions + measures) rather than
+# SQL. route() picks the first source in ROUTE_ORDER that can answer a spec
+# exactly — the monthly aggregates hold a few thousand rows per year against
+# FACT_SALES' line grain — and compile_query() renders it for that source. The
+# sidebar's Year/Region selections become bound predicates (%s params).
+#
+# A source can answer a spec when it has every dimension and filter column and
+# every base measure. SUMs roll up from any grain; a COUNT DISTINCT stored per
+# aggregate row only rolls up when the grouping keeps the keys that partition
+# it (listed under 'exact_by'; 'a+b' means both columns together).
 
-TOP_PRODUCTS_SQL = """
-SELECT dp.product_name, dp.category_name, dp.brand,
-    SUM(fs.quantity_sold) AS units_sold, SUM(fs.net_sales_amount) AS net_revenue,
-    SUM(fs.gross_profit_amount) AS gross_profit,
-    ROUND(SUM(fs.gross_profit_amount)/NULLIF(SUM(fs.net_sales_amount),0)*100,2) AS margin_pct,
-    COUNT(DISTINCT fs.transaction_id) AS transactions
-FROM RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES fs
-JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_PRODUCT dp ON fs.product_sk=dp.product_sk
-WHERE fs.transaction_type='SALE'
-GROUP BY 1,2,3 ORDER BY net_revenue DESC LIMIT 20
-"""
+DW           = 'RETAIL_DW.CONSUMPTION_LAYER'
+DATE_JOIN    = f"JOIN {DW}.DIM_DATE d ON fs.date_key=d.date_key"
+STORE_JOIN   = f"JOIN {DW}.DIM_STORE ds ON fs.store_sk=ds.store_sk"
+PRODUCT_JOIN = f"JOIN {DW}.DIM_PRODUCT dp ON fs.product_sk=dp.product_sk"
+
+YEAR_MONTH_SQL = "{y}||'-'||LPAD({m}::VARCHAR,2,'0')"
+
+# Measures computed from base measures, the same way on every source.
+DERIVED = {
+    'margin_pct': 'ROUND({gross_profit}/NULLIF({net_sales},0)*100,2)',
+    'avg_ticket': 'ROUND({net_sales}/NULLIF({transactions},0),2)',
+}
+
+SOURCES = {
+    'AGG_MONTHLY_PRODUCT_SALES': {
+        'from':  f'{DW}.AGG_MONTHLY_PRODUCT_SALES a',
+        'joins': {},
+        'dims': {
+            'year_number':   (None, 'a.year_number'),
+            'month_number':  (None, 'a.month_number'),
+            'month_name':    (None, "MONTHNAME(TO_DATE(a.year_month||'-01'))"),
+            'year_month':    (None, 'a.year_month'),
+            'product_name':  (None, 'a.product_name'),
+            'category_name': (None, 'a.category_name'),
+            'brand':         (None, 'a.brand'),
+        },
+        'measures': {
+            'net_sales':    'SUM(a.net_sales_amount)',
+            'cogs':         'SUM(a.cogs_amount)',
+            'gross_profit': 'SUM(a.gross_profit_amount)',
+            'quantity':     'SUM(a.total_quantity)',
+            'transactions': 'SUM(a.transaction_count)',
+        },
+        'exact_by': {'transactions': [('product_name',)]},
+    },
+    'AGG_MONTHLY_STORE_SALES': {
+        'from':  f'{DW}.AGG_MONTHLY_STORE_SALES a',
+        'joins': {'ds': f'JOIN {DW}.DIM_STORE ds ON a.store_sk=ds.store_sk'},
+        'dims': {
+            'year_number':  (None, 'a.year_number'),
+            'month_number': (None, 'a.month_number'),
+            'month_name':   (None, "MONTHNAME(TO_DATE(a.year_month||'-01'))"),
+            'year_month':   (None, 'a.year_month'),
+            'store_id':     (None, 'a.store_id'),
+            'store_name':   (None, 'a.store_name'),
+            'store_type':   (None, 'a.store_type'),
+            'region':       (None, 'a.region'),
+            'city':         ('ds', 'ds.city'),
+            'state':        ('ds', 'ds.state'),
+        },
+        'measures': {
+            'net_sales':    'SUM(a.net_sales_amount)',
+            'discounts':    'SUM(a.discount_amount)',
+            'cogs':         'SUM(a.cogs_amount)',
+            'gross_profit': 'SUM(a.gross_profit_amount)',
+            'quantity':     'SUM(a.total_quantity)',
+            'transactions': 'SUM(a.transaction_count)',     # a transaction has one store and one date
+            'customers':    'SUM(a.customer_count)',
+        },
+        'exact_by': {'customers': [('year_month', 'year_number+month_number'), ('store_id', 'store_name')]},
+    },
+    'FACT_SALES': {
+        'from':  f'{DW}.FACT_SALES fs',
+        'joins': {'d': DATE_JOIN, 'ds': STORE_JOIN, 'dp': PRODUCT_JOIN},
+        'where': "fs.transaction_type='SALE'",
+        'date_key': 'fs.date_key',
+        'dims': {
+            'year_number':   ('d',  'd.year_number'),
+            'month_number':  ('d',  'd.month_number'),
+            'month_name':    ('d',  'd.month_name'),
+            'year_month':    ('d',  YEAR_MONTH_SQL.format(y='d.year_number', m='d.month_number')),
+            'store_id':      ('ds', 'ds.store_id'),
+            'store_name':    ('ds', 'ds.store_name'),
+            'store_type':    ('ds', 'ds.store_type'),
+            'region':        ('ds', 'ds.region'),
+            'city':          ('ds', 'ds.city'),
+            'state':         ('ds', 'ds.state'),
+            'product_name':  ('dp', 'dp.product_name'),
+            'category_name': ('dp', 'dp.category_name'),
+            'brand':         ('dp', 'dp.brand'),
+        },
+        'measures': {
+            'net_sales':    'SUM(fs.net_sales_amount)',
+            'discounts':    'SUM(fs.discount_amount)',
+            'cogs':         'SUM(fs.cogs_amount)',
+            'gross_profit': 'SUM(fs.gross_profit_amount)',
+            'quantity':     'SUM(fs.quantity_sold)',
+            'transactions': 'COUNT(DISTINCT fs.transaction_id)',
+            'customers':    'COUNT(DISTINCT fs.customer_sk)',
+        },
+        'exact_by': {},
+    },
+}
+ROUTE_ORDER = ['AGG_MONTHLY_PRODUCT_SALES', 'AGG_MONTHLY_STORE_SALES', 'FACT_SALES']
+
+# spec: dims in output order, measures as {output column: measure}, order/limit.
+KPI_SUMMARY = {
+    'dims': [],
+    'measures': {
+        'gross_revenue':         'net_sales',
+        'total_discounts':       'discounts',
+        'net_revenue':           'net_sales',
+        'total_cogs':            'cogs',
+        'gross_profit':          'gross_profit',
+        'gross_margin_pct':      'margin_pct',
+        'total_transactions':    'transactions',
+        'unique_customers':      'customers',
+        'units_sold':            'quantity',
+        'avg_transaction_value': 'avg_ticket',
+    },
+}
+MONTHLY_TREND = {
+    'dims': ['year_number', 'month_number', 'month_name', 'year_month'],
+    'measures': {
+        'net_revenue':      'net_sales',
+        'gross_profit':     'gross_profit',
+        'transactions':     'transactions',
+        'unique_customers': 'customers',
+        'units_sold':       'quantity',
+        'avg_basket_size':  'avg_ticket',
+    },
+    'order': '1,2',
+}
+TOP_PRODUCTS = {
+    'dims': ['product_name', 'category_name', 'brand'],
+    'measures': {
+        'units_sold':   'quantity',
+        'net_revenue':  'net_sales',
+        'gross_profit': 'gross_profit',
+        'margin_pct':   'margin_pct',
+        'transactions': 'transactions',
+    },
+    'order': 'net_revenue DESC',
+    'limit': 20,
+}
+STORE_PERF = {
+    'dims': ['store_id', 'store_name', 'store_type', 'region', 'city', 'state'],
+    'measures': {
+        'net_revenue':      'net_sales',
+        'gross_profit':     'gross_profit',
+        'margin_pct':       'margin_pct',
+        'transactions':     'transactions',
+        'unique_customers': 'customers',
+        'units_sold':       'quantity',
+        'avg_basket_value': 'avg_ticket',
+    },
+    'order': 'net_revenue DESC',
+}
+
+
+def _base_measures(measure):
+    if measure in DERIVED:
+        return set(re.findall(r'{(\w+)}', DERIVED[measure]))
+    return {measure}
+
+def _covers(dims, alternatives):
+    return any(set(alt.split('+')) <= set(dims) for alt in alternatives)
+
+def can_answer(table, spec, filter_dims=()) -> bool:
+    src  = SOURCES[table]
+    base = set().union(*(_base_measures(m) for m in spec['measures'].values()))
+    if not set(spec['dims']) | set(filter_dims) <= set(src['dims']):
+        return False
+    if not base <= set(src['measures']):
+        return False
+    return all(_covers(spec['dims'], keys)
+               for measure, groups in src['exact_by'].items() if measure in base for keys in groups)
+
+def route(spec, years=None, regions=None) -> str:
+    """First table in ROUTE_ORDER that answers spec exactly under the given filters."""
+    filter_dims = ['year_number'] * bool(years) + ['region'] * bool(regions)
+    return next(t for t in ROUTE_ORDER if can_answer(t, spec, filter_dims))
+
+def compile_query(spec, years=None, regions=None, table=None) -> Tuple[str, list, str]:
+    """(sql, params, table) for spec on `table`, or on the routed table if None."""
+    table = table or route(spec, years, regions)
+    src   = SOURCES[table]
+    joins, select, preds, params = set(), [], [], []
+
+    def dim(name):
+        join, expr = src['dims'][name]
+        if join:
+            joins.add(join)
+        return expr
+
+    def measure(name):
+        if name in DERIVED:
+            return DERIVED[name].format(**src['measures'])
+        return src['measures'][name]
+
+    select += [f'{dim(d)} AS {d}' for d in spec['dims']]
+    select += [f'{measure(m)} AS {alias}' for alias, m in spec['measures'].items()]
+    if src.get('where'):
+        preds.append(src['where'])
+    if years:
+        years = sorted(int(y) for y in years)
+        if src.get('date_key'):
+            # date_key is YYYYMMDD: a range on the fact column prunes micro-partitions
+            # without waiting for the DIM_DATE join.
+            preds.append(f"{src['date_key']} BETWEEN %s AND %s")
+            params += [years[0] * 10000 + 101, years[-1] * 10000 + 1231]
+        preds.append(f"{dim('year_number')} IN ({', '.join(['%s'] * len(years))})")
+        params += years
+    if regions:
+        regions = sorted(regions)
+        preds.append(f"{dim('region')} IN ({', '.join(['%s'] * len(regions))})")
+        params += regions
+
+    sql = 'SELECT\n    ' + ',\n    '.join(select) + f"\nFROM {src['from']}"
+    sql += ''.join(f"\n{src['joins'][j]}" for j in sorted(joins))
+    if preds:
+        sql += '\nWHERE ' + '\n  AND '.join(preds)
+    if spec['dims']:
+        sql += '\nGROUP BY ' + ','.join(str(i + 1) for i in range(len(spec['dims'])))
+    if spec.get('order'):
+        sql += f"\nORDER BY {spec['order']}"
+    if spec.get('limit'):
+        sql += f"\nLIMIT {spec['limit']}"
+    return sql + '\n', params, table
+
+def routed_query(name, spec, years=None, regions=None) -> Tuple[str, list]:
+    sql, params, table = compile_query(spec, years, regions)
+    log.info('%s → %s (years=%s, regions=%s)', name, table, list(years or []), list(regions or []))
+    return sql, params
+
+def kpi_summary_query(years=None, regions=None):
+    return routed_query('kpi_summary', KPI_SUMMARY, years, regions)
+
+def monthly_trend_query(years=None, regions=None):
+    return routed_query('monthly_trend', MONTHLY_TREND, years, regions)
+
+def top_products_query(years=None, regions=None):
+    return routed_query('top_products', TOP_PRODUCTS, years, regions)
+
+def store_perf_query(years=None, regions=None):
+    return routed_query('store_perf', STORE_PERF, years, regions)
+
+# Unfiltered forms on the fact table, kept for ad-hoc use.
+KPI_SUMMARY_SQL   = compile_query(KPI_SUMMARY, table='FACT_SALES')[0]
+MONTHLY_TREND_SQL = compile_query(MONTHLY_TREND, table='FACT_SALES')[0]
+TOP_PRODUCTS_SQL  = compile_query(TOP_PRODUCTS, table='FACT_SALES')[0]
+STORE_PERF_SQL    = compile_query(STORE_PERF, table='FACT_SALES')[0]
 
-STORE_PERF_SQL = """
-SELECT ds.store_id, ds.store_name, ds.store_type, ds.region, ds.city, ds.state,
-    SUM(fs.net_sales_amount) AS net_revenue, SUM(fs.gross_profit_amount) AS gross_profit,
-    ROUND(SUM(fs.gross_profit_amount)/NULLIF(SUM(fs.net_sales_amount),0)*100,2) AS margin_pct,
-    COUNT(DISTINCT fs.transaction_id) AS transactions,
-    COUNT(DISTINCT fs.customer_sk) AS unique_customers, SUM(fs.quantity_sold) AS units_sold,
-    ROUND(SUM(fs.net_sales_amount)/NULLIF(COUNT(DISTINCT fs.transaction_id),0),2) AS avg_basket_value
-FROM RETAIL_DW.CONSUMPTION_LAYER.FACT_SALES fs
-JOIN RETAIL_DW.CONSUMPTION_LAYER.DIM_STORE ds ON fs.store_sk=ds.store_sk
-WHERE fs.transaction_type='SALE'
-GROUP BY 1,2,3,4,5,6 ORDER BY net_revenue DESC
+# ── Pipeline run audit ───────────────────────────────────────
+# One row per task per DAG run from TASK_RUN_AUDIT, written by each task in the
+# transaction that did its work (05_Transformation/04_snowflake_tasks.sql).
+TASK_AUDIT_SQL = f"""
+SELECT run_group_id, task_name,
+       MIN(started_ts) AS started_ts,
+       DATEDIFF('millisecond', MIN(started_ts), MAX(completed_ts)) / 1000 AS duration_seconds,
+       SUM(rows_processed) AS rows_processed,
+       COUNT_IF(rows_processed > 0) AS tables_changed
+FROM {DW}.TASK_RUN_AUDIT
+WHERE started_ts >= DATEADD(DAY, -7, CURRENT_TIMESTAMP())
+GROUP BY 1,2
+ORDER BY started_ts DESC
 """
@@ -284,3 +284,31 @@ def get_yoy_comparison():
     df = pd.DataFrame(rows)
     df['yoy_growth_pct'] = df['net_revenue'].pct_change().mul(100).round(2)
     return df
+
+
+def get_task_audit(hours=48):
+    """Hourly DAG runs as in TASK_RUN_AUDIT; hours with no new files are skipped."""
+    tasks = [('TASK_STAGE_TO_CLEAN', 10), ('TASK_LOAD_DIMENSIONS', 5),
+             ('TASK_LOAD_FACTS', 5), ('TASK_REFRESH_AGGREGATES', 2)]
+    now   = pd.Timestamp.now().floor('h')
+    rows  = []
+    for h in range(hours):
+        if random.random() < 0.3:
+            continue
+        group   = f"{random.getrandbits(64):016x}"
+        started = now - pd.Timedelta(hours=h)
+        lines   = random.randint(200, 2_000)
+        for task, streams in tasks:
+            if task == 'TASK_LOAD_DIMENSIONS' and random.random() < 0.7:
+                continue
+            duration = round(random.uniform(4, 40), 3)
+            rows.append({
+                'run_group_id':     group,
+                'task_name':        task,
+                'started_ts':       started,
+                'duration_seconds': duration,
+                'rows_processed':   lines * streams // 2 if task != 'TASK_LOAD_DIMENSIONS' else random.randint(1, 30),
+                'tables_changed':   random.randint(1, streams),
+            })
+            started += pd.Timedelta(seconds=duration)
+    return pd.DataFrame(rows)
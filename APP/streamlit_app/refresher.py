@@ -0,0 +1,127 @@
+"""
+Stale-while-revalidate cache for dashboard datasets.
+get() always answers from memory once a dataset has been loaded; a background
+thread polls the pipeline version and recomputes datasets whose data is out of
+date on a small worker pool, so page renders never wait on the warehouse except
+for a dataset's very first load. A failed refresh keeps serving the last good
+value.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = float(os.getenv('REFRESH_INTERVAL_SECONDS', 30))   # version poll + stale sweep
+MAX_AGE          = float(os.getenv('DATASET_MAX_AGE_SECONDS', 300))   # only used while the version is unknown
+REFRESH_AHEAD    = 0.8                                                # refresh at 80% of MAX_AGE
+IDLE_SECONDS     = float(os.getenv('DATASET_IDLE_SECONDS', 3600))     # forget datasets nobody asked for
+REFRESH_WORKERS  = int(os.getenv('REFRESH_WORKERS', 2))
+
+
+class _Entry:
+    __slots__ = ('fn', 'value', 'version', 'fetched_at', 'last_used', 'refreshing')
+
+    def __init__(self, fn):
+        self.fn         = fn
+        self.value      = None
+        self.version    = None
+        self.fetched_at = None
+        self.last_used  = time.time()
+        self.refreshing = False
+
+
+class Refresher:
+    """
+    Datasets are registered by key with a function fn(version) → value or None.
+    A dataset is stale once the pipeline version moves past the one it was
+    computed for or, while no version is known, once it is REFRESH_AHEAD of
+    max_age old.
+    """
+    def __init__(self, version_fn, interval=REFRESH_INTERVAL, max_age=MAX_AGE,
+                 idle_seconds=IDLE_SECONDS, workers=REFRESH_WORKERS):
+        self.version_fn   = version_fn
+        self.interval     = interval
+        self.max_age      = max_age
+        self.idle_seconds = idle_seconds
+        self.version      = None
+        self._entries     = {}
+        self._lock        = threading.Lock()
+        self._stop        = threading.Event()
+        self._pool        = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='refresh')
+        self._thread      = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False)
+
+    def get(self, key, fn):
+        """(value, fetched_at) for key; computes inline only on first use."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(fn)
+            entry.last_used = time.time()
+        if entry.fetched_at is None:
+            self._refresh(entry)
+        elif self._is_stale(entry):
+            self._schedule(entry)
+        return entry.value, entry.fetched_at
+
+    def _is_stale(self, entry):
+        if self.version is not None:
+            return entry.version != self.version
+        return time.time() - entry.fetched_at > self.max_age * REFRESH_AHEAD
+
+    def _schedule(self, entry):
+        with self._lock:
+            if entry.refreshing:
+                return
+            entry.refreshing = True
+        self._pool.submit(self._refresh, entry)
+
+    def _refresh(self, entry):
+        version = self.version
+        try:
+            value = entry.fn(version)
+        except Exception:
+            log.warning('dataset refresh failed', exc_info=True)
+            value = None
+        with self._lock:
+            if value is not None:
+                entry.value, entry.version, entry.fetched_at = value, version, time.time()
+            elif entry.fetched_at is None:
+                entry.fetched_at = time.time()     # retried on the next sweep instead of inline
+            entry.refreshing = False
+
+    def _run(self):
+        while True:
+            try:
+                self.version = self.version_fn()
+            except Exception:
+                log.warning('pipeline version check failed', exc_info=True)
+            now = time.time()
+            with self._lock:
+                for key, entry in list(self._entries.items()):
+                    if now - entry.last_used > self.idle_seconds:
+                        del self._entries[key]
+                entries = list(self._entries.values())
+            for entry in entries:
+                if entry.fetched_at is not None and (entry.value is None or self._is_stale(entry)):
+                    self._schedule(entry)
+            if self._stop.wait(self.interval):
+                return
+
+    def ages(self, keys) -> dict:
+        now = time.time()
+        with self._lock:
+            return {key: now - e.fetched_at for key in keys
+                    if (e := self._entries.get(key)) is not None and e.value is not None}
@@ -0,0 +1,121 @@
+"""
+Disk-backed query result cache shared by every dashboard process.
+Results are Parquet files under <root>/<namespace>/<key>.parquet, written via a
+temp file + rename so concurrent readers never see partial files. A file's
+mtime is its last use: hits touch it, and puts evict the least recently used
+files once the namespace exceeds max_bytes or max_entries. Writing into a new
+namespace removes the others, which is how callers invalidate everything at once.
+"""
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CACHE_DIR         = os.getenv('RESULT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'retail_result_cache'))
+CACHE_MAX_BYTES   = int(float(os.getenv('RESULT_CACHE_MAX_MB', 512)) * 1024 * 1024)
+CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 2000))
+
+
+def cache_key(sql: str, params=None) -> str:
+    return hashlib.sha256(json.dumps([sql, list(params or [])], default=str).encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, max_entries=CACHE_MAX_ENTRIES):
+        self.root        = root
+        self.max_bytes   = max_bytes
+        self.max_entries = max_entries
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, namespace, key):
+        return os.path.join(self.root, namespace, f'{key}.parquet')
+
+    def get(self, namespace: str, key: str) -> Optional[pd.DataFrame]:
+        path = self._path(namespace, key)
+        try:
+            # Decimal columns come back as Arrow decimals, as db.run_query returned them.
+            df = pq.read_table(path).to_pandas(
+                types_mapper=lambda t: pd.ArrowDtype(t) if pa.types.is_decimal(t) else None)
+            os.utime(path)
+            return df
+        except (FileNotFoundError, OSError, pa.ArrowInvalid):
+            return None      # missing, evicted mid-read, or a foreign/corrupt file
+
+    def put(self, namespace: str, key: str, df: pd.DataFrame):
+        folder = os.path.join(self.root, namespace)
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        os.close(fd)
+        try:
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp)
+            os.replace(tmp, self._path(namespace, key))
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._drop_other_namespaces(namespace)
+        self._evict(folder)
+
+    def _drop_other_namespaces(self, namespace):
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and entry.name != namespace:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _evict(self, folder):
+        entries = []
+        for path in glob.glob(os.path.join(folder, '*.parquet')):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self) -> dict:
+        files = glob.glob(os.path.join(self.root, '*', '*.parquet'))
+        size  = 0
+        for path in files:
+            try:
+                size += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return {'entries': len(files), 'mb': round(size / 1e6, 1),
+                'namespaces': sorted(e.name for e in os.scandir(self.root) if e.is_dir())}
+
+
+# ── Pipeline version marker ──────────────────────────────────
+# The last-known pipeline version is shared through a small JSON file so that
+# replicas poll the warehouse at most once per interval between them.
+class VersionMarker:
+    def __init__(self, root=CACHE_DIR, name='pipeline_version.json'):
+        self.path = os.path.join(root, name)
+        os.makedirs(root, exist_ok=True)
+
+    def read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def write(self, version: str):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': version, 'checked_at': time.time()}, f)
+        os.replace(tmp, self.path)